@@ -8,7 +8,26 @@ public static class AppInstaller
 {
     private static readonly Encoding LauncherEncoding = new UTF8Encoding(encoderShouldEmitUTF8Identifier: false);
 
+    private static string? _userHomeDir;
+    private static string? _userAppsDir;
+    private static string? _userBinDir;
+
     public static string UserHomeDir()
+    {
+        return _userHomeDir ??= ResolveUserHomeDir();
+    }
+
+    public static string UserAppsDir()
+    {
+        return _userAppsDir ??= System.IO.Path.Combine(UserHomeDir(), "apps");
+    }
+
+    public static string UserBinDir()
+    {
+        return _userBinDir ??= System.IO.Path.Combine(UserHomeDir(), "bin");
+    }
+
+    private static string ResolveUserHomeDir()
     {
         if (OperatingSystem.IsWindows())
         {
@@ -41,16 +60,6 @@ public static class AppInstaller
         return System.IO.Path.Combine(home, ".yasn");
     }
 
-    public static string UserAppsDir()
-    {
-        return System.IO.Path.Combine(UserHomeDir(), "apps");
-    }
-
-    public static string UserBinDir()
-    {
-        return System.IO.Path.Combine(UserHomeDir(), "bin");
-    }
-
     public static bool IsUserBinInPath()
     {
         var path = Environment.GetEnvironmentVariable("PATH");
@@ -81,22 +90,21 @@ public static class AppInstaller
         Directory.CreateDirectory(binDir);
 
         var appPath = System.IO.Path.Combine(appsDir, name + ".yapp");
-        File.WriteAllBytes(appPath, bundleBytes);
+        WriteFileAtomic(appPath, bundleBytes);
 
         if (OperatingSystem.IsWindows())
         {
             var launcherPath = System.IO.Path.Combine(binDir, name + ".cmd");
-            File.WriteAllText(launcherPath, MakeWindowsLauncher(), LauncherEncoding);
+            WriteFileAtomic(launcherPath, LauncherEncoding.GetBytes(MakeWindowsLauncher()));
 
             var bashLauncherPath = System.IO.Path.Combine(binDir, name);
-            File.WriteAllText(bashLauncherPath, MakeWindowsBashLauncher(), LauncherEncoding);
+            WriteFileAtomic(bashLauncherPath, LauncherEncoding.GetBytes(MakeWindowsBashLauncher()));
 
             return (appPath, launcherPath);
         }
 
         var shPath = System.IO.Path.Combine(binDir, name);
-        File.WriteAllText(shPath, MakeUnixLauncher(name), LauncherEncoding);
-        TryMakeExecutable(shPath);
+        WriteFileAtomic(shPath, LauncherEncoding.GetBytes(MakeUnixLauncher(name)), executable: true);
         return (appPath, shPath);
     }
 
@@ -107,11 +115,9 @@ public static class AppInstaller
         string? projectRoot = null)
     {
         var fullPath = System.IO.Path.GetFullPath(sourcePath);
-        var source = File.ReadAllText(fullPath);
-        var loadedProgram = Pipeline.LoadProgram(source, fullPath);
-        var program = Pipeline.CompileProgram(loadedProgram, fullPath);
-        var bytecode = BytecodeCodec.EncodeProgram(program);
-        var schema = FunctionSchemaBuilder.FromProgramNode(loadedProgram);
+        var compiled = BytecodeCache.CompileFile(fullPath);
+        var bytecode = BytecodeCodec.EncodeProgram(compiled.Program);
+        var schema = compiled.Schema;
 
         byte[]? uiZip = null;
         if (!string.IsNullOrWhiteSpace(uiDistPath))
@@ -183,6 +189,33 @@ public static class AppInstaller
         });
     }
 
+    private static void WriteFileAtomic(string path, byte[] content, bool executable = false)
+    {
+        var tempPath = $"{path}.{Environment.ProcessId}.tmp";
+        try
+        {
+            File.WriteAllBytes(tempPath, content);
+            if (executable)
+            {
+                TryMakeExecutable(tempPath);
+            }
+
+            File.Move(tempPath, path, overwrite: true);
+        }
+        catch (Exception ex) when (ex is IOException or UnauthorizedAccessException)
+        {
+            try
+            {
+                File.Delete(tempPath);
+            }
+            catch (Exception cleanupEx) when (cleanupEx is IOException or UnauthorizedAccessException)
+            {
+            }
+
+            throw;
+        }
+    }
+
     private static void TryMakeExecutable(string path)
     {
         try
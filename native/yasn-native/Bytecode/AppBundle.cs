@@ -7,7 +7,7 @@ namespace YasnNative.Bytecode;
 public sealed record AppBundle(
     string Name,
     int Version,
-    byte[] Bytecode,
+    ReadOnlyMemory<byte> Bytecode,
     string? DisplayName = null,
     string? Description = null,
     string? AppVersion = null,
@@ -25,9 +25,23 @@ public sealed record AppBundleMetadata(
 
 public static class AppBundleCodec
 {
-    private static readonly byte[] AppMagic = "YASNYAP1"u8.ToArray();
+    private static readonly byte[] AppMagic = "YASNYAP2"u8.ToArray();
+    private static readonly byte[] LegacyAppMagic = "YASNYAP1"u8.ToArray();
+    private static readonly JsonSerializerOptions MetaJsonOptions = new()
+    {
+        Encoder = System.Text.Encodings.Web.JavaScriptEncoder.UnsafeRelaxedJsonEscaping,
+        WriteIndented = false,
+    };
+
+    public const int AppVersion = 3;
+    private const int LegacyAppVersion = 2;
 
-    public const int AppVersion = 2;
+    private sealed record BundleMeta(
+        string? DisplayName,
+        string? Description,
+        string? AppVersion,
+        string? Publisher,
+        List<FunctionSchema>? Schema);
 
     public static byte[] CreateBundle(string name, byte[] bytecode)
     {
@@ -41,107 +55,128 @@ public static class AppBundleCodec
 
     public static byte[] CreateBundle(AppBundleMetadata metadata, byte[] bytecode, byte[]? uiDistZip)
     {
-        var metaObject = new Dictionary<string, object?>
-        {
-            ["name"] = metadata.Name,
-            ["version"] = AppVersion,
-        };
-
+        var metaObject = new Dictionary<string, object?>();
         AddIfNotEmpty(metaObject, "displayName", metadata.DisplayName);
         AddIfNotEmpty(metaObject, "description", metadata.Description);
         AddIfNotEmpty(metaObject, "appVersion", metadata.AppVersion);
         AddIfNotEmpty(metaObject, "publisher", metadata.Publisher);
         AddSchemaIfPresent(metaObject, metadata.Schema);
 
-        var meta = JsonSerializer.SerializeToUtf8Bytes(
-            metaObject,
-            new JsonSerializerOptions
-            {
-                Encoder = System.Text.Encodings.Web.JavaScriptEncoder.UnsafeRelaxedJsonEscaping,
-                WriteIndented = false,
-            });
+        var meta = metaObject.Count == 0 ? [] : JsonSerializer.SerializeToUtf8Bytes(metaObject, MetaJsonOptions);
+        var name = System.Text.Encoding.UTF8.GetBytes(metadata.Name);
+        if (name.Length > ushort.MaxValue)
+        {
+            throw new YasnException("Имя приложения слишком длинное");
+        }
 
         var uiBytes = uiDistZip ?? [];
-        var output = new byte[AppMagic.Length + 4 + meta.Length + 4 + bytecode.Length + 4 + uiBytes.Length];
+        var output = new byte[AppMagic.Length + 2 + 2 + name.Length + 4 + bytecode.Length + 4 + uiBytes.Length + 4 + meta.Length];
         var offset = 0;
         Buffer.BlockCopy(AppMagic, 0, output, offset, AppMagic.Length);
         offset += AppMagic.Length;
 
-        BinaryPrimitives.WriteUInt32LittleEndian(output.AsSpan(offset, 4), (uint)meta.Length);
-        offset += 4;
-        Buffer.BlockCopy(meta, 0, output, offset, meta.Length);
-        offset += meta.Length;
+        BinaryPrimitives.WriteUInt16LittleEndian(output.AsSpan(offset, 2), AppVersion);
+        offset += 2;
+        BinaryPrimitives.WriteUInt16LittleEndian(output.AsSpan(offset, 2), (ushort)name.Length);
+        offset += 2;
+        Buffer.BlockCopy(name, 0, output, offset, name.Length);
+        offset += name.Length;
 
-        BinaryPrimitives.WriteUInt32LittleEndian(output.AsSpan(offset, 4), (uint)bytecode.Length);
-        offset += 4;
-        Buffer.BlockCopy(bytecode, 0, output, offset, bytecode.Length);
-        offset += bytecode.Length;
+        offset = WriteBlock(output, offset, bytecode);
+        offset = WriteBlock(output, offset, uiBytes);
+        WriteBlock(output, offset, meta);
+        return output;
+    }
 
-        BinaryPrimitives.WriteUInt32LittleEndian(output.AsSpan(offset, 4), (uint)uiBytes.Length);
-        offset += 4;
-        if (uiBytes.Length > 0)
+    public static AppBundle ReadBundle(byte[] blob, string? path = null)
+    {
+        if (blob.Length >= AppMagic.Length && blob.AsSpan(0, AppMagic.Length).SequenceEqual(AppMagic))
         {
-            Buffer.BlockCopy(uiBytes, 0, output, offset, uiBytes.Length);
+            return ReadBinaryBundle(blob, path);
         }
 
-        return output;
+        return ReadLegacyBundle(blob, path);
     }
 
-    public static AppBundle ReadBundle(byte[] blob, string? path = null)
+    private static AppBundle ReadBinaryBundle(byte[] blob, string? path)
     {
-        if (blob.Length < AppMagic.Length + 8)
+        var offset = AppMagic.Length;
+        if (offset + 4 > blob.Length)
         {
             throw new YasnException("Файл приложения слишком короткий", path: path);
         }
 
-        if (!blob.AsSpan(0, AppMagic.Length).SequenceEqual(AppMagic))
+        int version = BinaryPrimitives.ReadUInt16LittleEndian(blob.AsSpan(offset, 2));
+        offset += 2;
+        if (version != AppVersion)
         {
-            throw new YasnException("Некорректная сигнатура файла приложения", path: path);
+            throw new YasnException(
+                $"Неподдерживаемая версия формата приложения: {version}, ожидается {AppVersion}",
+                path: path);
         }
 
-        var offset = AppMagic.Length;
-        var metaLength = BinaryPrimitives.ReadUInt32LittleEndian(blob.AsSpan(offset, 4));
-        offset += 4;
-        if (offset + metaLength + 4 > blob.Length)
+        int nameLength = BinaryPrimitives.ReadUInt16LittleEndian(blob.AsSpan(offset, 2));
+        offset += 2;
+        if (offset + nameLength > blob.Length)
         {
-            throw new YasnException("Повреждён заголовок метаданных приложения", path: path);
+            throw new YasnException("Повреждён заголовок приложения", path: path);
         }
 
-        var metaRaw = blob.AsSpan(offset, checked((int)metaLength)).ToArray();
-        offset += (int)metaLength;
+        var name = System.Text.Encoding.UTF8.GetString(blob, offset, nameLength);
+        offset += nameLength;
 
-        string name;
-        int version;
-        string? displayName;
-        string? description;
-        string? appVersion;
-        string? publisher;
-        List<FunctionSchema>? schema;
-        try
+        var bytecode = ReadBlock(blob, ref offset, "Некорректная длина байткода в приложении", path);
+        var ui = ReadBlock(blob, ref offset, "Некорректная длина UI-архива в приложении", path);
+        var metaRaw = ReadBlock(blob, ref offset, "Повреждён блок метаданных приложения", path);
+        if (offset != blob.Length)
         {
-            using var doc = JsonDocument.Parse(metaRaw);
-            var root = doc.RootElement;
-            name = root.TryGetProperty("name", out var nameElement)
-                ? nameElement.GetString() ?? "app"
-                : "app";
-            version = root.TryGetProperty("version", out var versionElement)
-                ? versionElement.GetInt32()
-                : 0;
-            displayName = ReadOptionalString(root, "displayName", path);
-            description = ReadOptionalString(root, "description", path);
-            appVersion = ReadOptionalString(root, "appVersion", path);
-            publisher = ReadOptionalString(root, "publisher", path);
-            schema = ReadSchema(root, path);
+            throw new YasnException("Повреждён блок метаданных приложения", path: path);
         }
-        catch (Exception ex)
+
+        var meta = metaRaw.Length == 0
+            ? new BundleMeta(null, null, null, null, null)
+            : ParseMeta(metaRaw, path, out _, out _);
+
+        return new AppBundle(
+            name,
+            version,
+            bytecode,
+            meta.DisplayName,
+            meta.Description,
+            meta.AppVersion,
+            meta.Publisher,
+            meta.Schema,
+            ui.Length > 0 ? ui.ToArray() : null);
+    }
+
+    private static AppBundle ReadLegacyBundle(byte[] blob, string? path)
+    {
+        if (blob.Length < LegacyAppMagic.Length + 8)
         {
-            throw new YasnException($"Не удалось разобрать метаданные приложения: {ex.Message}", path: path);
+            throw new YasnException("Файл приложения слишком короткий", path: path);
         }
 
-        if (version is not (1 or AppVersion))
+        if (!blob.AsSpan(0, LegacyAppMagic.Length).SequenceEqual(LegacyAppMagic))
+        {
+            throw new YasnException("Некорректная сигнатура файла приложения", path: path);
+        }
+
+        var offset = LegacyAppMagic.Length;
+        var metaLength = BinaryPrimitives.ReadUInt32LittleEndian(blob.AsSpan(offset, 4));
+        offset += 4;
+        if (offset + metaLength + 4 > blob.Length)
+        {
+            throw new YasnException("Повреждён заголовок метаданных приложения", path: path);
+        }
+
+        var metaRaw = blob.AsMemory(offset, checked((int)metaLength));
+        offset += metaRaw.Length;
+
+        var meta = ParseMeta(metaRaw, path, out var name, out var version);
+        if (version is not (1 or LegacyAppVersion))
         {
             throw new YasnException(
-                $"Неподдерживаемая версия формата приложения: {version}, ожидается 1 или {AppVersion}",
+                $"Неподдерживаемая версия формата приложения: {version}, ожидается 1, {LegacyAppVersion} или {AppVersion}",
                 path: path);
         }
 
@@ -152,11 +187,11 @@ public static class AppBundleCodec
             throw new YasnException("Некорректная длина байткода в приложении", path: path);
         }
 
-        var bytecode = blob.AsSpan(offset, checked((int)bytecodeLength)).ToArray();
-        offset += (int)bytecodeLength;
+        var bytecode = blob.AsMemory(offset, checked((int)bytecodeLength));
+        offset += bytecode.Length;
 
         byte[]? uiDistZip = null;
-        if (version == AppVersion)
+        if (version == LegacyAppVersion)
         {
             if (offset + 4 > blob.Length)
             {
@@ -180,7 +215,68 @@ public static class AppBundleCodec
             throw new YasnException("Некорректная длина байткода в приложении", path: path);
         }
 
-        return new AppBundle(name, version, bytecode, displayName, description, appVersion, publisher, schema, uiDistZip);
+        return new AppBundle(
+            name,
+            version,
+            bytecode,
+            meta.DisplayName,
+            meta.Description,
+            meta.AppVersion,
+            meta.Publisher,
+            meta.Schema,
+            uiDistZip);
+    }
+
+    private static BundleMeta ParseMeta(ReadOnlyMemory<byte> metaRaw, string? path, out string name, out int version)
+    {
+        try
+        {
+            using var doc = JsonDocument.Parse(metaRaw);
+            var root = doc.RootElement;
+            name = root.TryGetProperty("name", out var nameElement)
+                ? nameElement.GetString() ?? "app"
+                : "app";
+            version = root.TryGetProperty("version", out var versionElement)
+                ? versionElement.GetInt32()
+                : 0;
+            return new BundleMeta(
+                ReadOptionalString(root, "displayName", path),
+                ReadOptionalString(root, "description", path),
+                ReadOptionalString(root, "appVersion", path),
+                ReadOptionalString(root, "publisher", path),
+                ReadSchema(root, path));
+        }
+        catch (Exception ex)
+        {
+            throw new YasnException($"Не удалось разобрать метаданные приложения: {ex.Message}", path: path);
+        }
+    }
+
+    private static int WriteBlock(byte[] output, int offset, byte[] block)
+    {
+        BinaryPrimitives.WriteUInt32LittleEndian(output.AsSpan(offset, 4), (uint)block.Length);
+        offset += 4;
+        Buffer.BlockCopy(block, 0, output, offset, block.Length);
+        return offset + block.Length;
+    }
+
+    private static ReadOnlyMemory<byte> ReadBlock(byte[] blob, ref int offset, string error, string? path)
+    {
+        if (offset + 4 > blob.Length)
+        {
+            throw new YasnException(error, path: path);
+        }
+
+        var length = BinaryPrimitives.ReadUInt32LittleEndian(blob.AsSpan(offset, 4));
+        offset += 4;
+        if (length > (uint)(blob.Length - offset))
+        {
+            throw new YasnException(error, path: path);
+        }
+
+        var block = blob.AsMemory(offset, (int)length);
+        offset += (int)length;
+        return block;
     }
 
     public static (AppBundle Bundle, ProgramBC Program) DecodeBundleToProgram(byte[] blob, string? path = null)
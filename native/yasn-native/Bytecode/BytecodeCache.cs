@@ -0,0 +1,262 @@
+using System.Buffers.Binary;
+using System.Security.Cryptography;
+using System.Text;
+using System.Text.Json;
+using YasnNative.App;
+using YasnNative.Config;
+using YasnNative.Core;
+using YasnNative.Runtime;
+
+namespace YasnNative.Bytecode;
+
+public sealed record CompiledSource(ProgramBC Program, List<FunctionSchema> Schema);
+
+public static class BytecodeCache
+{
+    private static readonly byte[] CacheMagic = "YASNCCH1"u8.ToArray();
+
+    private const int MaxCacheEntries = 256;
+
+    private sealed record SourceStamp(string Path, long Ticks, long Length);
+
+    public static string CacheDir()
+    {
+        return System.IO.Path.Combine(AppInstaller.UserHomeDir(), "cache");
+    }
+
+    public static CompiledSource CompileFile(string sourcePath)
+    {
+        var fullPath = System.IO.Path.GetFullPath(sourcePath);
+        var cachePath = System.IO.Path.Combine(CacheDir(), CacheFileName(fullPath));
+
+        var cached = TryLoad(cachePath);
+        if (cached is not null)
+        {
+            return cached;
+        }
+
+        // Stamps are taken before the inputs are read, so an edit made during compilation
+        // leaves the entry stale instead of pairing the new stamp with old bytecode.
+        var stamps = new List<SourceStamp> { Stamp(fullPath) };
+        var missing = new List<string>();
+        var directories = new List<(string Path, long Ticks)>();
+        var entryDir = System.IO.Path.GetDirectoryName(fullPath) ?? Directory.GetCurrentDirectory();
+        var configPath = TomlUtil.FindConfig(entryDir);
+        missing.AddRange(ConfigProbes(entryDir, configPath));
+        if (configPath is not null)
+        {
+            stamps.Add(Stamp(configPath));
+
+            // New dependency checkouts add module candidates that were never probed.
+            var depsRoot = System.IO.Path.Combine(System.IO.Path.GetDirectoryName(configPath)!, ".yasn", "deps");
+            if (Directory.Exists(depsRoot))
+            {
+                directories.Add((depsRoot, Directory.GetLastWriteTimeUtc(depsRoot).Ticks));
+            }
+            else
+            {
+                missing.Add(depsRoot);
+            }
+        }
+
+        var source = File.ReadAllText(fullPath);
+        var resolver = new ModuleResolver();
+        var loadedProgram = resolver.ResolveEntry(source, fullPath);
+        var program = Pipeline.CompileProgram(loadedProgram, fullPath);
+        var schema = FunctionSchemaBuilder.FromProgramNode(loadedProgram);
+
+        stamps.AddRange(resolver.SourceStamps.Select(static stamp => new SourceStamp(stamp.Path, stamp.Ticks, stamp.Length)));
+        missing.AddRange(resolver.MissingProbes);
+
+        TryStore(cachePath, stamps, missing, directories, program, schema);
+        return new CompiledSource(program, schema);
+    }
+
+    private static CompiledSource? TryLoad(string cachePath)
+    {
+        try
+        {
+            if (!File.Exists(cachePath))
+            {
+                return null;
+            }
+
+            var blob = File.ReadAllBytes(cachePath);
+            if (blob.Length < CacheMagic.Length + 4 || !blob.AsSpan(0, CacheMagic.Length).SequenceEqual(CacheMagic))
+            {
+                return null;
+            }
+
+            var manifestLength = (int)BinaryPrimitives.ReadUInt32LittleEndian(blob.AsSpan(CacheMagic.Length, 4));
+            var manifestStart = CacheMagic.Length + 4;
+            if (manifestLength < 0 || manifestStart + manifestLength > blob.Length)
+            {
+                return null;
+            }
+
+            using (var doc = JsonDocument.Parse(blob.AsMemory(manifestStart, manifestLength)))
+            {
+                var root = doc.RootElement;
+                if (root.GetProperty("toolchain").GetString() != ToolchainStamp())
+                {
+                    return null;
+                }
+
+                foreach (var item in root.GetProperty("sources").EnumerateArray())
+                {
+                    var stamp = new SourceStamp(
+                        item.GetProperty("path").GetString() ?? string.Empty,
+                        item.GetProperty("ticks").GetInt64(),
+                        item.GetProperty("length").GetInt64());
+                    if (!IsFresh(stamp))
+                    {
+                        return null;
+                    }
+                }
+
+                foreach (var item in root.GetProperty("missing").EnumerateArray())
+                {
+                    if (System.IO.Path.Exists(item.GetString()))
+                    {
+                        return null;
+                    }
+                }
+
+                foreach (var item in root.GetProperty("directories").EnumerateArray())
+                {
+                    var dir = new DirectoryInfo(item.GetProperty("path").GetString() ?? string.Empty);
+                    if (!dir.Exists || dir.LastWriteTimeUtc.Ticks != item.GetProperty("ticks").GetInt64())
+                    {
+                        return null;
+                    }
+                }
+            }
+
+            var bundleBytes = blob.AsSpan(manifestStart + manifestLength).ToArray();
+            var (bundle, program) = AppBundleCodec.DecodeBundleToProgram(bundleBytes, cachePath);
+            return new CompiledSource(program, bundle.Schema ?? FunctionSchemaBuilder.FromProgramBytecode(program));
+        }
+        catch (Exception ex) when (ex is IOException or UnauthorizedAccessException or JsonException or InvalidOperationException or KeyNotFoundException or YasnException)
+        {
+            return null;
+        }
+    }
+
+    private static void TryStore(
+        string cachePath,
+        List<SourceStamp> stamps,
+        List<string> missing,
+        List<(string Path, long Ticks)> directories,
+        ProgramBC program,
+        List<FunctionSchema> schema)
+    {
+        var tempPath = $"{cachePath}.{Environment.ProcessId}.tmp";
+        try
+        {
+            var manifest = new Dictionary<string, object?>
+            {
+                ["toolchain"] = ToolchainStamp(),
+                ["sources"] = stamps
+                    .DistinctBy(static stamp => stamp.Path, StringComparer.OrdinalIgnoreCase)
+                    .Select(static stamp => new Dictionary<string, object?>
+                    {
+                        ["path"] = stamp.Path,
+                        ["ticks"] = stamp.Ticks,
+                        ["length"] = stamp.Length,
+                    })
+                    .ToList(),
+                ["missing"] = missing.Distinct(StringComparer.OrdinalIgnoreCase).ToList(),
+                ["directories"] = directories
+                    .Select(static dir => new Dictionary<string, object?>
+                    {
+                        ["path"] = dir.Path,
+                        ["ticks"] = dir.Ticks,
+                    })
+                    .ToList(),
+            };
+
+            var manifestBytes = JsonSerializer.SerializeToUtf8Bytes(manifest);
+            var bundle = AppBundleCodec.CreateBundle(
+                new AppBundleMetadata("cache", Schema: schema),
+                BytecodeCodec.EncodeProgram(program));
+
+            var output = new byte[CacheMagic.Length + 4 + manifestBytes.Length + bundle.Length];
+            Buffer.BlockCopy(CacheMagic, 0, output, 0, CacheMagic.Length);
+            BinaryPrimitives.WriteUInt32LittleEndian(output.AsSpan(CacheMagic.Length, 4), (uint)manifestBytes.Length);
+            Buffer.BlockCopy(manifestBytes, 0, output, CacheMagic.Length + 4, manifestBytes.Length);
+            Buffer.BlockCopy(bundle, 0, output, CacheMagic.Length + 4 + manifestBytes.Length, bundle.Length);
+
+            Directory.CreateDirectory(System.IO.Path.GetDirectoryName(cachePath)!);
+            File.WriteAllBytes(tempPath, output);
+            File.Move(tempPath, cachePath, overwrite: true);
+            Evict(System.IO.Path.GetDirectoryName(cachePath)!);
+        }
+        catch (Exception ex) when (ex is IOException or UnauthorizedAccessException)
+        {
+            try
+            {
+                File.Delete(tempPath);
+            }
+            catch (Exception cleanupEx) when (cleanupEx is IOException or UnauthorizedAccessException)
+            {
+            }
+        }
+    }
+
+    private static IEnumerable<string> ConfigProbes(string startDirectory, string? configPath)
+    {
+        for (var current = new DirectoryInfo(startDirectory); current is not null; current = current.Parent)
+        {
+            var candidate = System.IO.Path.Combine(current.FullName, "yasn.toml");
+            if (string.Equals(candidate, configPath, StringComparison.OrdinalIgnoreCase))
+            {
+                yield break;
+            }
+
+            yield return candidate;
+        }
+    }
+
+    private static void Evict(string cacheDir)
+    {
+        var entries = new DirectoryInfo(cacheDir).GetFiles("*.ycache");
+        if (entries.Length <= MaxCacheEntries)
+        {
+            return;
+        }
+
+        foreach (var stale in entries.OrderByDescending(static entry => entry.LastAccessTimeUtc).Skip(MaxCacheEntries))
+        {
+            try
+            {
+                stale.Delete();
+            }
+            catch (Exception ex) when (ex is IOException or UnauthorizedAccessException)
+            {
+            }
+        }
+    }
+
+    private static SourceStamp Stamp(string path)
+    {
+        var info = new FileInfo(path);
+        return new SourceStamp(info.FullName, info.LastWriteTimeUtc.Ticks, info.Length);
+    }
+
+    private static bool IsFresh(SourceStamp stamp)
+    {
+        var info = new FileInfo(stamp.Path);
+        return info.Exists && info.LastWriteTimeUtc.Ticks == stamp.Ticks && info.Length == stamp.Length;
+    }
+
+    private static string CacheFileName(string fullPath)
+    {
+        var hash = SHA1.HashData(Encoding.UTF8.GetBytes(fullPath));
+        return $"{Convert.ToHexString(hash).ToLowerInvariant()}.ycache";
+    }
+
+    private static string ToolchainStamp()
+    {
+        return typeof(BytecodeCache).Assembly.ManifestModule.ModuleVersionId.ToString("N");
+    }
+}
@@ -8,47 +8,140 @@ namespace YasnNative.Bytecode;
 
 public static class BytecodeCodec
 {
-    private static readonly byte[] Magic = "YASNYBC1"u8.ToArray();
+    private static readonly byte[] Magic = "YASNYBC2"u8.ToArray();
+    private static readonly byte[] LegacyMagic = "YASNYBC1"u8.ToArray();
+
+    private const byte ArgNull = 0;
+    private const byte ArgFalse = 1;
+    private const byte ArgTrue = 2;
+    private const byte ArgInt = 3;
+    private const byte ArgFloat = 4;
+    private const byte ArgString = 5;
 
     public static byte[] EncodeProgram(ProgramBC program)
     {
-        var payload = new Dictionary<string, object?>
+        var strings = new List<string>();
+        var stringIds = new Dictionary<string, int>(StringComparer.Ordinal);
+        var body = new MemoryStream();
+
+        int Intern(string value)
         {
-            ["functions"] = program.Functions.ToDictionary(
-                pair => pair.Key,
-                pair => (object?)EncodeFunction(pair.Value),
-                StringComparer.Ordinal),
-            ["entry"] = EncodeFunction(program.Entry),
-            ["global_count"] = program.GlobalCount,
-        };
+            if (!stringIds.TryGetValue(value, out var id))
+            {
+                id = strings.Count;
+                strings.Add(value);
+                stringIds[value] = id;
+            }
+
+            return id;
+        }
 
-        var json = JsonSerializer.SerializeToUtf8Bytes(payload, JsonOptions.Default);
-        var output = new byte[Magic.Length + 4 + json.Length];
+        var opIds = new int?[Enum.GetValues<OpCode>().Length];
+        WriteVarUInt(body, (ulong)program.GlobalCount);
+        WriteVarUInt(body, (ulong)(program.Functions.Count + 1));
+        EncodeFunction(body, program.Entry, Intern, opIds);
+        foreach (var fn in program.Functions.Values)
+        {
+            EncodeFunction(body, fn, Intern, opIds);
+        }
+
+        var payload = new MemoryStream();
+        WriteVarUInt(payload, (ulong)strings.Count);
+        foreach (var value in strings)
+        {
+            var bytes = Encoding.UTF8.GetBytes(value);
+            WriteVarUInt(payload, (ulong)bytes.Length);
+            payload.Write(bytes);
+        }
+
+        body.Position = 0;
+        body.CopyTo(payload);
+
+        var output = new byte[Magic.Length + 4 + payload.Length];
         Buffer.BlockCopy(Magic, 0, output, 0, Magic.Length);
-        BinaryPrimitives.WriteUInt32LittleEndian(output.AsSpan(Magic.Length, 4), (uint)json.Length);
-        Buffer.BlockCopy(json, 0, output, Magic.Length + 4, json.Length);
+        BinaryPrimitives.WriteUInt32LittleEndian(output.AsSpan(Magic.Length, 4), (uint)payload.Length);
+        payload.GetBuffer().AsSpan(0, (int)payload.Length).CopyTo(output.AsSpan(Magic.Length + 4));
         return output;
     }
 
-    public static ProgramBC DecodeProgram(byte[] blob, string? path = null)
+    public static ProgramBC DecodeProgram(ReadOnlyMemory<byte> blob, string? path = null)
     {
         if (blob.Length < Magic.Length + 4)
         {
             throw new YasnException("Файл байткода слишком короткий", path: path);
         }
 
-        if (!blob.AsSpan(0, Magic.Length).SequenceEqual(Magic))
+        var magic = blob.Span[..Magic.Length];
+        var isLegacy = magic.SequenceEqual(LegacyMagic);
+        if (!isLegacy && !magic.SequenceEqual(Magic))
         {
             throw new YasnException("Неверная сигнатура файла .ybc", path: path);
         }
 
-        var payloadLength = BinaryPrimitives.ReadUInt32LittleEndian(blob.AsSpan(Magic.Length, 4));
-        var payload = blob.AsSpan(Magic.Length + 4).ToArray();
+        var payloadLength = BinaryPrimitives.ReadUInt32LittleEndian(blob.Span.Slice(Magic.Length, 4));
+        var payload = blob[(Magic.Length + 4)..];
         if (payloadLength != payload.Length)
         {
             throw new YasnException("Некорректная длина полезной нагрузки .ybc", path: path);
         }
 
+        return isLegacy ? DecodeLegacyPayload(payload, path) : DecodeBinaryPayload(payload.Span, path);
+    }
+
+    private static ProgramBC DecodeBinaryPayload(ReadOnlySpan<byte> payload, string? path)
+    {
+        try
+        {
+            var offset = 0;
+            var stringCount = ReadCount(payload, ref offset);
+            var strings = new string[stringCount];
+            for (var i = 0; i < strings.Length; i++)
+            {
+                var length = ReadCount(payload, ref offset);
+                strings[i] = Encoding.UTF8.GetString(payload.Slice(offset, length));
+                offset += length;
+            }
+
+            var globalCount = ReadCount(payload, ref offset);
+            var functionCount = ReadCount(payload, ref offset);
+            if (functionCount == 0)
+            {
+                throw new YasnException("В байткоде отсутствует точка входа", path: path);
+            }
+
+            var opCodes = new OpCode?[strings.Length];
+            var entry = DecodeFunction(payload, ref offset, strings, opCodes);
+            var functions = new Dictionary<string, FunctionBC>(functionCount - 1, StringComparer.Ordinal);
+            for (var i = 1; i < functionCount; i++)
+            {
+                var fn = DecodeFunction(payload, ref offset, strings, opCodes);
+                functions[fn.Name] = fn;
+            }
+
+            if (offset != payload.Length)
+            {
+                throw new YasnException("Лишние данные в конце байткода", path: path);
+            }
+
+            return new ProgramBC
+            {
+                Functions = functions,
+                Entry = entry,
+                GlobalCount = globalCount,
+            };
+        }
+        catch (YasnException)
+        {
+            throw;
+        }
+        catch (Exception ex) when (ex is ArgumentOutOfRangeException or IndexOutOfRangeException or OverflowException)
+        {
+            throw new YasnException("Повреждённый байткод: неожиданный конец данных", path: path);
+        }
+    }
+
+    private static ProgramBC DecodeLegacyPayload(ReadOnlyMemory<byte> payload, string? path)
+    {
         try
         {
             using var doc = JsonDocument.Parse(payload);
@@ -57,10 +150,10 @@ public static class BytecodeCodec
             var functions = new Dictionary<string, FunctionBC>(StringComparer.Ordinal);
             foreach (var fn in root.GetProperty("functions").EnumerateObject())
             {
-                functions[fn.Name] = DecodeFunction(fn.Value);
+                functions[fn.Name] = DecodeLegacyFunction(fn.Value);
             }
 
-            var entry = DecodeFunction(root.GetProperty("entry"));
+            var entry = DecodeLegacyFunction(root.GetProperty("entry"));
             var globalCount = root.TryGetProperty("global_count", out var globalCountElement)
                 ? ToInt(globalCountElement)
                 : 0;
@@ -131,43 +224,240 @@ public static class BytecodeCodec
         };
     }
 
-    private static Dictionary<string, object?> EncodeFunction(FunctionBC fn)
+    private static void EncodeFunction(MemoryStream output, FunctionBC fn, Func<string, int> intern, int?[] opIds)
     {
-        return new Dictionary<string, object?>
+        Span<byte> floatBuffer = stackalloc byte[8];
+        WriteVarUInt(output, (ulong)intern(fn.Name));
+        WriteVarUInt(output, (ulong)fn.Params.Count);
+        foreach (var param in fn.Params)
+        {
+            WriteVarUInt(output, (ulong)intern(param));
+        }
+
+        WriteVarUInt(output, (ulong)fn.LocalCount);
+        WriteVarUInt(output, (ulong)fn.Count);
+        for (var i = 0; i < fn.Count; i++)
         {
-            ["name"] = fn.Name,
-            ["params"] = fn.Params,
-            ["local_count"] = fn.LocalCount,
-            ["instructions"] = fn.Instructions.Select(ins => new Dictionary<string, object?>
+            var op = fn.Ops[i];
+            WriteVarUInt(output, (ulong)(opIds[(int)op] ??= intern(OpCodes.Name(op))));
+            switch (op)
             {
-                ["op"] = ins.Op,
-                ["args"] = ins.Args,
-            }).ToList(),
-        };
+                case OpCode.CONST:
+                    WriteVarUInt(output, 1);
+                    WriteValueArg(output, fn.Constants[fn.Arg0[i]], op, intern, floatBuffer);
+                    break;
+                case OpCode.CALL:
+                    WriteVarUInt(output, 2);
+                    WriteValueArg(output, fn.Constants[fn.Arg0[i]], op, intern, floatBuffer);
+                    WriteIntArg(output, fn.Arg1[i]);
+                    break;
+                case OpCode.FOR_ITER:
+                    WriteVarUInt(output, 2);
+                    WriteIntArg(output, fn.Arg0[i]);
+                    WriteIntArg(output, fn.Arg1[i]);
+                    break;
+                case var _ when InstructionBuffer.HasIntOperand(op):
+                    WriteVarUInt(output, 1);
+                    WriteIntArg(output, fn.Arg0[i]);
+                    break;
+                default:
+                    WriteVarUInt(output, 0);
+                    break;
+            }
+        }
     }
 
-    private static FunctionBC DecodeFunction(JsonElement element)
+    private static void WriteIntArg(MemoryStream output, long value)
     {
-        var instructions = new List<InstructionBC>();
+        output.WriteByte(ArgInt);
+        WriteVarUInt(output, (ulong)((value << 1) ^ (value >> 63)));
+    }
+
+    private static void WriteValueArg(MemoryStream output, object? arg, OpCode op, Func<string, int> intern, Span<byte> floatBuffer)
+    {
+        switch (arg)
+        {
+            case null:
+                output.WriteByte(ArgNull);
+                break;
+            case bool b:
+                output.WriteByte(b ? ArgTrue : ArgFalse);
+                break;
+            case long l:
+                WriteIntArg(output, l);
+                break;
+            case int n:
+                WriteIntArg(output, n);
+                break;
+            case double d:
+                output.WriteByte(ArgFloat);
+                BinaryPrimitives.WriteDoubleLittleEndian(floatBuffer, d);
+                output.Write(floatBuffer);
+                break;
+            case string s:
+                output.WriteByte(ArgString);
+                WriteVarUInt(output, (ulong)intern(s));
+                break;
+            default:
+                throw new YasnException($"Неподдерживаемый аргумент инструкции {OpCodes.Name(op)}: {arg.GetType().Name}");
+        }
+    }
+
+    private static FunctionBC DecodeFunction(ReadOnlySpan<byte> payload, ref int offset, string[] strings, OpCode?[] opCodes)
+    {
+        var name = strings[ReadCount(payload, ref offset)];
+        var paramCount = ReadCount(payload, ref offset);
+        var parameters = new List<string>(paramCount);
+        for (var i = 0; i < paramCount; i++)
+        {
+            parameters.Add(strings[ReadCount(payload, ref offset)]);
+        }
+
+        var localCount = ReadCount(payload, ref offset);
+        var instructionCount = ReadCount(payload, ref offset);
+        var code = new InstructionBuffer(instructionCount);
+        var args = new List<object?>(2);
+        for (var i = 0; i < instructionCount; i++)
+        {
+            var opIndex = ReadCount(payload, ref offset);
+            var op = opCodes[opIndex] ??= OpCodes.FromName(strings[opIndex]);
+            var argc = ReadCount(payload, ref offset);
+            if (op == OpCode.FOR_ITER && argc == 2)
+            {
+                var target = ReadIntArg(payload, ref offset);
+                code.Add(op, target, ReadIntArg(payload, ref offset));
+                continue;
+            }
+
+            if (argc == 1 && InstructionBuffer.HasIntOperand(op))
+            {
+                code.Add(op, ReadIntArg(payload, ref offset));
+                continue;
+            }
+
+            if (op is not (OpCode.CONST or OpCode.CALL or OpCode.FOR_ITER) && !InstructionBuffer.HasIntOperand(op))
+            {
+                SkipArgs(payload, ref offset, argc);
+                code.Add(op);
+                continue;
+            }
+
+            args.Clear();
+            for (var a = 0; a < argc; a++)
+            {
+                var tag = payload[offset++];
+                switch (tag)
+                {
+                    case ArgNull:
+                        args.Add(null);
+                        break;
+                    case ArgFalse:
+                        args.Add(false);
+                        break;
+                    case ArgTrue:
+                        args.Add(true);
+                        break;
+                    case ArgInt:
+                        var raw = ReadVarUInt(payload, ref offset);
+                        args.Add((long)(raw >> 1) ^ -(long)(raw & 1));
+                        break;
+                    case ArgFloat:
+                        args.Add(BinaryPrimitives.ReadDoubleLittleEndian(payload.Slice(offset, 8)));
+                        offset += 8;
+                        break;
+                    case ArgString:
+                        args.Add(strings[ReadCount(payload, ref offset)]);
+                        break;
+                    default:
+                        throw new YasnException($"Неизвестный тип аргумента в байткоде: {tag}");
+                }
+            }
+
+            code.Add(op, args);
+        }
+
+        return code.Build(name, parameters, localCount);
+    }
+
+    private static int ReadIntArg(ReadOnlySpan<byte> payload, ref int offset)
+    {
+        if (payload[offset++] != ArgInt)
+        {
+            throw new YasnException("Ожидалось целое число в байткоде");
+        }
+
+        var raw = ReadVarUInt(payload, ref offset);
+        return checked((int)((long)(raw >> 1) ^ -(long)(raw & 1)));
+    }
+
+    private static void SkipArgs(ReadOnlySpan<byte> payload, ref int offset, int argc)
+    {
+        for (var a = 0; a < argc; a++)
+        {
+            var tag = payload[offset++];
+            switch (tag)
+            {
+                case ArgNull or ArgFalse or ArgTrue:
+                    break;
+                case ArgInt or ArgString:
+                    ReadVarUInt(payload, ref offset);
+                    break;
+                case ArgFloat:
+                    offset += 8;
+                    break;
+                default:
+                    throw new YasnException($"Неизвестный тип аргумента в байткоде: {tag}");
+            }
+        }
+    }
+
+    private static void WriteVarUInt(MemoryStream output, ulong value)
+    {
+        while (value >= 0x80)
+        {
+            output.WriteByte((byte)(value | 0x80));
+            value >>= 7;
+        }
+
+        output.WriteByte((byte)value);
+    }
+
+    private static ulong ReadVarUInt(ReadOnlySpan<byte> payload, ref int offset)
+    {
+        ulong result = 0;
+        for (var shift = 0; shift < 64; shift += 7)
+        {
+            var b = payload[offset++];
+            result |= (ulong)(b & 0x7F) << shift;
+            if ((b & 0x80) == 0)
+            {
+                return result;
+            }
+        }
+
+        throw new YasnException("Некорректное число переменной длины в байткоде");
+    }
+
+    private static int ReadCount(ReadOnlySpan<byte> payload, ref int offset)
+    {
+        return checked((int)ReadVarUInt(payload, ref offset));
+    }
+
+    private static FunctionBC DecodeLegacyFunction(JsonElement element)
+    {
+        var code = new InstructionBuffer();
         foreach (var ins in element.GetProperty("instructions").EnumerateArray())
         {
             var args = ins.TryGetProperty("args", out var argsElement)
                 ? argsElement.EnumerateArray().Select(DecodeJsonValue).ToList()
                 : [];
-            instructions.Add(new InstructionBC
-            {
-                Op = ins.GetProperty("op").GetString() ?? string.Empty,
-                Args = args,
-            });
+            code.Add(ins.GetProperty("op").GetString() ?? string.Empty, args);
         }
 
-        return new FunctionBC
-        {
-            Name = element.GetProperty("name").GetString() ?? string.Empty,
-            Params = element.GetProperty("params").EnumerateArray().Select(v => v.GetString() ?? string.Empty).ToList(),
-            LocalCount = ToInt(element.GetProperty("local_count")),
-            Instructions = instructions,
-        };
+        return code.Build(
+            element.GetProperty("name").GetString() ?? string.Empty,
+            element.GetProperty("params").EnumerateArray().Select(v => v.GetString() ?? string.Empty).ToList(),
+            ToInt(element.GetProperty("local_count")));
     }
 
     private static int ToInt(JsonElement value)
@@ -192,15 +482,6 @@ public static class BytecodeCodec
         };
     }
 
-    private sealed class JsonOptions
-    {
-        public static readonly JsonSerializerOptions Default = new()
-        {
-            Encoder = System.Text.Encodings.Web.JavaScriptEncoder.UnsafeRelaxedJsonEscaping,
-            WriteIndented = false,
-        };
-    }
-
     private sealed class ObjectKeyComparer : IEqualityComparer<object>
     {
         public static readonly ObjectKeyComparer Instance = new();
@@ -1,4 +1,6 @@
-﻿namespace YasnNative.Bytecode;
+﻿using YasnNative.Core;
+
+namespace YasnNative.Bytecode;
 
 public sealed class InstructionBC
 {
@@ -15,7 +17,31 @@ public sealed class FunctionBC
 
     public int LocalCount { get; init; }
 
-    public List<InstructionBC> Instructions { get; init; } = [];
+    public OpCode[] Ops { get; init; } = [];
+
+    public int[] Arg0 { get; init; } = [];
+
+    public int[] Arg1 { get; init; } = [];
+
+    public object?[] Constants { get; init; } = [];
+
+    public int Count => Ops.Length;
+
+    public IEnumerable<InstructionBC> Instructions => Enumerable.Range(0, Count).Select(GetInstruction);
+
+    public InstructionBC GetInstruction(int index)
+    {
+        var op = Ops[index];
+        List<object?> args = op switch
+        {
+            OpCode.CONST => [Constants[Arg0[index]]],
+            OpCode.CALL => [Constants[Arg0[index]], (long)Arg1[index]],
+            OpCode.FOR_ITER => [(long)Arg0[index], (long)Arg1[index]],
+            _ when InstructionBuffer.HasIntOperand(op) => [(long)Arg0[index]],
+            _ => [],
+        };
+        return new InstructionBC { Op = OpCodes.Name(op), Args = args };
+    }
 }
 
 public sealed class ProgramBC
@@ -26,3 +52,151 @@ public sealed class ProgramBC
 
     public int GlobalCount { get; init; }
 }
+
+public sealed class InstructionBuffer
+{
+    public static bool HasIntOperand(OpCode op)
+    {
+        return op is OpCode.LOAD or OpCode.STORE or OpCode.GLOAD or OpCode.GSTORE
+            or OpCode.JMP or OpCode.JMP_FALSE or OpCode.JMP_TRUE or OpCode.MAKE_LIST or OpCode.MAKE_DICT
+            or OpCode.STORE_KEEP or OpCode.INC_LOCAL or OpCode.FOR_PREP or OpCode.CONST_INT;
+    }
+
+    public const int SmallIntMin = -128;
+    public const int SmallIntMax = 127;
+
+    private readonly List<OpCode> _ops;
+    private readonly List<int> _arg0;
+    private readonly List<int> _arg1;
+    private readonly List<object?> _constants = [];
+    private readonly Dictionary<object, int> _constantIds = new(ConstantComparer.Instance);
+    private int _nullConstant = -1;
+
+    public InstructionBuffer(int capacity = 0)
+    {
+        _ops = new List<OpCode>(capacity);
+        _arg0 = new List<int>(capacity);
+        _arg1 = new List<int>(capacity);
+    }
+
+    public int Count => _ops.Count;
+
+    public OpCode? LastOp => _ops.Count > 0 ? _ops[^1] : null;
+
+    public int Add(string op, IReadOnlyList<object?> args)
+    {
+        return Add(OpCodes.FromName(op), args);
+    }
+
+    public int Add(OpCode op, IReadOnlyList<object?> args)
+    {
+        switch (op)
+        {
+            case OpCode.CONST:
+                return AddConst(args.Count > 0 ? args[0] : null);
+            case OpCode.CALL:
+                return AddCall(Convert.ToString(args[0], System.Globalization.CultureInfo.InvariantCulture) ?? string.Empty, ToInt(args[1]));
+            case OpCode.FOR_ITER:
+                return Add(op, ToInt(args[0]), ToInt(args[1]));
+            default:
+                return Add(op, HasIntOperand(op) ? ToInt(args[0]) : 0);
+        }
+    }
+
+    public int Add(OpCode op, int arg0 = 0, int arg1 = 0)
+    {
+        _ops.Add(op);
+        _arg0.Add(arg0);
+        _arg1.Add(arg1);
+        return _ops.Count - 1;
+    }
+
+    public int AddConst(object? value)
+    {
+        return value switch
+        {
+            null => Add(OpCode.CONST_NULL),
+            true => Add(OpCode.CONST_TRUE),
+            false => Add(OpCode.CONST_FALSE),
+            long l and >= SmallIntMin and <= SmallIntMax => Add(OpCode.CONST_INT, (int)l),
+            _ => Add(OpCode.CONST, AddConstant(value)),
+        };
+    }
+
+    public int AddCall(string name, int argc)
+    {
+        return Add(OpCode.CALL, AddConstant(name), argc);
+    }
+
+    public void PatchArg0(int index, int value)
+    {
+        _arg0[index] = value;
+    }
+
+    public FunctionBC Build(string name, List<string> parameters, int localCount)
+    {
+        return new FunctionBC
+        {
+            Name = name,
+            Params = parameters,
+            LocalCount = localCount,
+            Ops = [.. _ops],
+            Arg0 = [.. _arg0],
+            Arg1 = [.. _arg1],
+            Constants = [.. _constants],
+        };
+    }
+
+    private int AddConstant(object? value)
+    {
+        if (value is null)
+        {
+            if (_nullConstant < 0)
+            {
+                _nullConstant = _constants.Count;
+                _constants.Add(null);
+            }
+
+            return _nullConstant;
+        }
+
+        if (!_constantIds.TryGetValue(value, out var id))
+        {
+            id = _constants.Count;
+            _constants.Add(value);
+            _constantIds[value] = id;
+        }
+
+        return id;
+    }
+
+    private static int ToInt(object? value)
+    {
+        return value switch
+        {
+            long l => checked((int)l),
+            int i => i,
+            _ => throw new YasnException("Ожидалось целое число в байткоде"),
+        };
+    }
+
+    private sealed class ConstantComparer : IEqualityComparer<object>
+    {
+        public static readonly ConstantComparer Instance = new();
+
+        public new bool Equals(object? x, object? y)
+        {
+            if (x is double dx && y is double dy)
+            {
+                return BitConverter.DoubleToInt64Bits(dx) == BitConverter.DoubleToInt64Bits(dy);
+            }
+
+            return object.Equals(x, y);
+        }
+
+        public int GetHashCode(object obj)
+        {
+            return obj is double d ? BitConverter.DoubleToInt64Bits(d).GetHashCode() : obj.GetHashCode();
+        }
+    }
+}
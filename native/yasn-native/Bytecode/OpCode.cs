@@ -0,0 +1,68 @@
+using YasnNative.Core;
+
+namespace YasnNative.Bytecode;
+
+public enum OpCode : byte
+{
+    CONST,
+    CONST_NULL,
+    LOAD,
+    STORE,
+    GLOAD,
+    GSTORE,
+    POP,
+    ADD,
+    SUB,
+    MUL,
+    DIV,
+    MOD,
+    NEG,
+    NOT,
+    AND,
+    OR,
+    EQ,
+    NE,
+    LT,
+    LE,
+    GT,
+    GE,
+    JMP,
+    JMP_FALSE,
+    CALL,
+    RET,
+    MAKE_LIST,
+    MAKE_DICT,
+    INDEX_GET,
+    INDEX_SET,
+    LEN,
+    HALT,
+    DUP,
+    STORE_KEEP,
+    INC_LOCAL,
+    FOR_PREP,
+    FOR_ITER,
+    CONST_TRUE,
+    CONST_FALSE,
+    CONST_INT,
+    JMP_TRUE,
+}
+
+public static class OpCodes
+{
+    private static readonly string[] Names = Enum.GetNames<OpCode>();
+
+    private static readonly Dictionary<string, OpCode> ByName = Enum.GetValues<OpCode>()
+        .ToDictionary(static op => Names[(int)op], StringComparer.Ordinal);
+
+    public static OpCode FromName(string name)
+    {
+        return ByName.TryGetValue(name, out var op)
+            ? op
+            : throw new YasnException($"Неизвестная инструкция VM: {name}");
+    }
+
+    public static string Name(OpCode op)
+    {
+        return Names[(int)op];
+    }
+}
@@ -0,0 +1,150 @@
+namespace YasnNative.Bytecode;
+
+public static class Peephole
+{
+    public static FunctionBC Optimize(FunctionBC fn)
+    {
+        var ops = fn.Ops;
+        var arg0 = (int[])fn.Arg0.Clone();
+        var count = ops.Length;
+
+        ThreadJumps(ops, arg0);
+
+        var isTarget = new bool[count + 1];
+        for (var i = 0; i < count; i++)
+        {
+            if (IsJump(ops[i]) && arg0[i] >= 0 && arg0[i] <= count)
+            {
+                isTarget[arg0[i]] = true;
+            }
+        }
+
+        var newOps = new List<OpCode>(count);
+        var newArg0 = new List<int>(count);
+        var newArg1 = new List<int>(count);
+        var indexMap = new int[count + 1];
+
+        var ip = 0;
+        while (ip < count)
+        {
+            indexMap[ip] = newOps.Count;
+            var op = ops[ip];
+
+            if (op == OpCode.LOAD && Free(isTarget, ip, 4, count) &&
+                ops[ip + 1] == OpCode.CONST_INT && arg0[ip + 1] == 1 &&
+                ops[ip + 2] == OpCode.ADD &&
+                ops[ip + 3] == OpCode.STORE && arg0[ip + 3] == arg0[ip])
+            {
+                Append(OpCode.INC_LOCAL, arg0[ip], 0);
+                Skip(ip, 4);
+                continue;
+            }
+
+            if (op is OpCode.CONST or OpCode.CONST_NULL or OpCode.CONST_TRUE or OpCode.CONST_FALSE or OpCode.CONST_INT && Free(isTarget, ip, 2, count) && ops[ip + 1] == OpCode.POP)
+            {
+                Skip(ip, 2);
+                continue;
+            }
+
+            if (op == OpCode.STORE && Free(isTarget, ip, 2, count) &&
+                ops[ip + 1] == OpCode.LOAD && arg0[ip + 1] == arg0[ip])
+            {
+                Append(OpCode.STORE_KEEP, arg0[ip], 0);
+                Skip(ip, 2);
+                continue;
+            }
+
+            if (op == OpCode.LOAD && Free(isTarget, ip, 2, count) &&
+                ops[ip + 1] == OpCode.LOAD && arg0[ip + 1] == arg0[ip])
+            {
+                Append(OpCode.LOAD, arg0[ip], 0);
+                indexMap[ip + 1] = newOps.Count;
+                Append(OpCode.DUP, 0, 0);
+                ip += 2;
+                continue;
+            }
+
+            Append(op, arg0[ip], fn.Arg1[ip]);
+            ip++;
+        }
+
+        indexMap[count] = newOps.Count;
+        for (var i = 0; i < newOps.Count; i++)
+        {
+            if (IsJump(newOps[i]) && newArg0[i] >= 0 && newArg0[i] <= count)
+            {
+                newArg0[i] = indexMap[newArg0[i]];
+            }
+        }
+
+        return new FunctionBC
+        {
+            Name = fn.Name,
+            Params = fn.Params,
+            LocalCount = fn.LocalCount,
+            Ops = [.. newOps],
+            Arg0 = [.. newArg0],
+            Arg1 = [.. newArg1],
+            Constants = fn.Constants,
+        };
+
+        void Append(OpCode newOp, int a0, int a1)
+        {
+            newOps.Add(newOp);
+            newArg0.Add(a0);
+            newArg1.Add(a1);
+        }
+
+        void Skip(int start, int length)
+        {
+            for (var i = start + 1; i < start + length; i++)
+            {
+                indexMap[i] = newOps.Count;
+            }
+
+            ip = start + length;
+        }
+    }
+
+    private static void ThreadJumps(OpCode[] ops, int[] arg0)
+    {
+        for (var i = 0; i < ops.Length; i++)
+        {
+            if (!IsJump(ops[i]))
+            {
+                continue;
+            }
+
+            var target = arg0[i];
+            for (var hops = 0; hops < ops.Length && target >= 0 && target < ops.Length && ops[target] == OpCode.JMP; hops++)
+            {
+                target = arg0[target];
+            }
+
+            arg0[i] = target;
+        }
+    }
+
+    private static bool Free(bool[] isTarget, int start, int length, int count)
+    {
+        if (start + length > count)
+        {
+            return false;
+        }
+
+        for (var i = start + 1; i < start + length; i++)
+        {
+            if (isTarget[i])
+            {
+                return false;
+            }
+        }
+
+        return true;
+    }
+
+    private static bool IsJump(OpCode op)
+    {
+        return op is OpCode.JMP or OpCode.JMP_FALSE or OpCode.JMP_TRUE or OpCode.FOR_ITER;
+    }
+}
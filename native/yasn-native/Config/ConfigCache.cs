@@ -0,0 +1,163 @@
+using System.Security.Cryptography;
+using System.Text;
+using System.Text.Json;
+using Tomlyn.Model;
+using YasnNative.App;
+
+namespace YasnNative.Config;
+
+internal static class ConfigCache
+{
+    public static TomlTable? TryLoad(FileInfo config)
+    {
+        try
+        {
+            var cachePath = CachePath(config.FullName);
+            if (!File.Exists(cachePath))
+            {
+                return null;
+            }
+
+            using var doc = JsonDocument.Parse(File.ReadAllBytes(cachePath));
+            var root = doc.RootElement;
+            if (root.GetProperty("ticks").GetInt64() != config.LastWriteTimeUtc.Ticks ||
+                root.GetProperty("length").GetInt64() != config.Length)
+            {
+                return null;
+            }
+
+            return DecodeValue(root.GetProperty("data")) as TomlTable;
+        }
+        catch (Exception ex) when (ex is IOException or UnauthorizedAccessException or JsonException or InvalidOperationException or KeyNotFoundException or FormatException)
+        {
+            return null;
+        }
+    }
+
+    public static void TryStore(FileInfo config, TomlTable table)
+    {
+        var cachePath = CachePath(config.FullName);
+        var tempPath = $"{cachePath}.{Environment.ProcessId}.tmp";
+        try
+        {
+            using var buffer = new MemoryStream();
+            using (var writer = new Utf8JsonWriter(buffer))
+            {
+                writer.WriteStartObject();
+                writer.WriteNumber("ticks", config.LastWriteTimeUtc.Ticks);
+                writer.WriteNumber("length", config.Length);
+                writer.WritePropertyName("data");
+                if (!TryEncodeValue(writer, table))
+                {
+                    return;
+                }
+
+                writer.WriteEndObject();
+            }
+
+            Directory.CreateDirectory(System.IO.Path.GetDirectoryName(cachePath)!);
+            File.WriteAllBytes(tempPath, buffer.ToArray());
+            File.Move(tempPath, cachePath, overwrite: true);
+        }
+        catch (Exception ex) when (ex is IOException or UnauthorizedAccessException)
+        {
+            try
+            {
+                File.Delete(tempPath);
+            }
+            catch (Exception cleanupEx) when (cleanupEx is IOException or UnauthorizedAccessException)
+            {
+            }
+        }
+    }
+
+    private static string CachePath(string configPath)
+    {
+        var hash = SHA1.HashData(Encoding.UTF8.GetBytes(configPath));
+        return System.IO.Path.Combine(AppInstaller.UserHomeDir(), "cache", $"config-{Convert.ToHexString(hash).ToLowerInvariant()}.json");
+    }
+
+    private static bool TryEncodeValue(Utf8JsonWriter writer, object? value)
+    {
+        writer.WriteStartObject();
+        switch (value)
+        {
+            case TomlTable table:
+                writer.WriteStartObject("t");
+                foreach (var (key, item) in table)
+                {
+                    writer.WritePropertyName(key);
+                    if (!TryEncodeValue(writer, item))
+                    {
+                        return false;
+                    }
+                }
+
+                writer.WriteEndObject();
+                break;
+            case TomlArray array:
+                writer.WriteStartArray("a");
+                foreach (var item in array)
+                {
+                    if (!TryEncodeValue(writer, item))
+                    {
+                        return false;
+                    }
+                }
+
+                writer.WriteEndArray();
+                break;
+            case string s:
+                writer.WriteString("s", s);
+                break;
+            case long i64:
+                writer.WriteNumber("i", i64);
+                break;
+            case double f64 when double.IsFinite(f64):
+                writer.WriteNumber("f", f64);
+                break;
+            case bool b:
+                writer.WriteBoolean("b", b);
+                break;
+            default:
+                return false;
+        }
+
+        writer.WriteEndObject();
+        return true;
+    }
+
+    private static object DecodeValue(JsonElement element)
+    {
+        var property = element.EnumerateObject().Single();
+        switch (property.Name)
+        {
+            case "t":
+                var table = new TomlTable();
+                foreach (var item in property.Value.EnumerateObject())
+                {
+                    table[item.Name] = DecodeValue(item.Value);
+                }
+
+                return table;
+            case "a":
+                var array = new TomlArray();
+                foreach (var item in property.Value.EnumerateArray())
+                {
+                    array.Add(DecodeValue(item));
+                }
+
+                return array;
+            case "s":
+                return property.Value.GetString()!;
+            case "i":
+                return property.Value.GetInt64();
+            case "f":
+                return property.Value.GetDouble();
+            case "b":
+                return property.Value.GetBoolean();
+            default:
+                throw new FormatException($"Unknown cached value tag: {property.Name}");
+        }
+    }
+}
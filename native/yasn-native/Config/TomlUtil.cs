@@ -1,3 +1,5 @@
+using System.Collections.Concurrent;
+using System.Text.RegularExpressions;
 using Tomlyn;
 using Tomlyn.Model;
 using YasnNative.Core;
@@ -6,14 +8,38 @@ namespace YasnNative.Config;
 
 public static class TomlUtil
 {
+    private static readonly Regex UnquotedSemVerPattern = new(
+        @"(?m)^\s*version\s*=\s*\d+\.\d+\.\d+\s*(?:#.*)?$",
+        RegexOptions.Compiled | RegexOptions.CultureInvariant);
+
+    private static readonly ConcurrentDictionary<string, ParsedConfig> ParsedConfigs = new(StringComparer.Ordinal);
+    private static readonly ConcurrentDictionary<string, string?> ConfigLocations = new(StringComparer.Ordinal);
+
+    private sealed record ParsedConfig(long Ticks, long Length, TomlTable Table);
+
     public static TomlTable ReadToml(string path)
     {
+        var info = new FileInfo(path);
+        if (info.Exists && ParsedConfigs.TryGetValue(info.FullName, out var cached) &&
+            cached.Ticks == info.LastWriteTimeUtc.Ticks && cached.Length == info.Length)
+        {
+            return cached.Table;
+        }
+
+        if (info.Exists && ConfigCache.TryLoad(info) is { } persisted)
+        {
+            ParsedConfigs[info.FullName] = new ParsedConfig(info.LastWriteTimeUtc.Ticks, info.Length, persisted);
+            return persisted;
+        }
+
         var text = string.Empty;
         try
         {
             text = File.ReadAllText(path);
-            var model = Toml.ToModel(text);
-            return (TomlTable)model;
+            var table = string.IsNullOrWhiteSpace(text) ? new TomlTable() : Toml.ToModel(text);
+            ParsedConfigs[info.FullName] = new ParsedConfig(info.LastWriteTimeUtc.Ticks, info.Length, table);
+            ConfigCache.TryStore(info, table);
+            return table;
         }
         catch (Exception ex)
         {
@@ -30,36 +56,36 @@ public static class TomlUtil
 
     public static string? FindConfig(string startDirectory)
     {
-        var current = new DirectoryInfo(System.IO.Path.GetFullPath(startDirectory));
+        var start = System.IO.Path.GetFullPath(startDirectory);
+        if (ConfigLocations.TryGetValue(start, out var cached) && (cached is null || File.Exists(cached)))
+        {
+            return cached;
+        }
+
+        string? found = null;
+        var current = new DirectoryInfo(start);
         while (current is not null)
         {
             var candidate = System.IO.Path.Combine(current.FullName, "yasn.toml");
             if (File.Exists(candidate))
             {
-                return candidate;
+                found = candidate;
+                break;
             }
 
             current = current.Parent;
         }
 
-        return null;
+        ConfigLocations[start] = found;
+        return found;
     }
 
     public static string FindProjectRoot(string startDirectory)
     {
-        var current = new DirectoryInfo(System.IO.Path.GetFullPath(startDirectory));
-        while (current is not null)
-        {
-            var yasnToml = System.IO.Path.Combine(current.FullName, "yasn.toml");
-            if (File.Exists(yasnToml))
-            {
-                return current.FullName;
-            }
-
-            current = current.Parent;
-        }
-
-        return System.IO.Path.GetFullPath(startDirectory);
+        var configPath = FindConfig(startDirectory);
+        return configPath is null
+            ? System.IO.Path.GetFullPath(startDirectory)
+            : System.IO.Path.GetDirectoryName(configPath)!;
     }
 
     public static TomlTable GetTable(TomlTable table, string key, string? pathForError = null)
@@ -142,8 +168,6 @@ public static class TomlUtil
 
     private static bool LooksLikeUnquotedSemVer(string text)
     {
-        return System.Text.RegularExpressions.Regex.IsMatch(
-            text,
-            @"(?m)^\s*version\s*=\s*\d+\.\d+\.\d+\s*(?:#.*)?$");
+        return UnquotedSemVerPattern.IsMatch(text);
     }
 }
@@ -13,21 +13,11 @@ public sealed class Compiler
 
     public ProgramBC Compile(ProgramNode program)
     {
-        var globalSlots = CollectGlobalSlots(program);
-        var asyncFunctions = program.Statements
-            .OfType<FuncDeclStmt>()
-            .Where(stmt => stmt.IsAsync)
-            .Select(stmt => stmt.Name)
-            .ToHashSet(StringComparer.Ordinal);
-
-        var functions = new Dictionary<string, FunctionBC>(StringComparer.Ordinal);
-        foreach (var stmt in program.Statements)
-        {
-            if (stmt is not FuncDeclStmt fnStmt)
-            {
-                continue;
-            }
+        var globalSlots = CollectTopLevel(program, out var funcDecls, out var entryStmts, out var asyncFunctions);
 
+        var functions = new Dictionary<string, FunctionBC>(funcDecls.Count, StringComparer.Ordinal);
+        foreach (var fnStmt in funcDecls)
+        {
             var fnCompiler = new FunctionCompiler(
                 _path,
                 fnStmt.Name,
@@ -43,8 +33,8 @@ public sealed class Compiler
 
             if (!fnCompiler.EndsWithTerminal())
             {
-                fnCompiler.Emit("CONST_NULL");
-                fnCompiler.Emit("RET");
+                fnCompiler.Emit(OpCode.CONST_NULL);
+                fnCompiler.Emit(OpCode.RET);
             }
 
             functions[fnStmt.Name] = fnCompiler.Finish();
@@ -58,28 +48,23 @@ public sealed class Compiler
             isEntry: true,
             asyncFunctions);
 
-        foreach (var stmt in program.Statements)
+        foreach (var stmt in entryStmts)
         {
-            if (stmt is FuncDeclStmt)
-            {
-                continue;
-            }
-
             entryCompiler.CompileStmt(stmt);
         }
 
         if (functions.ContainsKey("main"))
         {
-            entryCompiler.Emit("CALL", "main", 0L);
+            entryCompiler.EmitCall("main", 0);
             if (asyncFunctions.Contains("main"))
             {
-                entryCompiler.Emit("CALL", "ожидать", 1L);
+                entryCompiler.EmitCall("ожидать", 1);
             }
 
-            entryCompiler.Emit("POP");
+            entryCompiler.Emit(OpCode.POP);
         }
 
-        entryCompiler.Emit("HALT");
+        entryCompiler.Emit(OpCode.HALT);
 
         return new ProgramBC
         {
@@ -89,14 +74,34 @@ public sealed class Compiler
         };
     }
 
-    private static Dictionary<string, int> CollectGlobalSlots(ProgramNode program)
+    private static Dictionary<string, int> CollectTopLevel(
+        ProgramNode program,
+        out List<FuncDeclStmt> funcDecls,
+        out List<Stmt> entryStmts,
+        out HashSet<string> asyncFunctions)
     {
         var slots = new Dictionary<string, int>(StringComparer.Ordinal);
+        funcDecls = [];
+        entryStmts = new List<Stmt>(program.Statements.Count);
+        asyncFunctions = new HashSet<string>(StringComparer.Ordinal);
         foreach (var stmt in program.Statements)
         {
-            if (stmt is VarDeclStmt varDecl && !slots.ContainsKey(varDecl.Name))
+            switch (stmt)
             {
-                slots[varDecl.Name] = slots.Count;
+                case FuncDeclStmt fnStmt:
+                    funcDecls.Add(fnStmt);
+                    if (fnStmt.IsAsync)
+                    {
+                        asyncFunctions.Add(fnStmt.Name);
+                    }
+                    break;
+                case VarDeclStmt varDecl:
+                    slots.TryAdd(varDecl.Name, slots.Count);
+                    entryStmts.Add(stmt);
+                    break;
+                default:
+                    entryStmts.Add(stmt);
+                    break;
             }
         }
 
@@ -118,10 +123,14 @@ public sealed class Compiler
         private readonly Dictionary<string, int> _globalSlots;
         private readonly bool _isEntry;
         private readonly HashSet<string> _asyncFunctions;
-        private readonly List<InstructionBC> _instructions = [];
+        private readonly InstructionBuffer _code = new();
         private readonly List<Dictionary<string, int>> _scopes = [];
+        private readonly List<List<int>> _scopeSlots = [];
+        private readonly Stack<int> _freeSlots = new();
+        private readonly Dictionary<string, int> _resolvedLocals = new(StringComparer.Ordinal);
         private readonly List<LoopContext> _loopStack = [];
         private int _nextSlot;
+        private bool _atEntryTop;
 
         public FunctionCompiler(
             string? path,
@@ -147,44 +156,61 @@ public sealed class Compiler
 
         public FunctionBC Finish()
         {
-            return new FunctionBC
-            {
-                Name = _name,
-                Params = _params,
-                LocalCount = _nextSlot,
-                Instructions = _instructions,
-            };
+            return Peephole.Optimize(_code.Build(_name, _params, _nextSlot));
         }
 
         public bool EndsWithTerminal()
         {
-            return _instructions.Count > 0 && (_instructions[^1].Op is "RET" or "HALT");
+            return _code.LastOp is OpCode.RET or OpCode.HALT;
         }
 
-        public int Emit(string op, params object?[] args)
+        public int Emit(OpCode op, int arg0 = 0, int arg1 = 0)
         {
-            _instructions.Add(new InstructionBC { Op = op, Args = [.. args] });
-            return _instructions.Count - 1;
+            return _code.Add(op, arg0, arg1);
+        }
+
+        public int EmitConst(object? value)
+        {
+            return _code.AddConst(value);
+        }
+
+        public int EmitCall(string name, int argc)
+        {
+            return _code.AddCall(name, argc);
         }
 
         private void Patch(int index, int value)
         {
-            _instructions[index].Args[0] = (long)value;
+            _code.PatchArg0(index, value);
         }
 
         private int CurrentIp()
         {
-            return _instructions.Count;
+            return _code.Count;
         }
 
         private void PushScope()
         {
             _scopes.Add(new Dictionary<string, int>(StringComparer.Ordinal));
+            _scopeSlots.Add([]);
+            _atEntryTop = _isEntry && _scopes.Count == 1;
         }
 
         private void PopScope()
         {
+            foreach (var name in _scopes[^1].Keys)
+            {
+                _resolvedLocals.Remove(name);
+            }
+
             _scopes.RemoveAt(_scopes.Count - 1);
+            foreach (var slot in _scopeSlots[^1])
+            {
+                _freeSlots.Push(slot);
+            }
+
+            _scopeSlots.RemoveAt(_scopeSlots.Count - 1);
+            _atEntryTop = _isEntry && _scopes.Count == 1;
         }
 
         private int DefineVar(string name, int line, int col)
@@ -197,22 +223,34 @@ public sealed class Compiler
 
             var slot = AllocateTemp();
             current[name] = slot;
+            _resolvedLocals[name] = slot;
             return slot;
         }
 
         private int AllocateTemp()
         {
-            var slot = _nextSlot;
-            _nextSlot++;
+            if (!_freeSlots.TryPop(out var slot))
+            {
+                slot = _nextSlot;
+                _nextSlot++;
+            }
+
+            _scopeSlots[^1].Add(slot);
             return slot;
         }
 
         private int? ResolveLocalVar(string name)
         {
+            if (_resolvedLocals.TryGetValue(name, out var cached))
+            {
+                return cached;
+            }
+
             for (var i = _scopes.Count - 1; i >= 0; i--)
             {
                 if (_scopes[i].TryGetValue(name, out var slot))
                 {
+                    _resolvedLocals[name] = slot;
                     return slot;
                 }
             }
@@ -240,24 +278,16 @@ public sealed class Compiler
         {
             switch (stmt)
             {
-                case ImportAllStmt:
-                case ImportFromStmt:
-                    throw YasnException.At(
-                        "Операторы подключения пока не поддерживаются в нативном компиляторе",
-                        stmt.Line,
-                        stmt.Col,
-                        _path);
-
                 case VarDeclStmt varDecl:
                     CompileExpr(varDecl.Value);
-                    if (_isEntry && _scopes.Count == 1 && _globalSlots.TryGetValue(varDecl.Name, out var globalSlot))
+                    if (_atEntryTop && _globalSlots.TryGetValue(varDecl.Name, out var globalSlot))
                     {
-                        Emit("GSTORE", (long)globalSlot);
+                        Emit(OpCode.GSTORE, globalSlot);
                     }
                     else
                     {
                         var slot = DefineVar(varDecl.Name, varDecl.Line, varDecl.Col);
-                        Emit("STORE", (long)slot);
+                        Emit(OpCode.STORE, slot);
                     }
 
                     return;
@@ -266,7 +296,7 @@ public sealed class Compiler
                 {
                     CompileExpr(assign.Value);
                     var place = ResolveVar(assign.Name, assign.Line, assign.Col);
-                    Emit(place.Place == "local" ? "STORE" : "GSTORE", (long)place.Slot);
+                    Emit(place.Place == "local" ? OpCode.STORE : OpCode.GSTORE, place.Slot);
                     return;
                 }
 
@@ -274,18 +304,18 @@ public sealed class Compiler
                     CompileExpr(indexAssign.Target);
                     CompileExpr(indexAssign.Index);
                     CompileExpr(indexAssign.Value);
-                    Emit("INDEX_SET");
-                    Emit("POP");
+                    Emit(OpCode.INDEX_SET);
+                    Emit(OpCode.POP);
                     return;
 
                 case ExprStmt exprStmt:
                     CompileExpr(exprStmt.Expr);
-                    Emit("POP");
+                    Emit(OpCode.POP);
                     return;
 
                 case ReturnStmt ret:
                     CompileExpr(ret.Value);
-                    Emit("RET");
+                    Emit(OpCode.RET);
                     return;
 
                 case BreakStmt:
@@ -294,7 +324,7 @@ public sealed class Compiler
                         throw YasnException.At("'прервать' допустим только внутри цикла", stmt.Line, stmt.Col, _path);
                     }
 
-                    var breakJmp = Emit("JMP", -1L);
+                    var breakJmp = Emit(OpCode.JMP, -1);
                     _loopStack[^1].BreakJumps.Add(breakJmp);
                     return;
 
@@ -304,14 +334,14 @@ public sealed class Compiler
                         throw YasnException.At("'продолжить' допустим только внутри цикла", stmt.Line, stmt.Col, _path);
                     }
 
-                    var continueJmp = Emit("JMP", -1L);
+                    var continueJmp = Emit(OpCode.JMP, -1);
                     _loopStack[^1].ContinueJumps.Add(continueJmp);
                     return;
 
                 case IfStmt ifStmt:
                 {
                     CompileExpr(ifStmt.Condition);
-                    var jumpFalse = Emit("JMP_FALSE", -1L);
+                    var jumpFalse = Emit(OpCode.JMP_FALSE, -1);
 
                     PushScope();
                     foreach (var inner in ifStmt.ThenBody)
@@ -323,7 +353,7 @@ public sealed class Compiler
 
                     if (ifStmt.ElseBody is not null)
                     {
-                        var jumpEnd = Emit("JMP", -1L);
+                        var jumpEnd = Emit(OpCode.JMP, -1);
                         Patch(jumpFalse, CurrentIp());
                         PushScope();
                         foreach (var inner in ifStmt.ElseBody)
@@ -346,7 +376,7 @@ public sealed class Compiler
                 {
                     var loopStart = CurrentIp();
                     CompileExpr(whileStmt.Condition);
-                    var jumpEnd = Emit("JMP_FALSE", -1L);
+                    var jumpEnd = Emit(OpCode.JMP_FALSE, -1);
 
                     _loopStack.Add(new LoopContext());
                     PushScope();
@@ -364,7 +394,7 @@ public sealed class Compiler
                         Patch(jump, loopStart);
                     }
 
-                    Emit("JMP", (long)loopStart);
+                    Emit(OpCode.JMP, loopStart);
                     var endIp = CurrentIp();
                     Patch(jumpEnd, endIp);
                     foreach (var jump in ctx.BreakJumps)
@@ -378,29 +408,15 @@ public sealed class Compiler
                 case ForStmt forStmt:
                 {
                     PushScope();
-                    var iterSlot = AllocateTemp();
-                    var idxSlot = AllocateTemp();
-                    var lenSlot = AllocateTemp();
+                    var stateSlot = AllocateTemp();
                     var loopVarSlot = DefineVar(forStmt.VarName, forStmt.Line, forStmt.Col);
 
                     CompileExpr(forStmt.Iterable);
-                    Emit("STORE", (long)iterSlot);
-                    Emit("CONST", 0L);
-                    Emit("STORE", (long)idxSlot);
-                    Emit("LOAD", (long)iterSlot);
-                    Emit("LEN");
-                    Emit("STORE", (long)lenSlot);
+                    Emit(OpCode.FOR_PREP, stateSlot);
 
                     var loopStart = CurrentIp();
-                    Emit("LOAD", (long)idxSlot);
-                    Emit("LOAD", (long)lenSlot);
-                    Emit("LT");
-                    var jumpEnd = Emit("JMP_FALSE", -1L);
-
-                    Emit("LOAD", (long)iterSlot);
-                    Emit("LOAD", (long)idxSlot);
-                    Emit("INDEX_GET");
-                    Emit("STORE", (long)loopVarSlot);
+                    var jumpEnd = Emit(OpCode.FOR_ITER, -1, stateSlot);
+                    Emit(OpCode.STORE, loopVarSlot);
 
                     _loopStack.Add(new LoopContext());
                     foreach (var inner in forStmt.Body)
@@ -411,17 +427,12 @@ public sealed class Compiler
                     var ctx = _loopStack[^1];
                     _loopStack.RemoveAt(_loopStack.Count - 1);
 
-                    var incrementStart = CurrentIp();
                     foreach (var jump in ctx.ContinueJumps)
                     {
-                        Patch(jump, incrementStart);
+                        Patch(jump, loopStart);
                     }
 
-                    Emit("LOAD", (long)idxSlot);
-                    Emit("CONST", 1L);
-                    Emit("ADD");
-                    Emit("STORE", (long)idxSlot);
-                    Emit("JMP", (long)loopStart);
+                    Emit(OpCode.JMP, loopStart);
 
                     var endIp = CurrentIp();
                     Patch(jumpEnd, endIp);
@@ -437,6 +448,14 @@ public sealed class Compiler
                 case FuncDeclStmt fn:
                     throw YasnException.At("Вложенные функции не поддерживаются", fn.Line, fn.Col, _path);
 
+                case ImportAllStmt:
+                case ImportFromStmt:
+                    throw YasnException.At(
+                        "Операторы подключения пока не поддерживаются в нативном компиляторе",
+                        stmt.Line,
+                        stmt.Col,
+                        _path);
+
                 default:
                     throw YasnException.At("Неизвестный тип оператора для компиляции", stmt.Line, stmt.Col, _path);
             }
@@ -447,20 +466,58 @@ public sealed class Compiler
             switch (expr)
             {
                 case LiteralExpr literal:
-                    Emit("CONST", literal.Value);
+                    EmitConst(literal.Value);
                     return;
 
                 case IdentifierExpr ident:
                 {
                     var place = ResolveVar(ident.Name, ident.Line, ident.Col);
-                    Emit(place.Place == "local" ? "LOAD" : "GLOAD", (long)place.Slot);
+                    Emit(place.Place == "local" ? OpCode.LOAD : OpCode.GLOAD, place.Slot);
                     return;
                 }
 
+                case BinaryExpr { Op: "и" } andExpr:
+                    CompileShortCircuitAnd(andExpr);
+                    return;
+
+                case BinaryExpr { Op: "или" } orExpr:
+                    CompileShortCircuitOr(orExpr);
+                    return;
+
+                case BinaryExpr binary:
+                    CompileBinaryChain(binary);
+                    return;
+
+                case CallExpr call:
+                    if (call.Callee is not IdentifierExpr calleeIdent)
+                    {
+                        throw YasnException.At("Вызов возможен только по имени функции", call.Line, call.Col, _path);
+                    }
+
+                    if (_asyncFunctions.Contains(calleeIdent.Name))
+                    {
+                        EmitConst(calleeIdent.Name);
+                        foreach (var arg in call.Args)
+                        {
+                            CompileExpr(arg);
+                        }
+
+                        EmitCall("запустить", call.Args.Count + 1);
+                        return;
+                    }
+
+                    foreach (var arg in call.Args)
+                    {
+                        CompileExpr(arg);
+                    }
+
+                    EmitCall(calleeIdent.Name, call.Args.Count);
+                    return;
+
                 case MemberExpr member:
                     CompileExpr(member.Target);
-                    Emit("CONST", member.Member);
-                    Emit("INDEX_GET");
+                    EmitConst(member.Member);
+                    Emit(OpCode.INDEX_GET);
                     return;
 
                 case ListLiteralExpr list:
@@ -469,7 +526,7 @@ public sealed class Compiler
                         CompileExpr(item);
                     }
 
-                    Emit("MAKE_LIST", (long)list.Elements.Count);
+                    Emit(OpCode.MAKE_LIST, list.Elements.Count);
                     return;
 
                 case DictLiteralExpr dict:
@@ -479,26 +536,32 @@ public sealed class Compiler
                         CompileExpr(value);
                     }
 
-                    Emit("MAKE_DICT", (long)dict.Entries.Count);
+                    Emit(OpCode.MAKE_DICT, dict.Entries.Count);
                     return;
 
                 case IndexExpr indexExpr:
                     CompileExpr(indexExpr.Target);
                     CompileExpr(indexExpr.Index);
-                    Emit("INDEX_GET");
+                    Emit(OpCode.INDEX_GET);
                     return;
 
                 case UnaryExpr unary:
+                    if (TryFoldConstant(unary, out var foldedUnary))
+                    {
+                        EmitConst(foldedUnary);
+                        return;
+                    }
+
                     CompileExpr(unary.Operand);
                     if (unary.Op == "не")
                     {
-                        Emit("NOT");
+                        Emit(OpCode.NOT);
                         return;
                     }
 
                     if (unary.Op == "-")
                     {
-                        Emit("NEG");
+                        Emit(OpCode.NEG);
                         return;
                     }
 
@@ -506,90 +569,192 @@ public sealed class Compiler
 
                 case AwaitExpr awaitExpr:
                     CompileExpr(awaitExpr.Operand);
-                    Emit("CALL", "ожидать", 1L);
+                    EmitCall("ожидать", 1);
                     return;
 
-                case BinaryExpr binary:
-                    if (binary.Op == "и")
+                default:
+                    throw YasnException.At("Неизвестный тип выражения для компиляции", expr.Line, expr.Col, _path);
+            }
+        }
+
+        private static bool TryFoldConstant(Expr expr, out object? value)
+        {
+            value = null;
+            switch (expr)
+            {
+                case LiteralExpr literal:
+                    value = literal.Value;
+                    return true;
+
+                case UnaryExpr { Op: "-" } unary when TryFoldConstant(unary.Operand, out var operand):
+                    switch (operand)
                     {
-                        CompileShortCircuitAnd(binary);
-                        return;
+                        case long l:
+                            value = unchecked(-l);
+                            return true;
+                        case double d:
+                            value = -d;
+                            return true;
+                        default:
+                            return false;
                     }
 
-                    if (binary.Op == "или")
+                case UnaryExpr { Op: "не" } unary when TryFoldConstant(unary.Operand, out var operand):
+                    switch (operand)
                     {
-                        CompileShortCircuitOr(binary);
-                        return;
+                        case null:
+                            value = true;
+                            return true;
+                        case bool b:
+                            value = !b;
+                            return true;
+                        case long l:
+                            value = l == 0;
+                            return true;
+                        case double d:
+                            value = d == 0.0;
+                            return true;
+                        case string s:
+                            value = s.Length == 0;
+                            return true;
+                        default:
+                            return false;
                     }
 
-                    CompileExpr(binary.Left);
-                    CompileExpr(binary.Right);
+                case BinaryExpr binary when binary.Op is not ("и" or "или" or "/" or "%")
+                    && TryFoldConstant(binary.Left, out var left)
+                    && TryFoldConstant(binary.Right, out var right):
+                    return TryFoldBinary(binary.Op, left, right, out value);
 
-                    var mappedOp = binary.Op switch
-                    {
-                        "+" => "ADD",
-                        "-" => "SUB",
-                        "*" => "MUL",
-                        "/" => "DIV",
-                        "%" => "MOD",
-                        "==" => "EQ",
-                        "!=" => "NE",
-                        "<" => "LT",
-                        "<=" => "LE",
-                        ">" => "GT",
-                        ">=" => "GE",
-                        _ => null,
-                    };
-
-                    if (mappedOp is null)
-                    {
-                        throw YasnException.At($"Неизвестный бинарный оператор: {binary.Op}", binary.Line, binary.Col, _path);
-                    }
+                default:
+                    return false;
+            }
+        }
 
-                    Emit(mappedOp);
-                    return;
+        private static bool TryFoldBinary(string op, object? left, object? right, out object? value)
+        {
+            value = null;
+            if (left is long li && right is long ri)
+            {
+                value = op switch
+                {
+                    "+" => unchecked(li + ri),
+                    "-" => unchecked(li - ri),
+                    "*" => unchecked(li * ri),
+                    _ => null,
+                };
+                if (value is not null)
+                {
+                    return true;
+                }
+            }
 
-                case CallExpr call:
-                    if (call.Callee is not IdentifierExpr calleeIdent)
-                    {
-                        throw YasnException.At("Вызов возможен только по имени функции", call.Line, call.Col, _path);
-                    }
+            if (left is long or double && right is long or double)
+            {
+                var ld = Convert.ToDouble(left, System.Globalization.CultureInfo.InvariantCulture);
+                var rd = Convert.ToDouble(right, System.Globalization.CultureInfo.InvariantCulture);
+                value = op switch
+                {
+                    "+" => ld + rd,
+                    "-" => ld - rd,
+                    "*" => ld * rd,
+                    "==" => ld == rd,
+                    "!=" => ld != rd,
+                    "<" => ld.CompareTo(rd) < 0,
+                    "<=" => ld.CompareTo(rd) <= 0,
+                    ">" => ld.CompareTo(rd) > 0,
+                    ">=" => ld.CompareTo(rd) >= 0,
+                    _ => null,
+                };
+                return value is not null;
+            }
 
-                    if (_asyncFunctions.Contains(calleeIdent.Name))
-                    {
-                        Emit("CONST", calleeIdent.Name);
-                        foreach (var arg in call.Args)
-                        {
-                            CompileExpr(arg);
-                        }
+            if (left is string ls && right is string rs)
+            {
+                value = op switch
+                {
+                    "+" => ls + rs,
+                    "==" => ls == rs,
+                    "!=" => ls != rs,
+                    "<" => string.CompareOrdinal(ls, rs) < 0,
+                    "<=" => string.CompareOrdinal(ls, rs) <= 0,
+                    ">" => string.CompareOrdinal(ls, rs) > 0,
+                    ">=" => string.CompareOrdinal(ls, rs) >= 0,
+                    _ => null,
+                };
+                return value is not null;
+            }
 
-                        Emit("CALL", "запустить", (long)(call.Args.Count + 1));
-                        return;
-                    }
+            return false;
+        }
 
-                    foreach (var arg in call.Args)
+        private void CompileBinaryChain(BinaryExpr root)
+        {
+            var spine = new List<BinaryExpr>();
+            Expr leaf = root;
+            while (leaf is BinaryExpr binary && binary.Op is not ("и" or "или"))
+            {
+                spine.Add(binary);
+                leaf = binary.Left;
+            }
+
+            var folded = TryFoldConstant(leaf, out var pending);
+            if (!folded)
+            {
+                CompileExpr(leaf);
+            }
+
+            for (var i = spine.Count - 1; i >= 0; i--)
+            {
+                var binary = spine[i];
+                if (folded)
+                {
+                    if (binary.Op is not ("/" or "%")
+                        && TryFoldConstant(binary.Right, out var right)
+                        && TryFoldBinary(binary.Op, pending, right, out var value))
                     {
-                        CompileExpr(arg);
+                        pending = value;
+                        continue;
                     }
 
-                    Emit("CALL", calleeIdent.Name, (long)call.Args.Count);
-                    return;
+                    EmitConst(pending);
+                    folded = false;
+                }
 
-                default:
-                    throw YasnException.At("Неизвестный тип выражения для компиляции", expr.Line, expr.Col, _path);
+                CompileExpr(binary.Right);
+                Emit(binary.Op switch
+                {
+                    "+" => OpCode.ADD,
+                    "-" => OpCode.SUB,
+                    "*" => OpCode.MUL,
+                    "/" => OpCode.DIV,
+                    "%" => OpCode.MOD,
+                    "==" => OpCode.EQ,
+                    "!=" => OpCode.NE,
+                    "<" => OpCode.LT,
+                    "<=" => OpCode.LE,
+                    ">" => OpCode.GT,
+                    ">=" => OpCode.GE,
+                    _ => throw YasnException.At($"Неизвестный бинарный оператор: {binary.Op}", binary.Line, binary.Col, _path),
+                });
+            }
+
+            if (folded)
+            {
+                EmitConst(pending);
             }
         }
 
         private void CompileShortCircuitAnd(BinaryExpr expr)
         {
             CompileExpr(expr.Left);
-            var leftFalse = Emit("JMP_FALSE", -1L);
+            var leftFalse = Emit(OpCode.JMP_FALSE, -1);
             CompileExpr(expr.Right);
-            var rightFalse = Emit("JMP_FALSE", -1L);
-            Emit("CONST", true);
-            var jumpEnd = Emit("JMP", -1L);
+            var rightFalse = Emit(OpCode.JMP_FALSE, -1);
+            EmitConst(true);
+            var jumpEnd = Emit(OpCode.JMP, -1);
             var falseLabel = CurrentIp();
-            Emit("CONST", false);
+            EmitConst(false);
             var endLabel = CurrentIp();
             Patch(leftFalse, falseLabel);
             Patch(rightFalse, falseLabel);
@@ -599,24 +764,17 @@ public sealed class Compiler
         private void CompileShortCircuitOr(BinaryExpr expr)
         {
             CompileExpr(expr.Left);
-            var checkRight = Emit("JMP_FALSE", -1L);
-            Emit("CONST", true);
-            var jumpEndLeftTrue = Emit("JMP", -1L);
-
-            var rightLabel = CurrentIp();
-            Patch(checkRight, rightLabel);
+            var leftTrue = Emit(OpCode.JMP_TRUE, -1);
             CompileExpr(expr.Right);
-            var rightFalse = Emit("JMP_FALSE", -1L);
-            Emit("CONST", true);
-            var jumpEndRightTrue = Emit("JMP", -1L);
-
-            var falseLabel = CurrentIp();
-            Emit("CONST", false);
+            var rightTrue = Emit(OpCode.JMP_TRUE, -1);
+            EmitConst(false);
+            var jumpEnd = Emit(OpCode.JMP, -1);
+            var trueLabel = CurrentIp();
+            EmitConst(true);
             var endLabel = CurrentIp();
-
-            Patch(rightFalse, falseLabel);
-            Patch(jumpEndLeftTrue, endLabel);
-            Patch(jumpEndRightTrue, endLabel);
+            Patch(leftTrue, trueLabel);
+            Patch(rightTrue, trueLabel);
+            Patch(jumpEnd, endLabel);
         }
     }
 }
@@ -1,4 +1,5 @@
-﻿using System.Text;
+﻿using System.Collections.Concurrent;
+using System.Text;
 
 namespace YasnNative.Core;
 
@@ -30,19 +31,22 @@ public static class Lexer
         "ждать",
     };
 
-    private static readonly HashSet<string> TwoCharTokens = new(StringComparer.Ordinal)
+    private const string SingleCharTokens = "():,[]{}+-*/%=<>.|?";
+
+    private enum CharClass : byte
     {
-        "->",
-        "==",
-        "!=",
-        "<=",
-        ">=",
-    };
+        Other,
+        Space,
+        Hash,
+        Quote,
+        Digit,
+        IdentStart,
+        Symbol,
+    }
 
-    private static readonly HashSet<char> SingleCharTokens =
-    [
-        '(', ')', ':', ',', '[', ']', '{', '}', '+', '-', '*', '/', '%', '=', '<', '>', '.', '|', '?',
-    ];
+    private static readonly CharClass[] AsciiClasses = BuildAsciiClasses();
+
+    private static readonly string?[] SymbolKinds = BuildSymbolKinds();
 
     private static readonly HashSet<char> OpeningBrackets = ['(', '[', '{'];
 
@@ -53,21 +57,23 @@ public static class Lexer
         ['}'] = '{',
     };
 
+    private const int MaxInternedStringLength = 32;
+
+    // Identifiers are shared across files so names linked between modules compare by reference.
+    private static readonly ConcurrentDictionary<string, string> SharedIdentifiers = new(StringComparer.Ordinal);
+
+    private static readonly object[] SmallIntBoxes = Enumerable.Range(0, 256).Select(static value => (object)(long)value).ToArray();
+
     public static List<Token> Tokenize(string source, string? path = null)
     {
-        var text = source.Replace("\r\n", "\n", StringComparison.Ordinal).Replace('\r', '\n');
-        if (text.StartsWith('\uFEFF'))
-        {
-            text = text[1..];
-        }
-
-        var lines = text.Split('\n');
+        var lines = SplitLines(source);
         var tokens = new List<Token>();
+        var interned = new Dictionary<string, string>(StringComparer.Ordinal);
         var indentStack = new Stack<int>();
-        indentStack.Push(0);
+        var indentTop = 0;
         var bracketStack = new Stack<(char Open, int Line, int Col)>();
 
-        for (var lineIndex = 0; lineIndex < lines.Length; lineIndex++)
+        for (var lineIndex = 0; lineIndex < lines.Count; lineIndex++)
         {
             var lineNo = lineIndex + 1;
             var line = lines[lineIndex];
@@ -91,20 +97,21 @@ public static class Lexer
 
             if (bracketStack.Count == 0)
             {
-                if (spaceCount > indentStack.Peek())
+                if (spaceCount > indentTop)
                 {
-                    indentStack.Push(spaceCount);
+                    indentStack.Push(indentTop);
+                    indentTop = spaceCount;
                     tokens.Add(new Token("INDENT", null, lineNo, 1));
                 }
-                else if (spaceCount < indentStack.Peek())
+                else if (spaceCount < indentTop)
                 {
-                    while (spaceCount < indentStack.Peek())
+                    while (spaceCount < indentTop)
                     {
-                        indentStack.Pop();
+                        indentTop = indentStack.Pop();
                         tokens.Add(new Token("DEDENT", null, lineNo, 1));
                     }
 
-                    if (spaceCount != indentStack.Peek())
+                    if (spaceCount != indentTop)
                     {
                         throw YasnException.At("Некорректный уровень отступа", lineNo, 1, path);
                     }
@@ -116,30 +123,27 @@ public static class Lexer
             {
                 var ch = line[idx];
                 var col = idx + 1;
+                var cls = ch < AsciiClasses.Length ? AsciiClasses[ch] : ClassifyNonAscii(ch);
 
-                if (ch == ' ')
+                if (cls == CharClass.Space)
                 {
                     idx++;
                     continue;
                 }
 
-                if (ch == '#')
+                if (cls == CharClass.Hash)
                 {
                     break;
                 }
 
-                if (idx + 1 < line.Length)
+                if (idx + 1 < line.Length && MatchTwoCharToken(ch, line[idx + 1]) is { } pair)
                 {
-                    var pair = line.Substring(idx, 2);
-                    if (TwoCharTokens.Contains(pair))
-                    {
-                        tokens.Add(new Token(pair, pair, lineNo, col));
-                        idx += 2;
-                        continue;
-                    }
+                    tokens.Add(new Token(pair, pair, lineNo, col));
+                    idx += 2;
+                    continue;
                 }
 
-                if (SingleCharTokens.Contains(ch))
+                if (cls == CharClass.Symbol)
                 {
                     if (OpeningBrackets.Contains(ch))
                     {
@@ -163,63 +167,66 @@ public static class Lexer
                         }
                     }
 
-                    var tokenKind = ch.ToString();
+                    var tokenKind = SymbolKinds[ch]!;
                     tokens.Add(new Token(tokenKind, tokenKind, lineNo, col));
                     idx++;
                     continue;
                 }
 
-                if (ch == '"')
+                if (cls == CharClass.Quote)
                 {
                     idx++;
-                    var builder = new StringBuilder();
-                    var escaped = false;
+                    var segment = idx;
+                    StringBuilder? builder = null;
+                    string? value = null;
                     while (idx < line.Length)
                     {
-                        var current = line[idx];
-                        if (escaped)
+                        var stop = line.AsSpan(idx).IndexOfAny('"', '\\');
+                        if (stop < 0)
                         {
-                            builder.Append(current switch
-                            {
-                                'n' => '\n',
-                                't' => '\t',
-                                'r' => '\r',
-                                '"' => '"',
-                                '\\' => '\\',
-                                _ => throw YasnException.At($"Неизвестная escape-последовательность: \\{current}", lineNo, idx + 1, path),
-                            });
-                            escaped = false;
-                            idx++;
-                            continue;
+                            break;
                         }
 
-                        if (current == '\\')
+                        idx += stop;
+                        if (line[idx] == '"')
                         {
-                            escaped = true;
+                            value = builder is null ? line[segment..idx] : builder.Append(line, segment, idx - segment).ToString();
                             idx++;
-                            continue;
+                            break;
                         }
 
-                        if (current == '"')
+                        builder ??= new StringBuilder();
+                        builder.Append(line, segment, idx - segment);
+                        idx++;
+                        if (idx >= line.Length)
                         {
-                            idx++;
-                            tokens.Add(new Token("STRING", builder.ToString(), lineNo, col));
                             break;
                         }
 
-                        builder.Append(current);
+                        var current = line[idx];
+                        builder.Append(current switch
+                        {
+                            'n' => '\n',
+                            't' => '\t',
+                            'r' => '\r',
+                            '"' => '"',
+                            '\\' => '\\',
+                            _ => throw YasnException.At($"Неизвестная escape-последовательность: \\{current}", lineNo, idx + 1, path),
+                        });
                         idx++;
+                        segment = idx;
                     }
 
-                    if (idx >= line.Length && (tokens.Count == 0 || tokens[^1].Kind != "STRING" || tokens[^1].Line != lineNo || tokens[^1].Col != col))
+                    if (value is null)
                     {
                         throw YasnException.At("Незакрытая строка", lineNo, col, path);
                     }
 
+                    tokens.Add(new Token("STRING", value.Length <= MaxInternedStringLength ? Intern(interned, value) : value, lineNo, col));
                     continue;
                 }
 
-                if (char.IsDigit(ch))
+                if (cls == CharClass.Digit)
                 {
                     var start = idx;
                     while (idx < line.Length && char.IsDigit(line[idx]))
@@ -252,29 +259,37 @@ public static class Lexer
                     }
                     else
                     {
-                        tokens.Add(new Token("INT", long.Parse(raw, System.Globalization.CultureInfo.InvariantCulture), lineNo, start + 1));
+                        var value = long.Parse(raw, System.Globalization.CultureInfo.InvariantCulture);
+                        tokens.Add(new Token("INT", value < SmallIntBoxes.Length ? SmallIntBoxes[value] : value, lineNo, start + 1));
                     }
 
                     continue;
                 }
 
-                if (IsIdentStart(ch))
+                if (cls == CharClass.IdentStart)
                 {
                     var start = idx;
                     idx++;
-                    while (idx < line.Length && IsIdentPart(line[idx]))
+                    while (idx < line.Length)
                     {
+                        var next = line[idx];
+                        var nextClass = next < AsciiClasses.Length ? AsciiClasses[next] : ClassifyNonAscii(next);
+                        if (nextClass is not (CharClass.IdentStart or CharClass.Digit))
+                        {
+                            break;
+                        }
+
                         idx++;
                     }
 
                     var ident = line[start..idx];
-                    if (Keywords.Contains(ident))
+                    if (Keywords.TryGetValue(ident, out var keyword))
                     {
-                        tokens.Add(new Token(ident, ident, lineNo, start + 1));
+                        tokens.Add(new Token(keyword, keyword, lineNo, start + 1));
                     }
                     else
                     {
-                        tokens.Add(new Token("IDENT", ident, lineNo, start + 1));
+                        tokens.Add(new Token("IDENT", InternIdentifier(interned, ident), lineNo, start + 1));
                     }
 
                     continue;
@@ -295,13 +310,13 @@ public static class Lexer
             throw YasnException.At($"Незакрытая скобка: '{top.Open}'", top.Line, top.Col, path);
         }
 
-        var eofLine = lines.Length + 1;
+        var eofLine = lines.Count + 1;
         if (tokens.Count > 0 && tokens[^1].Kind != "NEWLINE")
         {
             tokens.Add(new Token("NEWLINE", null, eofLine, 1));
         }
 
-        while (indentStack.Count > 1)
+        while (indentStack.Count > 0)
         {
             indentStack.Pop();
             tokens.Add(new Token("DEDENT", null, eofLine, 1));
@@ -311,13 +326,109 @@ public static class Lexer
         return tokens;
     }
 
-    private static bool IsIdentStart(char ch)
+    private static List<string> SplitLines(string source)
     {
-        return ch == '_' || char.IsLetter(ch);
+        var lines = new List<string>();
+        var start = source.StartsWith('\uFEFF') ? 1 : 0;
+        while (true)
+        {
+            var end = source.AsSpan(start).IndexOfAny('\r', '\n');
+            if (end < 0)
+            {
+                lines.Add(source[start..]);
+                return lines;
+            }
+
+            end += start;
+            lines.Add(source[start..end]);
+            start = source[end] == '\r' && end + 1 < source.Length && source[end + 1] == '\n' ? end + 2 : end + 1;
+        }
+    }
+
+    private static string Intern(Dictionary<string, string> pool, string value)
+    {
+        if (pool.TryGetValue(value, out var shared))
+        {
+            return shared;
+        }
+
+        pool.Add(value, value);
+        return value;
+    }
+
+    private static string InternIdentifier(Dictionary<string, string> pool, string value)
+    {
+        if (pool.TryGetValue(value, out var local))
+        {
+            return local;
+        }
+
+        var shared = SharedIdentifiers.GetOrAdd(value, value);
+        pool.Add(shared, shared);
+        return shared;
     }
 
-    private static bool IsIdentPart(char ch)
+    private static CharClass[] BuildAsciiClasses()
     {
-        return IsIdentStart(ch) || char.IsDigit(ch);
+        var classes = new CharClass[128];
+        for (var i = 0; i < classes.Length; i++)
+        {
+            var ch = (char)i;
+            classes[i] = ch switch
+            {
+                ' ' => CharClass.Space,
+                '#' => CharClass.Hash,
+                '"' => CharClass.Quote,
+                _ when char.IsDigit(ch) => CharClass.Digit,
+                _ when IsIdentStart(ch) => CharClass.IdentStart,
+                _ when SingleCharTokens.Contains(ch) => CharClass.Symbol,
+                _ => CharClass.Other,
+            };
+        }
+
+        return classes;
+    }
+
+    private static string?[] BuildSymbolKinds()
+    {
+        var kinds = new string?[128];
+        foreach (var ch in SingleCharTokens)
+        {
+            kinds[ch] = ch.ToString();
+        }
+
+        return kinds;
+    }
+
+    private static CharClass ClassifyNonAscii(char ch)
+    {
+        if (char.IsDigit(ch))
+        {
+            return CharClass.Digit;
+        }
+
+        return IsIdentStart(ch) ? CharClass.IdentStart : CharClass.Other;
+    }
+
+    private static string? MatchTwoCharToken(char first, char second)
+    {
+        if (second != '=')
+        {
+            return first == '-' && second == '>' ? "->" : null;
+        }
+
+        return first switch
+        {
+            '=' => "==",
+            '!' => "!=",
+            '<' => "<=",
+            '>' => ">=",
+            _ => null,
+        };
+    }
+
+    private static bool IsIdentStart(char ch)
+    {
+        return ch == '_' || char.IsLetter(ch);
     }
 }
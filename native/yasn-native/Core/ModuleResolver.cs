@@ -1,5 +1,8 @@
+using System.Collections.Concurrent;
+using System.Runtime.CompilerServices;
 using System.Security.Cryptography;
 using System.Text;
+using Tomlyn.Model;
 using YasnNative.Config;
 
 namespace YasnNative.Core;
@@ -20,17 +23,54 @@ public sealed class ResolvedModule
     public required Dictionary<string, Stmt> Exports { get; init; }
 
     public required string Tag { get; init; }
+
+    public required Dictionary<string, Stmt> Declarations { get; init; }
+
+    internal ConcurrentDictionary<string, HashSet<string>> DeclDependencies { get; } = new(StringComparer.Ordinal);
+
+    internal long SourceTicks { get; init; }
+
+    internal long SourceLength { get; init; }
+
+    internal ModuleConfig? Config { get; init; }
+
+    internal List<ResolvedModule> Imports { get; init; } = [];
+
+    internal HashSet<string> MissingProbes { get; init; } = [];
 }
 
 public sealed class ModuleResolver
 {
+    private static readonly ConcurrentDictionary<string, ParsedModule> ParsedModules = new(StringComparer.OrdinalIgnoreCase);
+    private static readonly ConcurrentDictionary<string, string> ModuleTags = new(StringComparer.OrdinalIgnoreCase);
+    private static readonly ConditionalWeakTable<TomlTable, ModuleConfig> ModuleConfigs = new();
+    private static readonly ConcurrentDictionary<(string Path, string ProjectRoot), ResolvedModule> SharedResolved = new();
+    private static readonly ModuleConfig NoConfig = new();
+
     private readonly Dictionary<string, ResolvedModule> _resolved = new(StringComparer.OrdinalIgnoreCase);
     private readonly List<string> _resolvingStack = [];
-    private readonly Dictionary<string, string> _tags = new(StringComparer.OrdinalIgnoreCase);
+    private readonly HashSet<string> _resolvingSet = new(StringComparer.OrdinalIgnoreCase);
+    private readonly List<List<ResolvedModule>> _importFrames = [];
+    private readonly List<HashSet<string>> _probeFrames = [];
+    private readonly Dictionary<string, bool> _fileExists = new(StringComparer.Ordinal);
+    private readonly Dictionary<string, Task<ParsedModule>> _pendingParses = new(StringComparer.OrdinalIgnoreCase);
+
+    private sealed record ParsedModule(long Ticks, long Length, ProgramNode Program);
 
     private string? _projectRoot;
     private string? _depsRoot;
-    private ModuleConfig _config = new();
+    private List<string>? _depDirs;
+    private ModuleConfig _config = NoConfig;
+
+    public IEnumerable<string> ResolvedPaths => _resolved.Keys;
+
+    // Stamps are captured before each module's bytes are read; the entry comes from the caller and has none.
+    internal IEnumerable<(string Path, long Ticks, long Length)> SourceStamps => _resolved.Values
+        .Where(static module => module.SourceTicks != 0)
+        .Select(static module => (module.Path, module.SourceTicks, module.SourceLength));
+
+    // Candidates probed before each import hit; creating one of them would change resolution.
+    internal IEnumerable<string> MissingProbes => _resolved.Values.SelectMany(static module => module.MissingProbes).Distinct(StringComparer.OrdinalIgnoreCase);
 
     public ProgramNode ResolveEntry(string source, string? entryPath)
     {
@@ -51,37 +91,26 @@ public sealed class ModuleResolver
             ? System.IO.Path.GetFullPath(entryPath)
             : System.IO.Path.GetDirectoryName(System.IO.Path.GetFullPath(entryPath)) ?? Directory.GetCurrentDirectory();
 
-        var current = new DirectoryInfo(baseDir);
-        string? foundProject = null;
-        string? foundConfig = null;
-
-        while (current is not null)
-        {
-            var yasnToml = System.IO.Path.Combine(current.FullName, "yasn.toml");
-            if (File.Exists(yasnToml))
-            {
-                foundProject = current.FullName;
-                foundConfig = yasnToml;
-                break;
-            }
-
-            current = current.Parent;
-        }
+        var foundConfig = TomlUtil.FindConfig(baseDir);
+        var foundProject = foundConfig is null ? null : System.IO.Path.GetDirectoryName(foundConfig);
 
         _projectRoot = foundProject;
         _depsRoot = foundProject is null ? null : System.IO.Path.Combine(foundProject, ".yasn", "deps");
-        _config = foundConfig is null ? new ModuleConfig() : LoadModuleConfig(foundConfig);
+        _config = foundConfig is null ? NoConfig : LoadModuleConfig(foundConfig);
     }
 
     private static ModuleConfig LoadModuleConfig(string configPath)
     {
         var data = TomlUtil.ReadToml(configPath);
-        var modules = TomlUtil.GetTable(data, "modules", configPath);
-        return new ModuleConfig
+        return ModuleConfigs.GetValue(data, table =>
         {
-            Root = TomlUtil.GetString(modules, "root", configPath),
-            Paths = TomlUtil.GetStringList(modules, "paths", configPath),
-        };
+            var modules = TomlUtil.GetTable(table, "modules", configPath);
+            return new ModuleConfig
+            {
+                Root = TomlUtil.GetString(modules, "root", configPath),
+                Paths = TomlUtil.GetStringList(modules, "paths", configPath),
+            };
+        });
     }
 
     private ResolvedModule ResolveModule(string modulePath, ProgramNode? program, bool isEntry)
@@ -92,29 +121,39 @@ public sealed class ModuleResolver
             return cached;
         }
 
-        if (_resolvingStack.Contains(normalized, StringComparer.OrdinalIgnoreCase))
+        if (program is null && !_resolvingSet.Contains(normalized) && TryReuseShared(normalized) is { } shared)
+        {
+            return shared;
+        }
+
+        if (!_resolvingSet.Add(normalized))
         {
             var chain = string.Join(" -> ", _resolvingStack.Concat([normalized]));
             throw new YasnException($"Обнаружен циклический импорт: {chain}", path: normalized);
         }
 
         _resolvingStack.Add(normalized);
+        var imports = new List<ResolvedModule>();
+        var misses = new HashSet<string>(StringComparer.OrdinalIgnoreCase);
+        _importFrames.Add(imports);
+        _probeFrames.Add(misses);
         try
         {
-            ProgramNode parsed;
-            if (program is null)
-            {
-                var source = File.ReadAllText(normalized);
-                parsed = new Parser(Lexer.Tokenize(source, normalized), normalized).Parse();
-            }
-            else
-            {
-                parsed = program;
-            }
+            var source = program is null ? TakeParsed(normalized) : null;
+            var parsed = program ?? source!.Program;
+            PrefetchImports(parsed.Statements, normalized);
 
             var linkedStatements = LinkStatements(parsed.Statements, normalized, isEntry);
             var linkedProgram = new ProgramNode(parsed.Line, parsed.Col, linkedStatements);
             var exports = CollectExports(linkedStatements);
+            var declarations = new Dictionary<string, Stmt>(StringComparer.Ordinal);
+            foreach (var stmt in linkedStatements)
+            {
+                if (DeclName(stmt) is { } name)
+                {
+                    declarations[name] = stmt;
+                }
+            }
 
             var resolved = new ResolvedModule
             {
@@ -122,54 +161,183 @@ public sealed class ModuleResolver
                 Program = linkedProgram,
                 Exports = exports,
                 Tag = ModuleTag(normalized),
+                Declarations = declarations,
+                SourceTicks = source?.Ticks ?? 0,
+                SourceLength = source?.Length ?? 0,
+                Config = _config,
+                Imports = imports,
+                MissingProbes = misses,
             };
             _resolved[normalized] = resolved;
+            if (source is not null)
+            {
+                SharedResolved[(normalized, _projectRoot ?? string.Empty)] = resolved;
+            }
+
             return resolved;
         }
         finally
         {
             _resolvingStack.RemoveAt(_resolvingStack.Count - 1);
+            _resolvingSet.Remove(normalized);
+            _importFrames.RemoveAt(_importFrames.Count - 1);
+            _probeFrames.RemoveAt(_probeFrames.Count - 1);
+        }
+    }
+
+    private ResolvedModule? TryReuseShared(string normalized)
+    {
+        if (!SharedResolved.TryGetValue((normalized, _projectRoot ?? string.Empty), out var shared) ||
+            !ReferenceEquals(shared.Config, _config) ||
+            !IsFresh(shared, new HashSet<ResolvedModule>(ReferenceEqualityComparer.Instance)))
+        {
+            return null;
         }
+
+        Register(shared);
+        return shared;
     }
 
-    private Dictionary<string, Stmt> CollectExports(List<Stmt> statements)
+    private static bool IsFresh(ResolvedModule module, HashSet<ResolvedModule> visited)
     {
-        var decls = statements
-            .Where(static s => s is VarDeclStmt || s is FuncDeclStmt)
-            .ToList();
+        if (!visited.Add(module))
+        {
+            return true;
+        }
 
-        var explicitExports = decls.Any(static s => s switch
+        var info = new FileInfo(module.Path);
+        if (!info.Exists || info.LastWriteTimeUtc.Ticks != module.SourceTicks || info.Length != module.SourceLength)
         {
-            VarDeclStmt vd => vd.Exported,
-            FuncDeclStmt fd => fd.Exported,
-            _ => false,
-        });
+            return false;
+        }
 
-        var exports = new Dictionary<string, Stmt>(StringComparer.Ordinal);
-        foreach (var stmt in decls)
+        foreach (var missing in module.MissingProbes)
         {
-            var name = DeclName(stmt);
-            if (name is null || name == "main" || name.StartsWith("__мод_", StringComparison.Ordinal))
+            if (File.Exists(missing))
             {
-                continue;
+                return false;
+            }
+        }
+
+        foreach (var imported in module.Imports)
+        {
+            if (!IsFresh(imported, visited))
+            {
+                return false;
+            }
+        }
+
+        return true;
+    }
+
+    private void Register(ResolvedModule module)
+    {
+        if (!_resolved.TryAdd(module.Path, module))
+        {
+            return;
+        }
+
+        foreach (var imported in module.Imports)
+        {
+            Register(imported);
+        }
+    }
+
+    private ParsedModule TakeParsed(string path)
+    {
+        return _pendingParses.Remove(path, out var pending)
+            ? pending.GetAwaiter().GetResult()
+            : ParseModuleFile(path);
+    }
+
+    private void PrefetchImports(List<Stmt> statements, string currentModule)
+    {
+        var targets = new List<string>();
+        foreach (var stmt in statements)
+        {
+            var rawPath = stmt switch
+            {
+                ImportAllStmt importAll => importAll.ModulePath,
+                ImportFromStmt importFrom => importFrom.ModulePath,
+                _ => null,
+            };
+            if (rawPath is null)
+            {
+                break;
+            }
+
+            if (TryResolveModulePath(rawPath, currentModule) is { } target &&
+                !_resolved.ContainsKey(target) &&
+                !_resolvingSet.Contains(target) &&
+                !_pendingParses.ContainsKey(target) &&
+                !targets.Contains(target, StringComparer.OrdinalIgnoreCase))
+            {
+                targets.Add(target);
             }
+        }
+
+        // The first import is resolved right away; only siblings gain from parsing ahead.
+        if (targets.Count < 2)
+        {
+            return;
+        }
+
+        foreach (var target in targets)
+        {
+            _pendingParses[target] = Task.Run(() => ParseModuleFile(target));
+        }
+    }
 
-            var exported = stmt switch
+    private static ParsedModule ParseModuleFile(string path)
+    {
+        var info = new FileInfo(path);
+        var ticks = info.Exists ? info.LastWriteTimeUtc.Ticks : 0;
+        var length = info.Exists ? info.Length : 0;
+        if (info.Exists && ParsedModules.TryGetValue(path, out var cached) && cached.Ticks == ticks && cached.Length == length)
+        {
+            return cached;
+        }
+
+        var source = Encoding.UTF8.GetString(File.ReadAllBytes(path));
+        var program = new Parser(Lexer.Tokenize(source, path), path).Parse();
+        var parsed = new ParsedModule(ticks, length, program);
+        ParsedModules[path] = parsed;
+        return parsed;
+    }
+
+    private static Dictionary<string, Stmt> CollectExports(List<Stmt> statements)
+    {
+        var explicitExports = false;
+        var exported = new Dictionary<string, Stmt>(StringComparer.Ordinal);
+        var all = new Dictionary<string, Stmt>(StringComparer.Ordinal);
+        foreach (var stmt in statements)
+        {
+            var (name, isExported) = stmt switch
             {
-                VarDeclStmt vd => vd.Exported,
-                FuncDeclStmt fd => fd.Exported,
-                _ => false,
+                VarDeclStmt vd => (vd.Name, vd.Exported),
+                FuncDeclStmt fd => (fd.Name, fd.Exported),
+                _ => (null, false),
             };
 
-            if (explicitExports && !exported)
+            if (name is null)
+            {
+                continue;
+            }
+
+            explicitExports |= isExported;
+            if (name == "main" || name.StartsWith("__мод_", StringComparison.Ordinal))
             {
                 continue;
             }
 
-            exports[name] = stmt;
+            all[name] = stmt;
+            if (isExported)
+            {
+                exported[name] = stmt;
+            }
         }
 
-        return exports;
+        return explicitExports ? exported : all;
     }
 
     private List<Stmt> LinkStatements(List<Stmt> statements, string modulePath, bool isEntry)
@@ -223,7 +391,7 @@ public sealed class ModuleResolver
                 }
             }
 
-            var rewritten = new AliasRewriter(importNameMap, namespaceMap).RewriteStmt(stmt);
+            var rewritten = new AliasRewriter(importNameMap, namespaceMap).Rewrite(stmt);
             AppendDeclWithConflictCheck(linked, topDeclNames, rewritten, stmt.Line, stmt.Col, modulePath);
         }
 
@@ -253,12 +421,12 @@ public sealed class ModuleResolver
     {
         var target = ResolveModulePath(stmt.ModulePath, currentModule, stmt.Line, stmt.Col);
         var resolved = ResolveModule(target, program: null, isEntry: false);
+        _importFrames[^1].Add(resolved);
         var exportedNames = resolved.Exports.Keys.ToList();
 
         var includeSet = ExpandWithDependencies(resolved, exportedNames);
         var (materialized, exposeMap) = MaterializeImportedDecls(resolved, includeSet.ToList(), exportedNames);
-        var onlyNew = OnlyNewImported(materialized, topDeclNames);
-        AppendImported(onlyNew, topDeclNames, stmt, currentModule);
+        var onlyNew = RegisterNewImported(materialized, topDeclNames);
 
         if (stmt.Alias is not null)
         {
@@ -293,6 +461,7 @@ public sealed class ModuleResolver
     {
         var target = ResolveModulePath(stmt.ModulePath, currentModule, stmt.Line, stmt.Col);
         var resolved = ResolveModule(target, program: null, isEntry: false);
+        _importFrames[^1].Add(resolved);
 
         var requested = new List<string>();
         foreach (var item in stmt.Items)
@@ -310,8 +479,7 @@ public sealed class ModuleResolver
 
         var includeSet = ExpandWithDependencies(resolved, requested);
         var (materialized, exposeMap) = MaterializeImportedDecls(resolved, includeSet.ToList(), requested);
-        var onlyNew = OnlyNewImported(materialized, topDeclNames);
-        AppendImported(onlyNew, topDeclNames, stmt, currentModule);
+        var onlyNew = RegisterNewImported(materialized, topDeclNames);
 
         var seenLocal = new HashSet<string>(StringComparer.Ordinal);
         foreach (var item in stmt.Items)
@@ -338,28 +506,20 @@ public sealed class ModuleResolver
         var includeSet = new HashSet<string>(StringComparer.Ordinal);
         var queue = new Queue<string>(roots);
 
-        var declarations = new Dictionary<string, Stmt>(StringComparer.Ordinal);
-        foreach (var stmt in resolved.Program.Statements)
-        {
-            var name = DeclName(stmt);
-            if (name is not null)
-            {
-                declarations[name] = stmt;
-            }
-        }
-
-        var availableNames = declarations.Keys.ToHashSet(StringComparer.Ordinal);
-
         while (queue.Count > 0)
         {
             var current = queue.Dequeue();
-            if (includeSet.Contains(current) || !declarations.ContainsKey(current))
+            if (!resolved.Declarations.TryGetValue(current, out var decl) || !includeSet.Add(current))
             {
                 continue;
             }
 
-            includeSet.Add(current);
-            var deps = DirectDependencies(declarations[current], availableNames);
+            if (!resolved.DeclDependencies.TryGetValue(current, out var deps))
+            {
+                deps = DirectDependencies(decl, resolved.Declarations);
+                resolved.DeclDependencies[current] = deps;
+            }
+
             foreach (var dep in deps)
             {
                 if (!includeSet.Contains(dep))
@@ -377,17 +537,7 @@ public sealed class ModuleResolver
         List<string> names,
         List<string>? exposedNames = null)
     {
-        var declarations = new Dictionary<string, Stmt>(StringComparer.Ordinal);
-        foreach (var stmt in resolved.Program.Statements)
-        {
-            var name = DeclName(stmt);
-            if (name is not null)
-            {
-                declarations[name] = stmt;
-            }
-        }
-
-        var selected = names.Where(declarations.ContainsKey).ToHashSet(StringComparer.Ordinal);
+        var selected = names.Where(resolved.Declarations.ContainsKey).ToHashSet(StringComparer.Ordinal);
         var exposed = (exposedNames ?? names).ToHashSet(StringComparer.Ordinal);
 
         var renameMap = new Dictionary<string, string>(StringComparer.Ordinal);
@@ -407,7 +557,7 @@ public sealed class ModuleResolver
                 continue;
             }
 
-            var renamed = renamer.RewriteStmt(stmt);
+            var renamed = renamer.Rewrite(stmt);
             renamed = renamed switch
             {
                 VarDeclStmt vd => vd with { Exported = false },
@@ -429,13 +579,13 @@ public sealed class ModuleResolver
         return (materialized, exposeMap);
     }
 
-    private static List<Stmt> OnlyNewImported(List<Stmt> imported, HashSet<string> topDeclNames)
+    private static List<Stmt> RegisterNewImported(List<Stmt> imported, HashSet<string> topDeclNames)
     {
-        var result = new List<Stmt>();
+        var result = new List<Stmt>(imported.Count);
         foreach (var stmt in imported)
         {
             var name = DeclName(stmt);
-            if (name is not null && topDeclNames.Contains(name))
+            if (name is not null && !topDeclNames.Add(name))
             {
                 continue;
             }
@@ -446,29 +596,6 @@ public sealed class ModuleResolver
         return result;
     }
 
-    private static void AppendImported(
-        List<Stmt> imported,
-        HashSet<string> topDeclNames,
-        Stmt importStmt,
-        string currentModule)
-    {
-        foreach (var stmt in imported)
-        {
-            var name = DeclName(stmt);
-            if (name is null)
-            {
-                continue;
-            }
-
-            if (topDeclNames.Contains(name))
-            {
-                continue;
-            }
-
-            topDeclNames.Add(name);
-        }
-    }
-
     private static void AppendDeclWithConflictCheck(
         List<Stmt> linked,
         HashSet<string> namesInScope,
@@ -492,70 +619,107 @@ public sealed class ModuleResolver
     }
 
     private string ResolveModulePath(string rawPath, string currentModule, int line, int col)
+    {
+        return TryResolveModulePath(rawPath, currentModule)
+            ?? throw new YasnException($"Не удалось найти модуль: {rawPath}", line, col, currentModule);
+    }
+
+    private string? TryResolveModulePath(string rawPath, string currentModule)
     {
         var raw = rawPath.Trim();
-        var variants = new List<string>();
-        if (System.IO.Path.HasExtension(raw))
+        var variant = System.IO.Path.HasExtension(raw) ? raw : raw + ".яс";
+        var seen = new HashSet<string>(StringComparer.OrdinalIgnoreCase);
+
+        var misses = _probeFrames.Count > 0 ? _probeFrames[^1] : null;
+
+        foreach (var candidate in ModuleCandidates(variant, currentModule))
         {
-            variants.Add(raw);
+            if (!seen.Add(candidate))
+            {
+                continue;
+            }
+
+            if (FileExists(candidate))
+            {
+                return candidate;
+            }
+
+            misses?.Add(candidate);
         }
-        else
+
+        return null;
+    }
+
+    private IEnumerable<string> ModuleCandidates(string variant, string currentModule)
+    {
+        if (System.IO.Path.IsPathRooted(variant))
         {
-            variants.Add(raw + ".яс");
+            yield return System.IO.Path.GetFullPath(variant);
+            yield break;
         }
 
-        var candidates = new List<string>();
-        foreach (var variant in variants)
+        var currentDir = System.IO.Path.GetDirectoryName(System.IO.Path.GetFullPath(currentModule)) ?? Directory.GetCurrentDirectory();
+        yield return System.IO.Path.GetFullPath(System.IO.Path.Combine(currentDir, variant));
+
+        if (_projectRoot is not null)
         {
-            if (System.IO.Path.IsPathRooted(variant))
+            if (!string.IsNullOrWhiteSpace(_config.Root))
             {
-                candidates.Add(System.IO.Path.GetFullPath(variant));
-                continue;
+                yield return System.IO.Path.GetFullPath(System.IO.Path.Combine(_projectRoot, _config.Root!, variant));
             }
 
-            var currentDir = System.IO.Path.GetDirectoryName(System.IO.Path.GetFullPath(currentModule)) ?? Directory.GetCurrentDirectory();
-            candidates.Add(System.IO.Path.GetFullPath(System.IO.Path.Combine(currentDir, variant)));
-
-            if (_projectRoot is not null)
+            foreach (var path in _config.Paths)
             {
-                if (!string.IsNullOrWhiteSpace(_config.Root))
-                {
-                    candidates.Add(System.IO.Path.GetFullPath(System.IO.Path.Combine(_projectRoot, _config.Root!, variant)));
-                }
-
-                foreach (var path in _config.Paths)
-                {
-                    candidates.Add(System.IO.Path.GetFullPath(System.IO.Path.Combine(_projectRoot, path, variant)));
-                }
+                yield return System.IO.Path.GetFullPath(System.IO.Path.Combine(_projectRoot, path, variant));
             }
+        }
 
-            if (_depsRoot is not null && Directory.Exists(_depsRoot))
-            {
-                candidates.Add(System.IO.Path.GetFullPath(System.IO.Path.Combine(_depsRoot, variant)));
+        var depDirs = DepDirectories();
+        if (depDirs is null)
+        {
+            yield break;
+        }
 
-                var depName = variant.Split(['/', '\\'], StringSplitOptions.RemoveEmptyEntries).FirstOrDefault();
-                if (!string.IsNullOrWhiteSpace(depName))
-                {
-                    candidates.Add(System.IO.Path.GetFullPath(System.IO.Path.Combine(_depsRoot, depName, variant)));
-                }
+        yield return System.IO.Path.GetFullPath(System.IO.Path.Combine(_depsRoot!, variant));
 
-                foreach (var depDir in Directory.EnumerateDirectories(_depsRoot))
-                {
-                    candidates.Add(System.IO.Path.GetFullPath(System.IO.Path.Combine(depDir, variant)));
-                }
-            }
+        var depName = variant.Split(['/', '\\'], StringSplitOptions.RemoveEmptyEntries).FirstOrDefault();
+        if (!string.IsNullOrWhiteSpace(depName))
+        {
+            yield return System.IO.Path.GetFullPath(System.IO.Path.Combine(_depsRoot!, depName, variant));
         }
 
-        foreach (var candidate in candidates.Distinct(StringComparer.OrdinalIgnoreCase))
+        foreach (var depDir in depDirs)
         {
-            if (File.Exists(candidate))
-            {
-                return candidate;
-            }
+            yield return System.IO.Path.GetFullPath(System.IO.Path.Combine(depDir, variant));
+        }
+    }
+
+    private List<string>? DepDirectories()
+    {
+        if (_depsRoot is null)
+        {
+            return null;
+        }
+
+        if (_depDirs is null && Directory.Exists(_depsRoot))
+        {
+            _depDirs = Directory.EnumerateDirectories(_depsRoot).ToList();
+        }
+
+        return _depDirs;
+    }
+
+    private bool FileExists(string path)
+    {
+        if (!_fileExists.TryGetValue(path, out var exists))
+        {
+            exists = File.Exists(path);
+            _fileExists[path] = exists;
         }
 
-        throw new YasnException($"Не удалось найти модуль: {rawPath}", line, col, currentModule);
+        return exists;
     }
+
     private static string? DeclName(Stmt stmt)
     {
         return stmt switch
@@ -566,18 +730,13 @@ public sealed class ModuleResolver
         };
     }
 
-    private string ModuleTag(string modulePath)
+    private static string ModuleTag(string modulePath)
     {
-        if (_tags.TryGetValue(modulePath, out var tag))
+        return ModuleTags.GetOrAdd(modulePath, static path =>
         {
-            return tag;
-        }
-
-        var bytes = SHA1.HashData(Encoding.UTF8.GetBytes(modulePath));
-        var suffix = Convert.ToHexString(bytes)[..8].ToLowerInvariant();
-        tag = "__мод_" + suffix;
-        _tags[modulePath] = tag;
-        return tag;
+            var bytes = SHA1.HashData(Encoding.UTF8.GetBytes(path));
+            return "__мод_" + Convert.ToHexString(bytes, 0, 4).ToLowerInvariant();
+        });
     }
 
     private string UniqueSymbolName(ResolvedModule module, string name)
@@ -585,127 +744,119 @@ public sealed class ModuleResolver
         return $"{module.Tag}_{name}";
     }
 
-    private static HashSet<string> DirectDependencies(Stmt stmt, HashSet<string> topNames)
+    private static HashSet<string> DirectDependencies(Stmt stmt, Dictionary<string, Stmt> topNames)
     {
         var deps = new HashSet<string>(StringComparer.Ordinal);
         var locals = new HashSet<string>(StringComparer.Ordinal);
 
-        void VisitStmt(Stmt s)
+        // Children are pushed in reverse so nodes pop in source order; a local name entry
+        // is pushed under its declaring node's children to bind only after they are visited.
+        var work = new Stack<(Node? Node, string? Local)>();
+        work.Push((stmt, null));
+        while (work.Count > 0)
         {
-            switch (s)
+            var (node, local) = work.Pop();
+            if (local is not null)
+            {
+                locals.Add(local);
+                continue;
+            }
+
+            switch (node)
             {
+                case IdentifierExpr id:
+                    if (!locals.Contains(id.Name) && topNames.ContainsKey(id.Name))
+                    {
+                        deps.Add(id.Name);
+                    }
+                    break;
+                case LiteralExpr:
+                    break;
+                case CallExpr c:
+                    PushAll(c.Args);
+                    work.Push((c.Callee, null));
+                    break;
+                case BinaryExpr b:
+                    work.Push((b.Right, null));
+                    work.Push((b.Left, null));
+                    break;
+                case MemberExpr m:
+                    work.Push((m.Target, null));
+                    break;
+                case IndexExpr i:
+                    work.Push((i.Index, null));
+                    work.Push((i.Target, null));
+                    break;
+                case ListLiteralExpr l:
+                    PushAll(l.Elements);
+                    break;
+                case DictLiteralExpr d:
+                    for (var k = d.Entries.Count - 1; k >= 0; k--)
+                    {
+                        work.Push((d.Entries[k].Value, null));
+                        work.Push((d.Entries[k].Key, null));
+                    }
+                    break;
+                case UnaryExpr u:
+                    work.Push((u.Operand, null));
+                    break;
+                case AwaitExpr a:
+                    work.Push((a.Operand, null));
+                    break;
                 case VarDeclStmt vd:
-                    VisitExpr(vd.Value);
-                    locals.Add(vd.Name);
+                    work.Push((null, vd.Name));
+                    work.Push((vd.Value, null));
                     break;
                 case AssignStmt assign:
-                    VisitExpr(assign.Value);
+                    work.Push((assign.Value, null));
                     break;
                 case IndexAssignStmt idx:
-                    VisitExpr(idx.Target);
-                    VisitExpr(idx.Index);
-                    VisitExpr(idx.Value);
+                    work.Push((idx.Value, null));
+                    work.Push((idx.Index, null));
+                    work.Push((idx.Target, null));
                     break;
                 case ExprStmt es:
-                    VisitExpr(es.Expr);
+                    work.Push((es.Expr, null));
                     break;
                 case ReturnStmt rs:
-                    VisitExpr(rs.Value);
+                    work.Push((rs.Value, null));
                     break;
                 case IfStmt ifs:
-                    VisitExpr(ifs.Condition);
-                    foreach (var inner in ifs.ThenBody)
-                    {
-                        VisitStmt(inner);
-                    }
                     if (ifs.ElseBody is not null)
                     {
-                        foreach (var inner in ifs.ElseBody)
-                        {
-                            VisitStmt(inner);
-                        }
+                        PushAll(ifs.ElseBody);
                     }
+                    PushAll(ifs.ThenBody);
+                    work.Push((ifs.Condition, null));
                     break;
                 case WhileStmt ws:
-                    VisitExpr(ws.Condition);
-                    foreach (var inner in ws.Body)
-                    {
-                        VisitStmt(inner);
-                    }
+                    PushAll(ws.Body);
+                    work.Push((ws.Condition, null));
                     break;
                 case ForStmt fs:
-                    VisitExpr(fs.Iterable);
-                    locals.Add(fs.VarName);
-                    foreach (var inner in fs.Body)
-                    {
-                        VisitStmt(inner);
-                    }
+                    PushAll(fs.Body);
+                    work.Push((null, fs.VarName));
+                    work.Push((fs.Iterable, null));
                     break;
                 case FuncDeclStmt fd:
                     foreach (var p in fd.Params)
                     {
                         locals.Add(p.Name);
                     }
-                    foreach (var inner in fd.Body)
-                    {
-                        VisitStmt(inner);
-                    }
+                    PushAll(fd.Body);
                     break;
             }
         }
 
-        void VisitExpr(Expr expr)
+        return deps;
+
+        void PushAll<T>(List<T> nodes) where T : Node
         {
-            switch (expr)
+            for (var i = nodes.Count - 1; i >= 0; i--)
             {
-                case IdentifierExpr id:
-                    if (!locals.Contains(id.Name) && topNames.Contains(id.Name))
-                    {
-                        deps.Add(id.Name);
-                    }
-                    break;
-                case UnaryExpr u:
-                    VisitExpr(u.Operand);
-                    break;
-                case AwaitExpr a:
-                    VisitExpr(a.Operand);
-                    break;
-                case BinaryExpr b:
-                    VisitExpr(b.Left);
-                    VisitExpr(b.Right);
-                    break;
-                case CallExpr c:
-                    VisitExpr(c.Callee);
-                    foreach (var arg in c.Args)
-                    {
-                        VisitExpr(arg);
-                    }
-                    break;
-                case ListLiteralExpr l:
-                    foreach (var item in l.Elements)
-                    {
-                        VisitExpr(item);
-                    }
-                    break;
-                case DictLiteralExpr d:
-                    foreach (var (k, v) in d.Entries)
-                    {
-                        VisitExpr(k);
-                        VisitExpr(v);
-                    }
-                    break;
-                case IndexExpr i:
-                    VisitExpr(i.Target);
-                    VisitExpr(i.Index);
-                    break;
-                case MemberExpr m:
-                    VisitExpr(m.Target);
-                    break;
+                work.Push((nodes[i], null));
             }
         }
-
-        VisitStmt(stmt);
-        return deps;
     }
 }
 
@@ -722,46 +873,93 @@ internal sealed class AliasRewriter
         _namespaceMap = namespaceMap;
     }
 
+    public Stmt Rewrite(Stmt stmt)
+    {
+        return RewriteUtil.MentionsAny(stmt, _importNameMap) || RewriteUtil.MentionsAny(stmt, _namespaceMap)
+            ? RewriteStmt(stmt)
+            : stmt;
+    }
+
     public Stmt RewriteStmt(Stmt stmt)
     {
-        return stmt switch
+        switch (stmt)
         {
-            VarDeclStmt vd => vd with { Value = RewriteExpr(vd.Value) },
-            AssignStmt assign => assign with
-            {
-                Name = _importNameMap.TryGetValue(assign.Name, out var mappedName) ? mappedName : assign.Name,
-                Value = RewriteExpr(assign.Value),
-            },
-            IndexAssignStmt idx => idx with
-            {
-                Target = RewriteExpr(idx.Target),
-                Index = RewriteExpr(idx.Index),
-                Value = RewriteExpr(idx.Value),
-            },
-            ExprStmt es => es with { Expr = RewriteExpr(es.Expr) },
-            ReturnStmt rs => rs with { Value = RewriteExpr(rs.Value) },
-            IfStmt ifs => ifs with
-            {
-                Condition = RewriteExpr(ifs.Condition),
-                ThenBody = ifs.ThenBody.Select(RewriteStmt).ToList(),
-                ElseBody = ifs.ElseBody?.Select(RewriteStmt).ToList(),
-            },
-            WhileStmt ws => ws with
-            {
-                Condition = RewriteExpr(ws.Condition),
-                Body = ws.Body.Select(RewriteStmt).ToList(),
-            },
-            ForStmt fs => fs with
-            {
-                Iterable = RewriteExpr(fs.Iterable),
-                Body = fs.Body.Select(RewriteStmt).ToList(),
-            },
-            FuncDeclStmt fd => fd with
-            {
-                Body = fd.Body.Select(RewriteStmt).ToList(),
-            },
-            _ => stmt,
-        };
+            case VarDeclStmt vd:
+            {
+                var value = RewriteExpr(vd.Value);
+                return ReferenceEquals(value, vd.Value) ? vd : vd with { Value = value };
+            }
+
+            case AssignStmt assign:
+            {
+                var value = RewriteExpr(assign.Value);
+                if (_importNameMap.TryGetValue(assign.Name, out var mappedName))
+                {
+                    return assign with { Name = mappedName, Value = value };
+                }
+
+                return ReferenceEquals(value, assign.Value) ? assign : assign with { Value = value };
+            }
+
+            case IndexAssignStmt idx:
+            {
+                var target = RewriteExpr(idx.Target);
+                var index = RewriteExpr(idx.Index);
+                var value = RewriteExpr(idx.Value);
+                return ReferenceEquals(target, idx.Target) && ReferenceEquals(index, idx.Index) && ReferenceEquals(value, idx.Value)
+                    ? idx
+                    : idx with { Target = target, Index = index, Value = value };
+            }
+
+            case ExprStmt es:
+            {
+                var expr = RewriteExpr(es.Expr);
+                return ReferenceEquals(expr, es.Expr) ? es : es with { Expr = expr };
+            }
+
+            case ReturnStmt rs:
+            {
+                var value = RewriteExpr(rs.Value);
+                return ReferenceEquals(value, rs.Value) ? rs : rs with { Value = value };
+            }
+
+            case IfStmt ifs:
+            {
+                var condition = RewriteExpr(ifs.Condition);
+                var thenBody = RewriteUtil.Map(ifs.ThenBody, RewriteStmt);
+                var elseBody = ifs.ElseBody is null ? null : RewriteUtil.Map(ifs.ElseBody, RewriteStmt);
+                return ReferenceEquals(condition, ifs.Condition) && ReferenceEquals(thenBody, ifs.ThenBody) && ReferenceEquals(elseBody, ifs.ElseBody)
+                    ? ifs
+                    : ifs with { Condition = condition, ThenBody = thenBody, ElseBody = elseBody };
+            }
+
+            case WhileStmt ws:
+            {
+                var condition = RewriteExpr(ws.Condition);
+                var body = RewriteUtil.Map(ws.Body, RewriteStmt);
+                return ReferenceEquals(condition, ws.Condition) && ReferenceEquals(body, ws.Body)
+                    ? ws
+                    : ws with { Condition = condition, Body = body };
+            }
+
+            case ForStmt fs:
+            {
+                var iterable = RewriteExpr(fs.Iterable);
+                var body = RewriteUtil.Map(fs.Body, RewriteStmt);
+                return ReferenceEquals(iterable, fs.Iterable) && ReferenceEquals(body, fs.Body)
+                    ? fs
+                    : fs with { Iterable = iterable, Body = body };
+            }
+
+            case FuncDeclStmt fd:
+            {
+                var body = RewriteUtil.Map(fd.Body, RewriteStmt);
+                return ReferenceEquals(body, fd.Body) ? fd : fd with { Body = body };
+            }
+
+            default:
+                return stmt;
+        }
     }
 
     public Expr RewriteExpr(Expr expr)
@@ -774,44 +972,20 @@ internal sealed class AliasRewriter
                     : expr;
 
             case MemberExpr member:
+            {
                 if (member.Target is IdentifierExpr namespaceIdent
                     && _namespaceMap.TryGetValue(namespaceIdent.Name, out var nsMap)
                     && nsMap.TryGetValue(member.Member, out var symbolName))
                 {
                     return new IdentifierExpr(member.Line, member.Col, symbolName);
                 }
-                return member with { Target = RewriteExpr(member.Target) };
-
-            case UnaryExpr unary:
-                return unary with { Operand = RewriteExpr(unary.Operand) };
-
-            case AwaitExpr awaitExpr:
-                return awaitExpr with { Operand = RewriteExpr(awaitExpr.Operand) };
 
-            case BinaryExpr binary:
-                return binary with { Left = RewriteExpr(binary.Left), Right = RewriteExpr(binary.Right) };
-
-            case CallExpr call:
-                return call with
-                {
-                    Callee = RewriteExpr(call.Callee),
-                    Args = call.Args.Select(RewriteExpr).ToList(),
-                };
-
-            case ListLiteralExpr list:
-                return list with { Elements = list.Elements.Select(RewriteExpr).ToList() };
-
-            case DictLiteralExpr dict:
-                return dict with
-                {
-                    Entries = dict.Entries.Select(pair => (RewriteExpr(pair.Key), RewriteExpr(pair.Value))).ToList(),
-                };
-
-            case IndexExpr idx:
-                return idx with { Target = RewriteExpr(idx.Target), Index = RewriteExpr(idx.Index) };
+                var target = RewriteExpr(member.Target);
+                return ReferenceEquals(target, member.Target) ? member : member with { Target = target };
+            }
 
             default:
-                return expr;
+                return RewriteUtil.RewriteChildren(expr, RewriteExpr);
         }
     }
 }
@@ -825,62 +999,122 @@ internal sealed class RenameSymbols
         _renameMap = renameMap;
     }
 
-    public Stmt RewriteStmt(Stmt stmt)
+    public Stmt Rewrite(Stmt stmt)
     {
+        if (RewriteUtil.MentionsAny(stmt, _renameMap))
+        {
+            return RewriteStmt(stmt);
+        }
+
         return stmt switch
         {
-            VarDeclStmt vd => vd with { Name = Rename(vd.Name), Value = RewriteExpr(vd.Value) },
-            AssignStmt assign => assign with { Name = Rename(assign.Name), Value = RewriteExpr(assign.Value) },
-            IndexAssignStmt idx => idx with
-            {
-                Target = RewriteExpr(idx.Target),
-                Index = RewriteExpr(idx.Index),
-                Value = RewriteExpr(idx.Value),
-            },
-            ExprStmt es => es with { Expr = RewriteExpr(es.Expr) },
-            ReturnStmt rs => rs with { Value = RewriteExpr(rs.Value) },
-            IfStmt ifs => ifs with
-            {
-                Condition = RewriteExpr(ifs.Condition),
-                ThenBody = ifs.ThenBody.Select(RewriteStmt).ToList(),
-                ElseBody = ifs.ElseBody?.Select(RewriteStmt).ToList(),
-            },
-            WhileStmt ws => ws with
-            {
-                Condition = RewriteExpr(ws.Condition),
-                Body = ws.Body.Select(RewriteStmt).ToList(),
-            },
-            ForStmt fs => fs with
-            {
-                VarName = Rename(fs.VarName),
-                Iterable = RewriteExpr(fs.Iterable),
-                Body = fs.Body.Select(RewriteStmt).ToList(),
-            },
-            FuncDeclStmt fd => fd with
-            {
-                Name = Rename(fd.Name),
-                Params = fd.Params.Select(p => p with { Name = Rename(p.Name) }).ToList(),
-                Body = fd.Body.Select(RewriteStmt).ToList(),
-            },
+            VarDeclStmt vd when _renameMap.TryGetValue(vd.Name, out var mapped) => vd with { Name = mapped },
+            FuncDeclStmt fd when _renameMap.TryGetValue(fd.Name, out var mapped) => fd with { Name = mapped },
             _ => stmt,
         };
     }
 
+    public Stmt RewriteStmt(Stmt stmt)
+    {
+        switch (stmt)
+        {
+            case VarDeclStmt vd:
+            {
+                var name = Rename(vd.Name);
+                var value = RewriteExpr(vd.Value);
+                return ReferenceEquals(name, vd.Name) && ReferenceEquals(value, vd.Value)
+                    ? vd
+                    : vd with { Name = name, Value = value };
+            }
+
+            case AssignStmt assign:
+            {
+                var name = Rename(assign.Name);
+                var value = RewriteExpr(assign.Value);
+                return ReferenceEquals(name, assign.Name) && ReferenceEquals(value, assign.Value)
+                    ? assign
+                    : assign with { Name = name, Value = value };
+            }
+
+            case IndexAssignStmt idx:
+            {
+                var target = RewriteExpr(idx.Target);
+                var index = RewriteExpr(idx.Index);
+                var value = RewriteExpr(idx.Value);
+                return ReferenceEquals(target, idx.Target) && ReferenceEquals(index, idx.Index) && ReferenceEquals(value, idx.Value)
+                    ? idx
+                    : idx with { Target = target, Index = index, Value = value };
+            }
+
+            case ExprStmt es:
+            {
+                var expr = RewriteExpr(es.Expr);
+                return ReferenceEquals(expr, es.Expr) ? es : es with { Expr = expr };
+            }
+
+            case ReturnStmt rs:
+            {
+                var value = RewriteExpr(rs.Value);
+                return ReferenceEquals(value, rs.Value) ? rs : rs with { Value = value };
+            }
+
+            case IfStmt ifs:
+            {
+                var condition = RewriteExpr(ifs.Condition);
+                var thenBody = RewriteUtil.Map(ifs.ThenBody, RewriteStmt);
+                var elseBody = ifs.ElseBody is null ? null : RewriteUtil.Map(ifs.ElseBody, RewriteStmt);
+                return ReferenceEquals(condition, ifs.Condition) && ReferenceEquals(thenBody, ifs.ThenBody) && ReferenceEquals(elseBody, ifs.ElseBody)
+                    ? ifs
+                    : ifs with { Condition = condition, ThenBody = thenBody, ElseBody = elseBody };
+            }
+
+            case WhileStmt ws:
+            {
+                var condition = RewriteExpr(ws.Condition);
+                var body = RewriteUtil.Map(ws.Body, RewriteStmt);
+                return ReferenceEquals(condition, ws.Condition) && ReferenceEquals(body, ws.Body)
+                    ? ws
+                    : ws with { Condition = condition, Body = body };
+            }
+
+            case ForStmt fs:
+            {
+                var varName = Rename(fs.VarName);
+                var iterable = RewriteExpr(fs.Iterable);
+                var body = RewriteUtil.Map(fs.Body, RewriteStmt);
+                return ReferenceEquals(varName, fs.VarName) && ReferenceEquals(iterable, fs.Iterable) && ReferenceEquals(body, fs.Body)
+                    ? fs
+                    : fs with { VarName = varName, Iterable = iterable, Body = body };
+            }
+
+            case FuncDeclStmt fd:
+            {
+                var name = Rename(fd.Name);
+                var parameters = RewriteUtil.Map(fd.Params, RenameParam);
+                var body = RewriteUtil.Map(fd.Body, RewriteStmt);
+                return ReferenceEquals(name, fd.Name) && ReferenceEquals(parameters, fd.Params) && ReferenceEquals(body, fd.Body)
+                    ? fd
+                    : fd with { Name = name, Params = parameters, Body = body };
+            }
+
+            default:
+                return stmt;
+        }
+    }
+
     public Expr RewriteExpr(Expr expr)
     {
-        return expr switch
-        {
-            IdentifierExpr id => id with { Name = Rename(id.Name) },
-            MemberExpr member => member with { Target = RewriteExpr(member.Target) },
-            UnaryExpr unary => unary with { Operand = RewriteExpr(unary.Operand) },
-            AwaitExpr awaitExpr => awaitExpr with { Operand = RewriteExpr(awaitExpr.Operand) },
-            BinaryExpr binary => binary with { Left = RewriteExpr(binary.Left), Right = RewriteExpr(binary.Right) },
-            CallExpr call => call with { Callee = RewriteExpr(call.Callee), Args = call.Args.Select(RewriteExpr).ToList() },
-            ListLiteralExpr list => list with { Elements = list.Elements.Select(RewriteExpr).ToList() },
-            DictLiteralExpr dict => dict with { Entries = dict.Entries.Select(pair => (RewriteExpr(pair.Key), RewriteExpr(pair.Value))).ToList() },
-            IndexExpr idx => idx with { Target = RewriteExpr(idx.Target), Index = RewriteExpr(idx.Index) },
-            _ => expr,
-        };
+        if (expr is IdentifierExpr id)
+        {
+            return _renameMap.TryGetValue(id.Name, out var mapped) ? id with { Name = mapped } : id;
+        }
+
+        return RewriteUtil.RewriteChildren(expr, RewriteExpr);
+    }
+
+    private ParamNode RenameParam(ParamNode param)
+    {
+        return _renameMap.TryGetValue(param.Name, out var mapped) ? param with { Name = mapped } : param;
     }
 
     private string Rename(string name)
@@ -888,3 +1122,273 @@ internal sealed class RenameSymbols
         return _renameMap.TryGetValue(name, out var mapped) ? mapped : name;
     }
 }
+
+internal static class RewriteUtil
+{
+    private static readonly ConditionalWeakTable<Stmt, HashSet<string>> InnerNames = new();
+
+    public static bool MentionsAny<TValue>(Stmt stmt, Dictionary<string, TValue> map)
+    {
+        if (map.Count == 0)
+        {
+            return false;
+        }
+
+        var names = InnerNames.GetValue(stmt, CollectInnerNames);
+        if (map.Count < names.Count)
+        {
+            foreach (var key in map.Keys)
+            {
+                if (names.Contains(key))
+                {
+                    return true;
+                }
+            }
+
+            return false;
+        }
+
+        foreach (var name in names)
+        {
+            if (map.ContainsKey(name))
+            {
+                return true;
+            }
+        }
+
+        return false;
+    }
+
+    private static HashSet<string> CollectInnerNames(Stmt root)
+    {
+        var names = new HashSet<string>(StringComparer.Ordinal);
+        var work = new Stack<Node?>();
+        work.Push(root);
+        while (work.Count > 0)
+        {
+            switch (work.Pop())
+            {
+                case IdentifierExpr id:
+                    names.Add(id.Name);
+                    break;
+                case LiteralExpr:
+                    break;
+                case CallExpr c:
+                    work.Push(c.Callee);
+                    PushAll(c.Args);
+                    break;
+                case BinaryExpr b:
+                    work.Push(b.Left);
+                    work.Push(b.Right);
+                    break;
+                case MemberExpr m:
+                    work.Push(m.Target);
+                    break;
+                case IndexExpr i:
+                    work.Push(i.Target);
+                    work.Push(i.Index);
+                    break;
+                case ListLiteralExpr l:
+                    PushAll(l.Elements);
+                    break;
+                case DictLiteralExpr d:
+                    foreach (var (k, v) in d.Entries)
+                    {
+                        work.Push(k);
+                        work.Push(v);
+                    }
+
+                    break;
+                case UnaryExpr u:
+                    work.Push(u.Operand);
+                    break;
+                case AwaitExpr a:
+                    work.Push(a.Operand);
+                    break;
+                case VarDeclStmt vd:
+                    if (!ReferenceEquals(vd, root))
+                    {
+                        names.Add(vd.Name);
+                    }
+
+                    work.Push(vd.Value);
+                    break;
+                case AssignStmt assign:
+                    names.Add(assign.Name);
+                    work.Push(assign.Value);
+                    break;
+                case IndexAssignStmt idx:
+                    work.Push(idx.Target);
+                    work.Push(idx.Index);
+                    work.Push(idx.Value);
+                    break;
+                case ExprStmt es:
+                    work.Push(es.Expr);
+                    break;
+                case ReturnStmt rs:
+                    work.Push(rs.Value);
+                    break;
+                case IfStmt ifs:
+                    work.Push(ifs.Condition);
+                    PushAll(ifs.ThenBody);
+                    if (ifs.ElseBody is not null)
+                    {
+                        PushAll(ifs.ElseBody);
+                    }
+
+                    break;
+                case WhileStmt ws:
+                    work.Push(ws.Condition);
+                    PushAll(ws.Body);
+                    break;
+                case ForStmt fs:
+                    names.Add(fs.VarName);
+                    work.Push(fs.Iterable);
+                    PushAll(fs.Body);
+                    break;
+                case FuncDeclStmt fd:
+                    if (!ReferenceEquals(fd, root))
+                    {
+                        names.Add(fd.Name);
+                    }
+
+                    foreach (var p in fd.Params)
+                    {
+                        names.Add(p.Name);
+                    }
+
+                    PushAll(fd.Body);
+                    break;
+            }
+        }
+
+        return names;
+
+        void PushAll<T>(List<T> nodes) where T : Node
+        {
+            foreach (var node in nodes)
+            {
+                work.Push(node);
+            }
+        }
+    }
+
+    public static Expr RewriteChildren(Expr expr, Func<Expr, Expr> rewrite)
+    {
+        switch (expr)
+        {
+            case LiteralExpr:
+                return expr;
+
+            case CallExpr call:
+            {
+                var callee = rewrite(call.Callee);
+                var args = Map(call.Args, rewrite);
+                return ReferenceEquals(callee, call.Callee) && ReferenceEquals(args, call.Args)
+                    ? call
+                    : call with { Callee = callee, Args = args };
+            }
+
+            case BinaryExpr binary:
+            {
+                var left = rewrite(binary.Left);
+                var right = rewrite(binary.Right);
+                return ReferenceEquals(left, binary.Left) && ReferenceEquals(right, binary.Right)
+                    ? binary
+                    : binary with { Left = left, Right = right };
+            }
+
+            case MemberExpr member:
+            {
+                var target = rewrite(member.Target);
+                return ReferenceEquals(target, member.Target) ? member : member with { Target = target };
+            }
+
+            case IndexExpr idx:
+            {
+                var target = rewrite(idx.Target);
+                var index = rewrite(idx.Index);
+                return ReferenceEquals(target, idx.Target) && ReferenceEquals(index, idx.Index)
+                    ? idx
+                    : idx with { Target = target, Index = index };
+            }
+
+            case ListLiteralExpr list:
+            {
+                var elements = Map(list.Elements, rewrite);
+                return ReferenceEquals(elements, list.Elements) ? list : list with { Elements = elements };
+            }
+
+            case DictLiteralExpr dict:
+            {
+                var entries = MapEntries(dict.Entries, rewrite);
+                return ReferenceEquals(entries, dict.Entries) ? dict : dict with { Entries = entries };
+            }
+
+            case UnaryExpr unary:
+            {
+                var operand = rewrite(unary.Operand);
+                return ReferenceEquals(operand, unary.Operand) ? unary : unary with { Operand = operand };
+            }
+
+            case AwaitExpr awaitExpr:
+            {
+                var operand = rewrite(awaitExpr.Operand);
+                return ReferenceEquals(operand, awaitExpr.Operand) ? awaitExpr : awaitExpr with { Operand = operand };
+            }
+
+            default:
+                return expr;
+        }
+    }
+
+    public static List<T> Map<T>(List<T> items, Func<T, T> rewrite)
+        where T : class
+    {
+        List<T>? result = null;
+        for (var i = 0; i < items.Count; i++)
+        {
+            var item = items[i];
+            var rewritten = rewrite(item);
+            if (result is null)
+            {
+                if (ReferenceEquals(rewritten, item))
+                {
+                    continue;
+                }
+
+                result = new List<T>(items.Count);
+                result.AddRange(items.GetRange(0, i));
+            }
+
+            result.Add(rewritten);
+        }
+
+        return result ?? items;
+    }
+
+    private static List<(Expr Key, Expr Value)> MapEntries(List<(Expr Key, Expr Value)> entries, Func<Expr, Expr> rewrite)
+    {
+        List<(Expr Key, Expr Value)>? result = null;
+        for (var i = 0; i < entries.Count; i++)
+        {
+            var (key, value) = entries[i];
+            var newKey = rewrite(key);
+            var newValue = rewrite(value);
+            if (result is null)
+            {
+                if (ReferenceEquals(newKey, key) && ReferenceEquals(newValue, value))
+                {
+                    continue;
+                }
+
+                result = new List<(Expr Key, Expr Value)>(entries.Count);
+                result.AddRange(entries.GetRange(0, i));
+            }
+
+            result.Add((newKey, newValue));
+        }
+
+        return result ?? entries;
+    }
+}
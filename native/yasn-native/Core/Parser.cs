@@ -13,6 +13,9 @@ public sealed class Parser
         "Задача",
     };
 
+    private static readonly object BoxedTrue = true;
+    private static readonly object BoxedFalse = false;
+
     private readonly List<Token> _tokens;
     private readonly string? _path;
     private int _pos;
@@ -543,13 +546,13 @@ public sealed class Parser
         if (Match("истина"))
         {
             var t = Previous();
-            return new LiteralExpr(t.Line, t.Col, true, "bool");
+            return new LiteralExpr(t.Line, t.Col, BoxedTrue, "bool");
         }
 
         if (Match("ложь"))
         {
             var t = Previous();
-            return new LiteralExpr(t.Line, t.Col, false, "bool");
+            return new LiteralExpr(t.Line, t.Col, BoxedFalse, "bool");
         }
 
         if (Match("пусто"))
@@ -10,6 +10,29 @@ public static class TypeChecker
     private static readonly TypeRef AnyType = TypeRef.Primitive("Любой");
     private static readonly TypeRef TaskType = TypeRef.Primitive("Задача");
     private static readonly TypeRef VoidType = NullType;
+    private static readonly TypeRef IntListType = TypeRef.List(IntType);
+    private static readonly TypeRef AnyListType = TypeRef.List(AnyType);
+    private static readonly TypeRef AnyDictType = TypeRef.Dict(AnyType, AnyType);
+    private static readonly TypeRef StringAnyDictType = TypeRef.Dict(StringType, AnyType);
+
+    private static readonly System.Collections.Concurrent.ConcurrentDictionary<(int Actual, int Expected), bool> AssignableCache = new();
+
+    private static readonly Dictionary<string, OperatorKind> BinaryOperatorKinds = new(StringComparer.Ordinal)
+    {
+        ["и"] = OperatorKind.Logical,
+        ["или"] = OperatorKind.Logical,
+        ["+"] = OperatorKind.Add,
+        ["-"] = OperatorKind.Arithmetic,
+        ["*"] = OperatorKind.Arithmetic,
+        ["/"] = OperatorKind.Arithmetic,
+        ["%"] = OperatorKind.Arithmetic,
+        ["=="] = OperatorKind.Equality,
+        ["!="] = OperatorKind.Equality,
+        ["<"] = OperatorKind.Ordering,
+        ["<="] = OperatorKind.Ordering,
+        [">"] = OperatorKind.Ordering,
+        [">="] = OperatorKind.Ordering,
+    };
 
     private static readonly HashSet<string> PrimitiveNames = new(StringComparer.Ordinal)
     {
@@ -24,11 +47,25 @@ public static class TypeChecker
 
     public static void Check(ProgramNode program, string? path = null)
     {
-        var signatures = BuildFunctionSignatures(program, path);
+        var functions = new List<FuncDeclStmt>();
+        var topLevel = new List<Stmt>(program.Statements.Count);
+        foreach (var stmt in program.Statements)
+        {
+            if (stmt is FuncDeclStmt fn)
+            {
+                functions.Add(fn);
+            }
+            else
+            {
+                topLevel.Add(stmt);
+            }
+        }
+
+        var signatures = BuildFunctionSignatures(functions, path);
         ValidateMainSignature(signatures, path);
 
         var globals = new Dictionary<string, TypeRef>(StringComparer.Ordinal);
-        foreach (var stmt in program.Statements)
+        foreach (var stmt in topLevel)
         {
             if (stmt is VarDeclStmt varDecl)
             {
@@ -42,48 +79,35 @@ public static class TypeChecker
         var root = Scope.CreateRoot(globals);
         var context = new CheckContext(path, signatures);
 
-        foreach (var stmt in program.Statements)
+        foreach (var stmt in topLevel)
         {
-            if (stmt is FuncDeclStmt)
-            {
-                continue;
-            }
-
             CheckStmt(stmt, root, context, expectedReturn: null, loopDepth: 0);
         }
 
-        foreach (var stmt in program.Statements)
+        foreach (var fn in functions)
         {
-            if (stmt is not FuncDeclStmt fn)
+            var signature = signatures[fn.Name];
+            root.Push();
+            for (var i = 0; i < fn.Params.Count; i++)
             {
-                continue;
+                var param = fn.Params[i];
+                root.Declare(param.Name, signature.ParamTypes[i], param.Line, param.Col, path);
             }
 
-            var fnScope = Scope.CreateChild(root);
-            foreach (var param in fn.Params)
-            {
-                var paramType = FromTypeNode(param.TypeNode, path);
-                fnScope.Declare(param.Name, paramType, param.Line, param.Col, path);
-            }
-
-            var returnType = FromTypeNode(fn.ReturnType, path);
             foreach (var bodyStmt in fn.Body)
             {
-                CheckStmt(bodyStmt, fnScope, context, returnType, loopDepth: 0);
+                CheckStmt(bodyStmt, root, context, signature.ReturnType, loopDepth: 0);
             }
+
+            root.Pop();
         }
     }
 
-    private static Dictionary<string, FuncSignature> BuildFunctionSignatures(ProgramNode program, string? path)
+    private static Dictionary<string, FuncSignature> BuildFunctionSignatures(List<FuncDeclStmt> functions, string? path)
     {
-        var signatures = new Dictionary<string, FuncSignature>(StringComparer.Ordinal);
-        foreach (var stmt in program.Statements)
+        var signatures = new Dictionary<string, FuncSignature>(functions.Count, StringComparer.Ordinal);
+        foreach (var fn in functions)
         {
-            if (stmt is not FuncDeclStmt fn)
-            {
-                continue;
-            }
-
             if (signatures.ContainsKey(fn.Name))
             {
                 throw YasnException.At($"Функция '{fn.Name}' уже объявлена", fn.Line, fn.Col, path);
@@ -91,7 +115,7 @@ public static class TypeChecker
 
             var parameters = fn.Params
                 .Select(param => FromTypeNode(param.TypeNode, path))
-                .ToList();
+                .ToArray();
             var returnType = FromTypeNode(fn.ReturnType, path);
             signatures[fn.Name] = new FuncSignature(fn.Name, parameters, returnType, fn.IsAsync);
         }
@@ -111,7 +135,7 @@ public static class TypeChecker
             throw new YasnException("'main' не может быть асинхронной функцией", path: path);
         }
 
-        if (main.ParamTypes.Count != 0)
+        if (main.ParamTypes.Length != 0)
         {
             throw new YasnException("'main' должна быть без параметров", path: path);
         }
@@ -131,8 +155,8 @@ public static class TypeChecker
     {
         switch (stmt)
         {
-            case ImportAllStmt:
-            case ImportFromStmt:
+            case ExprStmt exprStmt:
+                _ = CheckExpr(exprStmt.Expr, scope, context);
                 return;
 
             case VarDeclStmt varDecl:
@@ -182,19 +206,22 @@ public static class TypeChecker
                 var conditionType = CheckExpr(ifStmt.Condition, scope, context);
                 EnsureBooleanCondition(conditionType, ifStmt.Condition.Line, ifStmt.Condition.Col, context.Path);
 
-                var thenScope = Scope.CreateChild(scope);
+                scope.Push();
                 foreach (var nested in ifStmt.ThenBody)
                 {
-                    CheckStmt(nested, thenScope, context, expectedReturn, loopDepth);
+                    CheckStmt(nested, scope, context, expectedReturn, loopDepth);
                 }
 
+                scope.Pop();
                 if (ifStmt.ElseBody is not null)
                 {
-                    var elseScope = Scope.CreateChild(scope);
+                    scope.Push();
                     foreach (var nested in ifStmt.ElseBody)
                     {
-                        CheckStmt(nested, elseScope, context, expectedReturn, loopDepth);
+                        CheckStmt(nested, scope, context, expectedReturn, loopDepth);
                     }
+
+                    scope.Pop();
                 }
 
                 return;
@@ -205,12 +232,14 @@ public static class TypeChecker
                 var conditionType = CheckExpr(whileStmt.Condition, scope, context);
                 EnsureBooleanCondition(conditionType, whileStmt.Condition.Line, whileStmt.Condition.Col, context.Path);
 
-                var whileScope = Scope.CreateChild(scope);
+                scope.Push();
                 foreach (var nested in whileStmt.Body)
                 {
-                    CheckStmt(nested, whileScope, context, expectedReturn, loopDepth + 1);
+                    CheckStmt(nested, scope, context, expectedReturn, loopDepth + 1);
                 }
 
+                scope.Pop();
+
                 return;
             }
 
@@ -218,13 +247,15 @@ public static class TypeChecker
             {
                 var iterableType = CheckExpr(forStmt.Iterable, scope, context);
                 var itemType = GetIterableItemType(iterableType, forStmt.Line, forStmt.Col, context.Path);
-                var forScope = Scope.CreateChild(scope);
-                forScope.Declare(forStmt.VarName, itemType, forStmt.Line, forStmt.Col, context.Path);
+                scope.Push();
+                scope.Declare(forStmt.VarName, itemType, forStmt.Line, forStmt.Col, context.Path);
                 foreach (var nested in forStmt.Body)
                 {
-                    CheckStmt(nested, forScope, context, expectedReturn, loopDepth + 1);
+                    CheckStmt(nested, scope, context, expectedReturn, loopDepth + 1);
                 }
 
+                scope.Pop();
+
                 return;
             }
 
@@ -264,8 +295,8 @@ public static class TypeChecker
 
                 return;
 
-            case ExprStmt exprStmt:
-                _ = CheckExpr(exprStmt.Expr, scope, context);
+            case ImportAllStmt:
+            case ImportFromStmt:
                 return;
 
             case FuncDeclStmt:
@@ -286,27 +317,47 @@ public static class TypeChecker
             case IdentifierExpr ident:
                 return scope.Resolve(ident.Name, ident.Line, ident.Col, context.Path);
 
+            case BinaryExpr binary:
+                return CheckBinaryExpr(binary, scope, context);
+
+            case CallExpr call:
+                return CheckCallExpr(call, scope, context);
+
             case ListLiteralExpr list:
             {
                 if (list.Elements.Count == 0)
                 {
-                    return TypeRef.List(AnyType);
+                    return AnyListType;
                 }
 
-                var elementTypes = list.Elements.Select(element => CheckExpr(element, scope, context)).ToList();
-                return TypeRef.List(UnionOf(elementTypes));
+                TypeRef? uniformElement = null;
+                List<TypeRef>? mixedElements = null;
+                foreach (var element in list.Elements)
+                {
+                    Accumulate(CheckExpr(element, scope, context), ref uniformElement, ref mixedElements);
+                }
+
+                return TypeRef.List(Accumulated(uniformElement, mixedElements));
             }
 
             case DictLiteralExpr dict:
             {
                 if (dict.Entries.Count == 0)
                 {
-                    return TypeRef.Dict(AnyType, AnyType);
+                    return AnyDictType;
+                }
+
+                TypeRef? uniformKey = null;
+                TypeRef? uniformValue = null;
+                List<TypeRef>? mixedKeys = null;
+                List<TypeRef>? mixedValues = null;
+                foreach (var (key, value) in dict.Entries)
+                {
+                    Accumulate(CheckExpr(key, scope, context), ref uniformKey, ref mixedKeys);
+                    Accumulate(CheckExpr(value, scope, context), ref uniformValue, ref mixedValues);
                 }
 
-                var keyTypes = dict.Entries.Select(entry => CheckExpr(entry.Key, scope, context)).ToList();
-                var valueTypes = dict.Entries.Select(entry => CheckExpr(entry.Value, scope, context)).ToList();
-                return TypeRef.Dict(UnionOf(keyTypes), UnionOf(valueTypes));
+                return TypeRef.Dict(Accumulated(uniformKey, mixedKeys), Accumulated(uniformValue, mixedValues));
             }
 
             case MemberExpr member:
@@ -378,12 +429,6 @@ public static class TypeChecker
                 return AnyType;
             }
 
-            case BinaryExpr binary:
-                return CheckBinaryExpr(binary, scope, context);
-
-            case CallExpr call:
-                return CheckCallExpr(call, scope, context);
-
             default:
                 throw YasnException.At("Неизвестный тип выражения для type checker", expr.Line, expr.Col, context.Path);
         }
@@ -394,22 +439,22 @@ public static class TypeChecker
         var left = CheckExpr(binary.Left, scope, context);
         var right = CheckExpr(binary.Right, scope, context);
 
+        var kind = BinaryOperatorKinds.GetValueOrDefault(binary.Op, OperatorKind.Unknown);
         if (IsAnyType(left) || IsAnyType(right))
         {
-            return binary.Op is "==" or "!=" or "<" or "<=" or ">" or ">=" or "и" or "или"
+            return kind is OperatorKind.Logical or OperatorKind.Equality or OperatorKind.Ordering
                 ? BoolType
                 : AnyType;
         }
 
-        switch (binary.Op)
+        switch (kind)
         {
-            case "и":
-            case "или":
+            case OperatorKind.Logical:
                 EnsureBooleanCondition(left, binary.Left.Line, binary.Left.Col, context.Path);
                 EnsureBooleanCondition(right, binary.Right.Line, binary.Right.Col, context.Path);
                 return BoolType;
 
-            case "+":
+            case OperatorKind.Add:
                 if (IsAssignable(left, StringType) && IsAssignable(right, StringType))
                 {
                     return StringType;
@@ -427,10 +472,7 @@ public static class TypeChecker
 
                 break;
 
-            case "-":
-            case "*":
-            case "/":
-            case "%":
+            case OperatorKind.Arithmetic:
                 if (IsNumericType(left) && IsNumericType(right))
                 {
                     if (binary.Op == "/" && (!IsExactlyInt(left) || !IsExactlyInt(right)))
@@ -443,14 +485,10 @@ public static class TypeChecker
 
                 break;
 
-            case "==":
-            case "!=":
+            case OperatorKind.Equality:
                 return BoolType;
 
-            case "<":
-            case "<=":
-            case ">":
-            case ">=":
+            case OperatorKind.Ordering:
                 if ((IsNumericType(left) && IsNumericType(right)) ||
                     (IsAssignable(left, StringType) && IsAssignable(right, StringType)))
                 {
@@ -474,7 +512,21 @@ public static class TypeChecker
             throw YasnException.At("Вызов возможен только по имени функции", call.Line, call.Col, context.Path);
         }
 
-        var argTypes = call.Args.Select(arg => CheckExpr(arg, scope, context)).ToList();
+        if (callee.Name == "печать")
+        {
+            foreach (var arg in call.Args)
+            {
+                _ = CheckExpr(arg, scope, context);
+            }
+
+            return VoidType;
+        }
+
+        var argTypes = new List<TypeRef>(call.Args.Count);
+        foreach (var arg in call.Args)
+        {
+            argTypes.Add(CheckExpr(arg, scope, context));
+        }
 
         if (TryCheckBuiltinCall(callee.Name, argTypes, call.Line, call.Col, context.Path, out var builtinReturn))
         {
@@ -486,10 +538,10 @@ public static class TypeChecker
             throw YasnException.At($"Неизвестная функция: {callee.Name}", call.Line, call.Col, context.Path);
         }
 
-        if (argTypes.Count != signature.ParamTypes.Count)
+        if (argTypes.Count != signature.ParamTypes.Length)
         {
             throw YasnException.At(
-                $"Функция '{callee.Name}' ожидает {signature.ParamTypes.Count} аргументов, получено {argTypes.Count}",
+                $"Функция '{callee.Name}' ожидает {signature.ParamTypes.Length} аргументов, получено {argTypes.Count}",
                 call.Line,
                 call.Col,
                 context.Path);
@@ -522,8 +574,6 @@ public static class TypeChecker
     {
         returnType = AnyType;
 
-        bool IsAnyOr(TypeRef actual, TypeRef expected) => IsAssignable(actual, expected);
-
         void RequireCount(int exact, string signature)
         {
             if (args.Count != exact)
@@ -542,7 +592,7 @@ public static class TypeChecker
 
         void RequireArg(int index, TypeRef expected, string message)
         {
-            if (!IsAnyOr(args[index], expected))
+            if (!IsAssignable(args[index], expected))
             {
                 throw YasnException.At(
                     $"{message}: получено '{FormatType(args[index])}', ожидалось '{FormatType(expected)}'",
@@ -554,10 +604,6 @@ public static class TypeChecker
 
         switch (name)
         {
-            case "печать":
-                returnType = VoidType;
-                return true;
-
             case "длина":
                 RequireCount(1, "длина(x)");
                 if (!IsAssignable(args[0], StringType) &&
@@ -575,7 +621,7 @@ public static class TypeChecker
                 RequireCount(2, "диапазон(нач, конец)");
                 RequireArg(0, IntType, "диапазон(нач, конец)");
                 RequireArg(1, IntType, "диапазон(нач, конец)");
-                returnType = TypeRef.List(IntType);
+                returnType = IntListType;
                 return true;
 
             case "ввод":
@@ -641,7 +687,7 @@ public static class TypeChecker
                     throw YasnException.At("Аргумент ключи(...) должен быть Словарь", line, col, path);
                 }
 
-                returnType = IsAnyType(args[0]) ? TypeRef.List(AnyType) : TypeRef.List(keyType);
+                returnType = IsAnyType(args[0]) ? AnyListType : TypeRef.List(keyType);
                 return true;
 
             case "содержит":
@@ -705,7 +751,7 @@ public static class TypeChecker
                     RequireArg(1, IntType, "ожидать_все(список_задач[, таймаут_мс])");
                 }
 
-                returnType = TypeRef.List(AnyType);
+                returnType = AnyListType;
                 return true;
 
             case "отменить":
@@ -753,14 +799,14 @@ public static class TypeChecker
             case "http_get":
                 RequireCount(1, "http_get(url)");
                 RequireArg(0, StringType, "http_get(url)");
-                returnType = TypeRef.Dict(StringType, AnyType);
+                returnType = StringAnyDictType;
                 return true;
 
             case "http_post":
                 RequireCount(2, "http_post(url, body)");
                 RequireArg(0, StringType, "http_post(url, body)");
                 RequireArg(1, StringType, "http_post(url, body)");
-                returnType = TypeRef.Dict(StringType, AnyType);
+                returnType = StringAnyDictType;
                 return true;
 
             case "время_мс":
@@ -976,38 +1022,64 @@ public static class TypeChecker
 
     private static bool IsAssignable(TypeRef actual, TypeRef expected)
     {
-        if (TypeEquals(expected, AnyType) || TypeEquals(actual, AnyType))
+        var actualCanonical = actual.Canonical;
+        var expectedCanonical = expected.Canonical;
+        if (ReferenceEquals(actualCanonical, expectedCanonical) ||
+            ReferenceEquals(expectedCanonical, AnyType) ||
+            ReferenceEquals(actualCanonical, AnyType))
         {
             return true;
         }
 
-        if (TypeEquals(actual, expected))
+        if (expected.Kind == TypeKind.Primitive && actual.Kind == TypeKind.Primitive)
         {
-            return true;
+            return false;
         }
 
-        if (expected.Kind == TypeKind.Union)
+        var key = (actualCanonical.Id, expectedCanonical.Id);
+        if (AssignableCache.TryGetValue(key, out var cached))
         {
-            return expected.Variants.Any(variant => IsAssignable(actual, variant));
+            return cached;
         }
 
-        if (actual.Kind == TypeKind.Union)
+        var result = (expected.Kind, actual.Kind) switch
         {
-            return actual.Variants.All(variant => IsAssignable(variant, expected));
-        }
+            (TypeKind.Union, _) => expected.ContainsVariant(actual) || IsAssignableToSomeVariant(actual, expected.Variants),
+            (_, TypeKind.Union) => AreAllVariantsAssignable(actual.Variants, expected),
+            (TypeKind.List, TypeKind.List) => IsAssignable(actual.ElementType!, expected.ElementType!),
+            (TypeKind.Dict, TypeKind.Dict) => IsAssignable(actual.KeyType!, expected.KeyType!) &&
+                                              IsAssignable(actual.ValueType!, expected.ValueType!),
+            _ => false,
+        };
 
-        if (expected.Kind == TypeKind.List && actual.Kind == TypeKind.List)
+        AssignableCache[key] = result;
+        return result;
+    }
+
+    private static bool IsAssignableToSomeVariant(TypeRef actual, IReadOnlyList<TypeRef> variants)
+    {
+        for (var i = 0; i < variants.Count; i++)
         {
-            return IsAssignable(actual.ElementType!, expected.ElementType!);
+            if (IsAssignable(actual, variants[i]))
+            {
+                return true;
+            }
         }
 
-        if (expected.Kind == TypeKind.Dict && actual.Kind == TypeKind.Dict)
+        return false;
+    }
+
+    private static bool AreAllVariantsAssignable(IReadOnlyList<TypeRef> variants, TypeRef expected)
+    {
+        for (var i = 0; i < variants.Count; i++)
         {
-            return IsAssignable(actual.KeyType!, expected.KeyType!) &&
-                   IsAssignable(actual.ValueType!, expected.ValueType!);
+            if (!IsAssignable(variants[i], expected))
+            {
+                return false;
+            }
         }
 
-        return false;
+        return true;
     }
 
     private static bool IsNumericType(TypeRef type)
@@ -1024,7 +1096,7 @@ public static class TypeChecker
 
         if (type.Kind == TypeKind.Union)
         {
-            return type.Variants.All(IsNumericType);
+            return ProjectUnion(type).AllNumeric;
         }
 
         return false;
@@ -1043,16 +1115,9 @@ public static class TypeChecker
             return true;
         }
 
-        if (type.Kind == TypeKind.Union)
+        if (type.Kind == TypeKind.Union && ProjectUnion(type).Element is { } unionElement)
         {
-            var listVariants = type.Variants.Where(variant => variant.Kind == TypeKind.List).ToList();
-            if (listVariants.Count == 0)
-            {
-                element = AnyType;
-                return false;
-            }
-
-            element = UnionOf(listVariants.Select(variant => variant.ElementType!));
+            element = unionElement;
             return true;
         }
 
@@ -1069,18 +1134,10 @@ public static class TypeChecker
             return true;
         }
 
-        if (type.Kind == TypeKind.Union)
+        if (type.Kind == TypeKind.Union && ProjectUnion(type) is { Key: { } unionKey, Value: { } unionValue })
         {
-            var dictVariants = type.Variants.Where(variant => variant.Kind == TypeKind.Dict).ToList();
-            if (dictVariants.Count == 0)
-            {
-                key = AnyType;
-                value = AnyType;
-                return false;
-            }
-
-            key = UnionOf(dictVariants.Select(variant => variant.KeyType!));
-            value = UnionOf(dictVariants.Select(variant => variant.ValueType!));
+            key = unionKey;
+            value = unionValue;
             return true;
         }
 
@@ -1089,6 +1146,43 @@ public static class TypeChecker
         return false;
     }
 
+    private static void Accumulate(TypeRef type, ref TypeRef? uniform, ref List<TypeRef>? mixed)
+    {
+        if (mixed is not null)
+        {
+            mixed.Add(type);
+        }
+        else if (uniform is null)
+        {
+            uniform = type;
+        }
+        else if (!TypeEquals(uniform, type))
+        {
+            mixed = [uniform, type];
+        }
+    }
+
+    private static TypeRef Accumulated(TypeRef? uniform, List<TypeRef>? mixed)
+    {
+        return mixed is null ? uniform! : UnionOf(mixed);
+    }
+
+    private static UnionProjection ProjectUnion(TypeRef union)
+    {
+        return union.Projection ??= CreateProjection(union.Variants);
+    }
+
+    private static UnionProjection CreateProjection(IReadOnlyList<TypeRef> variants)
+    {
+        var listVariants = variants.Where(variant => variant.Kind == TypeKind.List).ToList();
+        var dictVariants = variants.Where(variant => variant.Kind == TypeKind.Dict).ToList();
+        return new UnionProjection(
+            listVariants.Count == 0 ? null : UnionOf(listVariants.Select(variant => variant.ElementType!)),
+            dictVariants.Count == 0 ? null : UnionOf(dictVariants.Select(variant => variant.KeyType!)),
+            dictVariants.Count == 0 ? null : UnionOf(dictVariants.Select(variant => variant.ValueType!)),
+            variants.All(IsNumericType));
+    }
+
     private static TypeRef UnionOf(IEnumerable<TypeRef> types)
     {
         var flattened = new List<TypeRef>();
@@ -1104,7 +1198,8 @@ public static class TypeChecker
             }
         }
 
-        var unique = new List<TypeRef>();
+        var unique = new List<TypeRef>(flattened.Count);
+        var seen = new HashSet<TypeRef>(flattened.Count, ReferenceEqualityComparer.Instance);
         foreach (var type in flattened)
         {
             if (TypeEquals(type, AnyType))
@@ -1112,7 +1207,7 @@ public static class TypeChecker
                 return AnyType;
             }
 
-            if (!unique.Any(existing => TypeEquals(existing, type)))
+            if (seen.Add(type.Canonical))
             {
                 unique.Add(type);
             }
@@ -1133,20 +1228,7 @@ public static class TypeChecker
 
     private static bool TypeEquals(TypeRef left, TypeRef right)
     {
-        if (left.Kind != right.Kind)
-        {
-            return false;
-        }
-
-        return left.Kind switch
-        {
-            TypeKind.Primitive => string.Equals(left.Name, right.Name, StringComparison.Ordinal),
-            TypeKind.List => TypeEquals(left.ElementType!, right.ElementType!),
-            TypeKind.Dict => TypeEquals(left.KeyType!, right.KeyType!) && TypeEquals(left.ValueType!, right.ValueType!),
-            TypeKind.Union => left.Variants.Count == right.Variants.Count &&
-                              left.Variants.All(variant => right.Variants.Any(other => TypeEquals(variant, other))),
-            _ => false,
-        };
+        return ReferenceEquals(left.Canonical, right.Canonical);
     }
 
     private static string FormatType(TypeRef type)
@@ -1176,67 +1258,65 @@ public static class TypeChecker
 
     private sealed class Scope
     {
-        private readonly Scope? _parent;
-        private readonly Dictionary<string, TypeRef> _values;
-
-        private Scope(Scope? parent, Dictionary<string, TypeRef>? values = null)
-        {
-            _parent = parent;
-            _values = values ?? new Dictionary<string, TypeRef>(StringComparer.Ordinal);
-        }
+        private readonly Dictionary<string, List<(int Depth, TypeRef Type)>> _bindings = new(StringComparer.Ordinal);
+        private readonly List<List<string>> _frames = [];
+        private int _depth;
 
         public static Scope CreateRoot(Dictionary<string, TypeRef> values)
         {
-            return new Scope(parent: null, values: new Dictionary<string, TypeRef>(values, StringComparer.Ordinal));
-        }
+            var scope = new Scope();
+            scope.Push();
+            foreach (var (name, type) in values)
+            {
+                scope.Bind(name, type);
+            }
 
-        public static Scope CreateChild(Scope parent)
-        {
-            return new Scope(parent);
+            return scope;
         }
 
-        public void Declare(string name, TypeRef type, int line, int col, string? path)
+        public void Push()
         {
-            if (_values.ContainsKey(name))
+            if (_depth < _frames.Count)
             {
-                throw YasnException.At($"Символ '{name}' уже объявлен в текущей области", line, col, path);
+                _frames[_depth].Clear();
+            }
+            else
+            {
+                _frames.Add([]);
             }
 
-            _values[name] = type;
+            _depth++;
         }
 
-        public void AssignOrDeclare(string name, TypeRef type, int line, int col, string? path)
+        public void Pop()
         {
-            if (_values.ContainsKey(name))
+            _depth--;
+            foreach (var name in _frames[_depth])
             {
-                _values[name] = type;
-                return;
+                var stack = _bindings[name];
+                stack.RemoveAt(stack.Count - 1);
             }
+        }
 
-            if (_parent is not null && _parent.TryResolve(name, out _))
+        public void Declare(string name, TypeRef type, int line, int col, string? path)
+        {
+            if (_bindings.TryGetValue(name, out var stack) && stack.Count > 0 && stack[^1].Depth == _depth)
             {
-                _parent.Assign(name, type, line, col, path);
-                return;
+                throw YasnException.At($"Символ '{name}' уже объявлен в текущей области", line, col, path);
             }
 
-            _values[name] = type;
+            Bind(name, type);
         }
 
-        public void Assign(string name, TypeRef type, int line, int col, string? path)
+        public void AssignOrDeclare(string name, TypeRef type, int line, int col, string? path)
         {
-            if (_values.ContainsKey(name))
-            {
-                _values[name] = type;
-                return;
-            }
-
-            if (_parent is not null)
+            if (_bindings.TryGetValue(name, out var stack) && stack.Count > 0)
             {
-                _parent.Assign(name, type, line, col, path);
+                stack[^1] = (stack[^1].Depth, type);
                 return;
             }
 
-            throw YasnException.At($"Неизвестная переменная: {name}", line, col, path);
+            Bind(name, type);
         }
 
         public TypeRef Resolve(string name, int line, int col, string? path)
@@ -1251,22 +1331,42 @@ public static class TypeChecker
 
         public bool TryResolve(string name, out TypeRef type)
         {
-            if (_values.TryGetValue(name, out type!))
+            if (_bindings.TryGetValue(name, out var stack) && stack.Count > 0)
             {
+                type = stack[^1].Type;
                 return true;
             }
 
-            if (_parent is not null)
+            type = AnyType;
+            return false;
+        }
+
+        private void Bind(string name, TypeRef type)
+        {
+            if (!_bindings.TryGetValue(name, out var stack))
             {
-                return _parent.TryResolve(name, out type!);
+                stack = [];
+                _bindings[name] = stack;
             }
 
-            type = AnyType;
-            return false;
+            stack.Add((_depth, type));
+            _frames[_depth - 1].Add(name);
         }
     }
 
-    private sealed record FuncSignature(string Name, List<TypeRef> ParamTypes, TypeRef ReturnType, bool IsAsync);
+    private sealed record UnionProjection(TypeRef? Element, TypeRef? Key, TypeRef? Value, bool AllNumeric);
+
+    private sealed record FuncSignature(string Name, TypeRef[] ParamTypes, TypeRef ReturnType, bool IsAsync);
+
+    private enum OperatorKind
+    {
+        Unknown,
+        Logical,
+        Add,
+        Arithmetic,
+        Equality,
+        Ordering,
+    }
 
     private enum TypeKind
     {
@@ -1278,13 +1378,25 @@ public static class TypeChecker
 
     private sealed class TypeRef
     {
+        private static readonly System.Collections.Concurrent.ConcurrentDictionary<string, TypeRef> Primitives = new(StringComparer.Ordinal);
+        private static readonly System.Collections.Concurrent.ConcurrentDictionary<int, TypeRef> Lists = new();
+        private static readonly System.Collections.Concurrent.ConcurrentDictionary<(int Key, int Value), TypeRef> Dicts = new();
+        private static readonly System.Collections.Concurrent.ConcurrentDictionary<int[], TypeRef> Unions = new(VariantIdsComparer.Instance);
+        private static int _nextId;
+
         private TypeRef(TypeKind kind)
         {
             Kind = kind;
+            Id = Interlocked.Increment(ref _nextId);
+            Canonical = this;
         }
 
         public TypeKind Kind { get; }
 
+        public int Id { get; }
+
+        public TypeRef Canonical { get; private set; }
+
         public string? Name { get; private init; }
 
         public TypeRef? ElementType { get; private init; }
@@ -1295,24 +1407,122 @@ public static class TypeChecker
 
         public IReadOnlyList<TypeRef> Variants { get; private init; } = [];
 
+        public UnionProjection? Projection { get; set; }
+
+        private HashSet<TypeRef>? _variantSet;
+
+        public bool ContainsVariant(TypeRef type)
+        {
+            if (Variants.Count <= 3)
+            {
+                foreach (var variant in Variants)
+                {
+                    if (ReferenceEquals(variant.Canonical, type.Canonical))
+                    {
+                        return true;
+                    }
+                }
+
+                return false;
+            }
+
+            _variantSet ??= new HashSet<TypeRef>(Variants.Select(static variant => variant.Canonical), ReferenceEqualityComparer.Instance);
+            return _variantSet.Contains(type.Canonical);
+        }
+
         public static TypeRef Primitive(string name)
         {
-            return new TypeRef(TypeKind.Primitive) { Name = name };
+            return Primitives.TryGetValue(name, out var existing)
+                ? existing
+                : Primitives.GetOrAdd(name, static key => new TypeRef(TypeKind.Primitive) { Name = key });
         }
 
         public static TypeRef List(TypeRef element)
         {
-            return new TypeRef(TypeKind.List) { ElementType = element };
+            return Lists.TryGetValue(element.Id, out var existing)
+                ? existing
+                : Lists.GetOrAdd(element.Id, static (_, item) => CreateList(item), element);
         }
 
         public static TypeRef Dict(TypeRef key, TypeRef value)
         {
-            return new TypeRef(TypeKind.Dict) { KeyType = key, ValueType = value };
+            return Dicts.TryGetValue((key.Id, value.Id), out var existing)
+                ? existing
+                : Dicts.GetOrAdd((key.Id, value.Id), static (_, pair) => CreateDict(pair.Key, pair.Value), (Key: key, Value: value));
         }
 
         public static TypeRef Union(IReadOnlyList<TypeRef> variants)
         {
-            return new TypeRef(TypeKind.Union) { Variants = variants };
+            var key = UnionKey(variants);
+            return Unions.TryGetValue(key, out var existing)
+                ? existing
+                : Unions.GetOrAdd(key, static (_, items) => CreateUnion(items), variants);
+        }
+
+        private static TypeRef CreateList(TypeRef element)
+        {
+            var created = new TypeRef(TypeKind.List) { ElementType = element };
+            if (!ReferenceEquals(element.Canonical, element))
+            {
+                created.Canonical = List(element.Canonical);
+            }
+
+            return created;
+        }
+
+        private static TypeRef CreateDict(TypeRef key, TypeRef value)
+        {
+            var created = new TypeRef(TypeKind.Dict) { KeyType = key, ValueType = value };
+            if (!ReferenceEquals(key.Canonical, key) || !ReferenceEquals(value.Canonical, value))
+            {
+                created.Canonical = Dict(key.Canonical, value.Canonical);
+            }
+
+            return created;
+        }
+
+        private static TypeRef CreateUnion(IReadOnlyList<TypeRef> variants)
+        {
+            var created = new TypeRef(TypeKind.Union) { Variants = variants };
+            var ordered = variants.Select(static variant => variant.Canonical).OrderBy(static variant => variant.Id).ToList();
+            if (!ordered.Select(static variant => variant.Id).SequenceEqual(variants.Select(static variant => variant.Id)))
+            {
+                created.Canonical = Union(ordered);
+            }
+
+            return created;
+        }
+
+        private static int[] UnionKey(IReadOnlyList<TypeRef> variants)
+        {
+            var key = new int[variants.Count];
+            for (var i = 0; i < key.Length; i++)
+            {
+                key[i] = variants[i].Id;
+            }
+
+            return key;
+        }
+
+        private sealed class VariantIdsComparer : IEqualityComparer<int[]>
+        {
+            public static readonly VariantIdsComparer Instance = new();
+
+            public bool Equals(int[]? x, int[]? y)
+            {
+                return ReferenceEquals(x, y) || (x is not null && y is not null && x.AsSpan().SequenceEqual(y));
+            }
+
+            public int GetHashCode(int[] obj)
+            {
+                var hash = new HashCode();
+                foreach (var id in obj)
+                {
+                    hash.Add(id);
+                }
+
+                return hash.ToHashCode();
+            }
         }
     }
 }
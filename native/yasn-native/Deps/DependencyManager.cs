@@ -40,6 +40,10 @@ public static class DependencyManager
     private const string DepsDirRelative = ".yasn/deps";
     private const string LockFileRelative = ".yasn/deps.lock.json";
 
+    private static readonly System.Collections.Concurrent.ConcurrentDictionary<(string Raw, string ProjectRoot), string> ResolvedDepPaths = new();
+
+    private static readonly List<Task> PendingRemovals = [];
+
     public static DependenciesManifest LoadManifest(string? cwd = null)
     {
         var start = cwd ?? Directory.GetCurrentDirectory();
@@ -57,55 +61,95 @@ public static class DependencyManager
 
     public static (DependenciesManifest Manifest, List<DependencyInstallResult> Installed) InstallDependencies(string? cwd = null, bool clean = false)
     {
+        ResolvedDepPaths.Clear();
         var manifest = LoadManifest(cwd);
         Directory.CreateDirectory(manifest.DepsRoot);
 
-        var queue = new Queue<QueuedDependency>(manifest.Specs.Select(spec => new QueuedDependency(spec, manifest.ProjectRoot, true, null)));
+        foreach (var leftover in EnumerateTrash(manifest.DepsRoot))
+        {
+            QueueRemoval(leftover);
+        }
+
+        try
+        {
+            return (manifest, InstallAll(manifest, clean));
+        }
+        finally
+        {
+            // Background removals must finish before exit, including when an install fails.
+            WaitPendingRemovals(manifest.DepsRoot);
+        }
+    }
+
+    private static List<DependencyInstallResult> InstallAll(DependenciesManifest manifest, bool clean)
+    {
+        var level = manifest.Specs.Select(spec => new QueuedDependency(spec, manifest.ProjectRoot, true, null)).ToList();
         var planned = new Dictionary<string, (string Identity, QueuedDependency Dep)>(StringComparer.Ordinal);
         var results = new List<DependencyInstallResult>();
 
-        while (queue.Count > 0)
+        while (level.Count > 0)
         {
-            var dep = queue.Dequeue();
-            var identity = DependencyIdentity(dep.Spec, dep.ProjectRoot);
-            if (planned.TryGetValue(dep.Spec.Name, out var existing))
+            var batch = new List<(QueuedDependency Dep, string Target)>();
+            foreach (var dep in level)
             {
-                if (!string.Equals(existing.Identity, identity, StringComparison.Ordinal))
+                var identity = DependencyIdentity(dep.Spec, dep.ProjectRoot);
+                if (planned.TryGetValue(dep.Spec.Name, out var existing))
                 {
-                    var prevSource = DependencySourceForError(existing.Dep.Spec, existing.Dep.ProjectRoot);
-                    var newSource = DependencySourceForError(dep.Spec, dep.ProjectRoot);
-                    throw new YasnException(
-                        $"Конфликт зависимостей '{dep.Spec.Name}': {prevSource} и {newSource}. Используйте единый источник и версию.",
-                        path: manifest.ConfigPath);
-                }
+                    if (!string.Equals(existing.Identity, identity, StringComparison.Ordinal))
+                    {
+                        var prevSource = DependencySourceForError(existing.Dep.Spec, existing.Dep.ProjectRoot);
+                        var newSource = DependencySourceForError(dep.Spec, dep.ProjectRoot);
+                        throw new YasnException(
+                            $"Конфликт зависимостей '{dep.Spec.Name}': {prevSource} и {newSource}. Используйте единый источник и версию.",
+                            path: manifest.ConfigPath);
+                    }
 
-                continue;
-            }
+                    continue;
+                }
 
-            planned[dep.Spec.Name] = (identity, dep);
-            var target = System.IO.Path.Combine(manifest.DepsRoot, dep.Spec.Name);
+                if (dep.Spec.Kind is not ("path" or "git"))
+                {
+                    throw new YasnException($"Неподдерживаемый тип зависимости: {dep.Spec.Kind}", path: manifest.ConfigPath);
+                }
 
-            string resolved;
-            string nestedRoot;
-            if (dep.Spec.Kind == "path")
-            {
-                (resolved, nestedRoot) = InstallFromPath(dep.Spec, dep.ProjectRoot, target);
+                planned[dep.Spec.Name] = (identity, dep);
+                batch.Add((dep, System.IO.Path.Combine(manifest.DepsRoot, dep.Spec.Name)));
             }
-            else if (dep.Spec.Kind == "git")
+
+            var installed = new (string Resolved, string NestedRoot)[batch.Count];
+            try
             {
-                (resolved, nestedRoot) = InstallFromGit(dep.Spec, dep.ProjectRoot, target);
+                Parallel.For(
+                    0,
+                    batch.Count,
+                    new ParallelOptions { MaxDegreeOfParallelism = Math.Max(1, Math.Min(batch.Count, Environment.ProcessorCount * 2)) },
+                    i =>
+                    {
+                        var (dep, target) = batch[i];
+                        installed[i] = dep.Spec.Kind == "path"
+                            ? InstallFromPath(dep.Spec, dep.ProjectRoot, target)
+                            : InstallFromGit(dep.Spec, dep.ProjectRoot, target);
+                    });
             }
-            else
+            catch (AggregateException ex)
             {
-                throw new YasnException($"Неподдерживаемый тип зависимости: {dep.Spec.Kind}", path: manifest.ConfigPath);
+                System.Runtime.ExceptionServices.ExceptionDispatchInfo.Throw(ex.InnerExceptions[0]);
             }
 
-            results.Add(new DependencyInstallResult(dep.Spec, target, resolved, dep.Direct, dep.RequestedBy));
-
-            foreach (var nested in LoadNestedDependencySpecs(nestedRoot))
+            var next = new List<QueuedDependency>();
+            for (var i = 0; i < batch.Count; i++)
             {
-                queue.Enqueue(new QueuedDependency(nested, nestedRoot, false, dep.Spec.Name));
+                var (dep, target) = batch[i];
+                var (resolved, nestedRoot) = installed[i];
+                results.Add(new DependencyInstallResult(dep.Spec, target, resolved, dep.Direct, dep.RequestedBy));
+
+                foreach (var nested in LoadNestedDependencySpecs(nestedRoot))
+                {
+                    next.Add(new QueuedDependency(nested, nestedRoot, false, dep.Spec.Name));
+                }
             }
+
+            level = next;
         }
 
         if (clean)
@@ -127,11 +171,12 @@ public static class DependencyManager
         }
 
         WriteLock(manifest, results);
-        return (manifest, results);
+        return results;
     }
 
     public static (DependenciesManifest Manifest, List<DependencyStatus> Statuses) ListDependencies(string? cwd = null, bool includeTransitive = false)
     {
+        ResolvedDepPaths.Clear();
         var manifest = LoadManifest(cwd);
         var statuses = new List<DependencyStatus>();
 
@@ -189,8 +234,8 @@ public static class DependencyManager
             throw new YasnException("Секция [dependencies] должна быть объектом", path: configPath);
         }
 
-        var specs = new List<DependencySpec>();
-        var seen = new HashSet<string>(StringComparer.Ordinal);
+        var specs = new List<DependencySpec>(deps.Count);
+        var seen = new HashSet<string>(deps.Count, StringComparer.Ordinal);
 
         foreach (var (nameRaw, value) in deps)
         {
@@ -294,13 +339,12 @@ public static class DependencyManager
             throw new YasnException($"Путь зависимости не найден: {sourcePath}");
         }
 
-        if (Directory.Exists(target))
+        if (File.Exists(target))
         {
-            RemoveTree(target);
+            File.Delete(target);
         }
 
-        Directory.CreateDirectory(System.IO.Path.GetDirectoryName(target)!);
-        CopyDirectory(sourcePath, target);
+        SyncDirectory(sourcePath, target);
         return (sourcePath, sourcePath);
     }
 
@@ -318,16 +362,25 @@ public static class DependencyManager
 
         if (Directory.Exists(target))
         {
-            RemoveTree(target);
+            DiscardTree(target);
         }
 
         Directory.CreateDirectory(System.IO.Path.GetDirectoryName(target)!);
 
-        RunCommand(["git", "clone", "--depth", "1", source, target], System.IO.Path.GetDirectoryName(target)!);
-        if (!string.IsNullOrWhiteSpace(spec.Ref))
+        var pinned = !string.IsNullOrWhiteSpace(spec.Ref);
+        List<string> clone = ["git", "clone", "--depth", "1", "--filter=blob:none"];
+        if (pinned)
+        {
+            clone.Add("--no-checkout");
+        }
+
+        clone.Add(source);
+        clone.Add(target);
+        RunCommand(clone, System.IO.Path.GetDirectoryName(target)!);
+        if (pinned)
         {
-            RunCommand(["git", "fetch", "--depth", "1", "origin", spec.Ref!], target);
-            RunCommand(["git", "checkout", "FETCH_HEAD"], target);
+            RunCommand(["git", "fetch", "--depth", "1", "--filter=blob:none", "origin", spec.Ref!], target);
+            RunCommand(["git", "-c", "advice.detachedHead=false", "checkout", "--quiet", "FETCH_HEAD"], target);
         }
 
         return (GitHead(target), target);
@@ -357,6 +410,11 @@ public static class DependencyManager
     }
 
     private static string ResolveDepPath(string raw, string projectRoot)
+    {
+        return ResolvedDepPaths.GetOrAdd((raw, projectRoot), static key => ResolveDepPathUncached(key.Raw, key.ProjectRoot));
+    }
+
+    private static string ResolveDepPathUncached(string raw, string projectRoot)
     {
         var expanded = Environment.ExpandEnvironmentVariables(raw);
         if (expanded.StartsWith("~", StringComparison.Ordinal))
@@ -395,10 +453,67 @@ public static class DependencyManager
 
     private static string GitHead(string repoDir)
     {
+        if (TryReadGitHead(repoDir) is { } head)
+        {
+            return head;
+        }
+
         var output = RunCommand(["git", "rev-parse", "HEAD"], repoDir);
         return output.Trim();
     }
 
+    private static string? TryReadGitHead(string repoDir)
+    {
+        var gitDir = System.IO.Path.Combine(repoDir, ".git");
+        if (!Directory.Exists(gitDir))
+        {
+            return null;
+        }
+
+        try
+        {
+            var head = File.ReadAllText(System.IO.Path.Combine(gitDir, "HEAD")).Trim();
+            if (!head.StartsWith("ref: ", StringComparison.Ordinal))
+            {
+                return IsObjectId(head) ? head : null;
+            }
+
+            var refName = head[5..].Trim();
+            var refPath = System.IO.Path.Combine(gitDir, refName);
+            if (File.Exists(refPath))
+            {
+                var value = File.ReadAllText(refPath).Trim();
+                return IsObjectId(value) ? value : null;
+            }
+
+            var packedRefs = System.IO.Path.Combine(gitDir, "packed-refs");
+            if (!File.Exists(packedRefs))
+            {
+                return null;
+            }
+
+            foreach (var line in File.ReadLines(packedRefs))
+            {
+                var parts = line.Split(' ', 2);
+                if (parts.Length == 2 && string.Equals(parts[1].Trim(), refName, StringComparison.Ordinal) && IsObjectId(parts[0]))
+                {
+                    return parts[0];
+                }
+            }
+
+            return null;
+        }
+        catch (Exception ex) when (ex is IOException or UnauthorizedAccessException)
+        {
+            return null;
+        }
+    }
+
+    private static bool IsObjectId(string value)
+    {
+        return value.Length is 40 or 64 && value.All(Uri.IsHexDigit);
+    }
+
     private static string RunCommand(List<string> cmd, string cwd)
     {
         var psi = new ProcessStartInfo
@@ -441,39 +556,174 @@ public static class DependencyManager
         return stdout;
     }
 
-    private static void CopyDirectory(string sourceDir, string targetDir)
+    private static void SyncDirectory(string sourceDir, string targetDir)
+    {
+        var copies = new List<(FileInfo Source, string Target)>();
+        CollectSync(sourceDir, targetDir, copies);
+        if (copies.Count == 0)
+        {
+            return;
+        }
+
+        try
+        {
+            Parallel.ForEach(
+                copies,
+                new ParallelOptions { MaxDegreeOfParallelism = Math.Max(1, Math.Min(copies.Count, Environment.ProcessorCount * 2)) },
+                item =>
+                {
+                    File.Copy(item.Source.FullName, item.Target, overwrite: true);
+                    File.SetLastWriteTimeUtc(item.Target, item.Source.LastWriteTimeUtc);
+                });
+        }
+        catch (AggregateException ex)
+        {
+            System.Runtime.ExceptionServices.ExceptionDispatchInfo.Throw(ex.InnerExceptions[0]);
+        }
+    }
+
+    private static void CollectSync(string sourceDir, string targetDir, List<(FileInfo Source, string Target)> copies)
     {
         Directory.CreateDirectory(targetDir);
+        var expected = new HashSet<string>(StringComparer.Ordinal);
 
-        foreach (var file in Directory.EnumerateFiles(sourceDir))
+        foreach (var entry in new DirectoryInfo(sourceDir).EnumerateFileSystemInfos())
         {
-            var name = System.IO.Path.GetFileName(file);
-            if (ShouldSkipName(name))
+            if (ShouldSkipName(entry.Name))
+            {
+                continue;
+            }
+
+            expected.Add(entry.Name);
+            var target = System.IO.Path.Combine(targetDir, entry.Name);
+            if (entry is DirectoryInfo)
+            {
+                if (File.Exists(target))
+                {
+                    DeleteFile(target);
+                }
+
+                CollectSync(entry.FullName, target, copies);
+                continue;
+            }
+
+            if (Directory.Exists(target))
+            {
+                RemoveTree(target);
+            }
+
+            var existing = new FileInfo(target);
+            var source = (FileInfo)entry;
+            if (existing.Exists && existing.Length == source.Length && existing.LastWriteTimeUtc == source.LastWriteTimeUtc)
             {
                 continue;
             }
 
-            var target = System.IO.Path.Combine(targetDir, name);
-            File.Copy(file, target, overwrite: true);
+            copies.Add((source, target));
         }
 
-        foreach (var dir in Directory.EnumerateDirectories(sourceDir))
+        foreach (var entry in new DirectoryInfo(targetDir).EnumerateFileSystemInfos())
         {
-            var name = System.IO.Path.GetFileName(dir);
-            if (ShouldSkipName(name))
+            if (expected.Contains(entry.Name))
             {
                 continue;
             }
 
-            CopyDirectory(dir, System.IO.Path.Combine(targetDir, name));
+            if (entry is DirectoryInfo)
+            {
+                RemoveTree(entry.FullName);
+            }
+            else
+            {
+                DeleteFile(entry.FullName);
+            }
         }
     }
 
+    private static void DeleteFile(string path)
+    {
+        File.SetAttributes(path, FileAttributes.Normal);
+        File.Delete(path);
+    }
+
     private static bool ShouldSkipName(string name)
     {
         return name is ".git" or "__pycache__" or ".venv" or "node_modules";
     }
 
+    private static string TrashRoot(string depsRoot)
+    {
+        return System.IO.Path.Combine(System.IO.Path.GetDirectoryName(depsRoot)!, "trash");
+    }
+
+    private static List<string> EnumerateTrash(string depsRoot)
+    {
+        var trashRoot = TrashRoot(depsRoot);
+        return Directory.Exists(trashRoot) ? Directory.EnumerateDirectories(trashRoot).ToList() : [];
+    }
+
+    private static void DiscardTree(string path)
+    {
+        // Old checkouts go outside the deps root so module lookup never sees a half-deleted copy.
+        var trashRoot = TrashRoot(System.IO.Path.GetDirectoryName(path)!);
+        var trash = System.IO.Path.Combine(trashRoot, $"{System.IO.Path.GetFileName(path)}-{Environment.ProcessId}-{Stopwatch.GetTimestamp()}");
+        try
+        {
+            Directory.CreateDirectory(trashRoot);
+            Directory.Move(path, trash);
+        }
+        catch (Exception ex) when (ex is IOException or UnauthorizedAccessException)
+        {
+            RemoveTree(path);
+            return;
+        }
+
+        QueueRemoval(trash);
+    }
+
+    private static void QueueRemoval(string trash)
+    {
+        var removal = Task.Run(() =>
+        {
+            try
+            {
+                RemoveTree(trash);
+            }
+            catch (Exception ex) when (ex is IOException or UnauthorizedAccessException)
+            {
+            }
+        });
+
+        lock (PendingRemovals)
+        {
+            PendingRemovals.Add(removal);
+        }
+    }
+
+    private static void WaitPendingRemovals(string depsRoot)
+    {
+        Task[] pending;
+        lock (PendingRemovals)
+        {
+            pending = [.. PendingRemovals];
+            PendingRemovals.Clear();
+        }
+
+        Task.WaitAll(pending);
+
+        var trashRoot = TrashRoot(depsRoot);
+        try
+        {
+            if (Directory.Exists(trashRoot) && !Directory.EnumerateFileSystemEntries(trashRoot).Any())
+            {
+                Directory.Delete(trashRoot);
+            }
+        }
+        catch (Exception ex) when (ex is IOException or UnauthorizedAccessException)
+        {
+        }
+    }
+
     private static void RemoveTree(string path)
     {
         if (!Directory.Exists(path))
@@ -481,6 +731,15 @@ public static class DependencyManager
             return;
         }
 
+        try
+        {
+            Directory.Delete(path, recursive: true);
+            return;
+        }
+        catch (Exception ex) when (ex is IOException or UnauthorizedAccessException)
+        {
+        }
+
         var dir = new DirectoryInfo(path);
         foreach (var item in dir.EnumerateFileSystemInfos("*", SearchOption.AllDirectories))
         {
@@ -516,12 +775,23 @@ public static class DependencyManager
         };
 
         Directory.CreateDirectory(System.IO.Path.GetDirectoryName(manifest.LockPath)!);
-        var json = JsonSerializer.Serialize(payload, new JsonSerializerOptions
+        var json = JsonSerializer.SerializeToUtf8Bytes(payload, new JsonSerializerOptions
         {
             WriteIndented = true,
             Encoder = System.Text.Encodings.Web.JavaScriptEncoder.UnsafeRelaxedJsonEscaping,
         });
-        File.WriteAllText(manifest.LockPath, json);
+
+        var tempPath = $"{manifest.LockPath}.{Environment.ProcessId}.tmp";
+        try
+        {
+            File.WriteAllBytes(tempPath, json);
+            File.Move(tempPath, manifest.LockPath, overwrite: true);
+        }
+        catch
+        {
+            File.Delete(tempPath);
+            throw;
+        }
     }
 
     private static string SerializeTarget(string path, string projectRoot)
@@ -546,7 +816,7 @@ public static class DependencyManager
 
         try
         {
-            using var doc = JsonDocument.Parse(File.ReadAllText(manifest.LockPath));
+            using var doc = JsonDocument.Parse(File.ReadAllBytes(manifest.LockPath));
             var root = doc.RootElement;
             if (!root.TryGetProperty("dependencies", out var depsElement) || depsElement.ValueKind != JsonValueKind.Array)
             {
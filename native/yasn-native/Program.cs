@@ -10,9 +10,13 @@ using YasnNative.Server;
 
 namespace YasnNative;
 
-internal static class Program
+internal static partial class Program
 {
-    private static readonly HashSet<string> ModeNames = new(StringComparer.Ordinal) { "dev", "start" };
+    [GeneratedRegex(@"\s+", RegexOptions.CultureInvariant)]
+    private static partial Regex WhitespaceRegex();
+
+    [GeneratedRegex(@"[^\w\-]", RegexOptions.CultureInvariant)]
+    private static partial Regex InvalidCommandCharRegex();
 
     private static int Main(string[] args)
     {
@@ -70,14 +74,13 @@ internal static class Program
         var portRaw = ParseOption(args, "--port");
         var port = ParseNullableInt(portRaw, "Invalid port");
 
-        if (ModeNames.Contains(target))
+        if (target is "dev" or "start")
         {
             return ProjectRunner.RunMode(target, backend, host, port);
         }
 
         var fullPath = Path.GetFullPath(target);
-        var source = File.ReadAllText(fullPath);
-        var program = Pipeline.CompileSource(source, fullPath);
+        var program = BytecodeCache.CompileFile(fullPath).Program;
         var vm = new VirtualMachine(program, fullPath);
         vm.Run();
         return 0;
@@ -136,8 +139,7 @@ internal static class Program
         var outputPath = ParseOption(args, "-o") ?? ParseOption(args, "--output");
 
         var fullSourcePath = Path.GetFullPath(sourcePath);
-        var source = File.ReadAllText(fullSourcePath);
-        var program = Pipeline.CompileSource(source, fullSourcePath);
+        var program = BytecodeCache.CompileFile(fullSourcePath).Program;
         var output = outputPath is null
             ? Path.ChangeExtension(fullSourcePath, ".ybc")
             : Path.GetFullPath(outputPath);
@@ -379,8 +381,8 @@ internal static class Program
             throw new YasnException("Command name cannot be empty");
         }
 
-        name = Regex.Replace(name, "\\s+", "_");
-        name = Regex.Replace(name, "[^\\w\\-]", "_");
+        name = WhitespaceRegex().Replace(name, "_");
+        name = InvalidCommandCharRegex().Replace(name, "_");
         if (name.Length == 0)
         {
             throw new YasnException("Command name is empty after normalization");
@@ -414,12 +416,9 @@ internal static class Program
         string? uiDistRaw,
         string? configPath)
     {
-        var fullSourcePath = Path.GetFullPath(sourcePath);
-        var source = File.ReadAllText(fullSourcePath);
-        var loadedProgram = Pipeline.LoadProgram(source, fullSourcePath);
-        var program = Pipeline.CompileProgram(loadedProgram, fullSourcePath);
-        var bytecode = BytecodeCodec.EncodeProgram(program);
-        var schema = FunctionSchemaBuilder.FromProgramNode(loadedProgram);
+        var compiled = BytecodeCache.CompileFile(sourcePath);
+        var bytecode = BytecodeCodec.EncodeProgram(compiled.Program);
+        var schema = compiled.Schema;
         byte[]? uiDistZip = null;
         if (!string.IsNullOrWhiteSpace(uiDistRaw))
         {
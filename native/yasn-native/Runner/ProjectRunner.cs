@@ -57,24 +57,17 @@ public static class ProjectRunner
                 return backendProcess.ExitCode;
             }
 
-            while (true)
+            Task.WaitAny(backendProcess.WaitForExitAsync(), frontendProcess.WaitForExitAsync());
+            if (backendProcess.HasExited)
             {
-                if (backendProcess.HasExited)
-                {
-                    Console.WriteLine($"[yasn] Backend exited with code {backendProcess.ExitCode}");
-                    StopProcess(frontendProcess);
-                    return backendProcess.ExitCode;
-                }
-
-                if (frontendProcess.HasExited)
-                {
-                    Console.WriteLine($"[yasn] Frontend exited with code {frontendProcess.ExitCode}");
-                    StopProcess(backendProcess);
-                    return frontendProcess.ExitCode;
-                }
-
-                Thread.Sleep(200);
+                Console.WriteLine($"[yasn] Backend exited with code {backendProcess.ExitCode}");
+                StopProcess(frontendProcess);
+                return backendProcess.ExitCode;
             }
+
+            Console.WriteLine($"[yasn] Frontend exited with code {frontendProcess.ExitCode}");
+            StopProcess(backendProcess);
+            return frontendProcess.ExitCode;
         }
         catch (OperationCanceledException)
         {
@@ -160,19 +153,34 @@ public static class ProjectRunner
 
     private static string? DetectDefaultBackend(string root)
     {
-        var candidates = new[]
+        var rootDir = new DirectoryInfo(root);
+        if (!rootDir.Exists)
         {
-            System.IO.Path.Combine(root, "backend", "main.яс"),
-            System.IO.Path.Combine(root, "main.яс"),
-            System.IO.Path.Combine(root, "app", "main.яс"),
-        };
+            return null;
+        }
 
-        foreach (var candidate in candidates)
+        var comparer = OperatingSystem.IsWindows() ? StringComparer.OrdinalIgnoreCase : StringComparer.Ordinal;
+        var entries = new Dictionary<string, bool>(comparer);
+        foreach (var entry in rootDir.EnumerateFileSystemInfos())
         {
-            if (File.Exists(candidate))
-            {
-                return System.IO.Path.GetRelativePath(root, candidate);
-            }
+            entries[entry.Name] = entry is DirectoryInfo;
+        }
+
+        if (entries.TryGetValue("backend", out var backendIsDir) && backendIsDir &&
+            File.Exists(System.IO.Path.Combine(root, "backend", "main.яс")))
+        {
+            return System.IO.Path.Combine("backend", "main.яс");
+        }
+
+        if (entries.TryGetValue("main.яс", out var mainIsDir) && !mainIsDir)
+        {
+            return "main.яс";
+        }
+
+        if (entries.TryGetValue("app", out var appIsDir) && appIsDir &&
+            File.Exists(System.IO.Path.Combine(root, "app", "main.яс")))
+        {
+            return System.IO.Path.Combine("app", "main.яс");
         }
 
         return null;
@@ -26,7 +26,29 @@ public sealed class TaskHandle
 
 public sealed class VirtualMachine : IDisposable
 {
+    private sealed class ForState
+    {
+        public ForState(object? iterable, long length)
+        {
+            Iterable = iterable;
+            Length = length;
+        }
+
+        public object? Iterable { get; }
+
+        public long Length { get; }
+
+        public long Index { get; set; }
+    }
+
     private const int MaxCallDepth = 1000;
+    private static readonly object BoxedOne = 1L;
+    private static readonly object BoxedTrue = true;
+    private static readonly object BoxedFalse = false;
+    private static readonly object[] SmallInts = Enumerable
+        .Range(InstructionBuffer.SmallIntMin, InstructionBuffer.SmallIntMax - InstructionBuffer.SmallIntMin + 1)
+        .Select(static value => (object)(long)value)
+        .ToArray();
 
     private delegate object? BuiltinFn(List<object?> args, object?[] globalsStore);
 
@@ -35,6 +57,7 @@ public sealed class VirtualMachine : IDisposable
     private readonly Dictionary<string, BuiltinFn> _builtins;
     private readonly object _taskLock = new();
     private readonly List<TaskHandle> _activeTasks = [];
+    private static readonly JsonSerializerOptions JsonStringifyOptions = new() { Encoder = JavaScriptEncoder.UnsafeRelaxedJsonEscaping };
     private static readonly HttpClient SharedHttpClient = new()
     {
         Timeout = TimeSpan.FromSeconds(30),
@@ -174,137 +197,168 @@ public sealed class VirtualMachine : IDisposable
         var stack = new List<object?>();
         var ip = 0;
 
-        while (ip < fn.Instructions.Count)
+        var ops = fn.Ops;
+        var arg0 = fn.Arg0;
+        var arg1 = fn.Arg1;
+        var constants = fn.Constants;
+
+        while (ip < ops.Length)
         {
-            var ins = fn.Instructions[ip];
+            var op = ops[ip];
+            var a0 = arg0[ip];
+            var a1 = arg1[ip];
             ip++;
 
-            switch (ins.Op)
+            switch (op)
             {
-                case "CONST":
-                    stack.Add(ins.Args.Count > 0 ? ins.Args[0] : null);
+                case OpCode.CONST:
+                    stack.Add(constants[a0]);
                     break;
-                case "CONST_NULL":
+                case OpCode.CONST_NULL:
                     stack.Add(null);
                     break;
-                case "LOAD":
-                    stack.Add(locals[ToInt(ins.Args[0])]);
+                case OpCode.CONST_TRUE:
+                    stack.Add(BoxedTrue);
                     break;
-                case "STORE":
-                    locals[ToInt(ins.Args[0])] = Pop(stack);
+                case OpCode.CONST_FALSE:
+                    stack.Add(BoxedFalse);
                     break;
-                case "GLOAD":
-                    stack.Add(globalsStore[ToInt(ins.Args[0])]);
+                case OpCode.CONST_INT:
+                    stack.Add(SmallInts[a0 - InstructionBuffer.SmallIntMin]);
                     break;
-                case "GSTORE":
-                    globalsStore[ToInt(ins.Args[0])] = Pop(stack);
+                case OpCode.LOAD:
+                    stack.Add(locals[a0]);
                     break;
-                case "POP":
+                case OpCode.STORE:
+                    locals[a0] = Pop(stack);
+                    break;
+                case OpCode.STORE_KEEP:
+                    locals[a0] = Peek(stack);
+                    break;
+                case OpCode.INC_LOCAL:
+                    locals[a0] = locals[a0] is long counter ? counter + 1 : AddValues(locals[a0], BoxedOne);
+                    break;
+                case OpCode.GLOAD:
+                    stack.Add(globalsStore[a0]);
+                    break;
+                case OpCode.GSTORE:
+                    globalsStore[a0] = Pop(stack);
+                    break;
+                case OpCode.POP:
                     if (stack.Count > 0)
                     {
                         stack.RemoveAt(stack.Count - 1);
                     }
                     break;
-                case "ADD":
+                case OpCode.DUP:
+                    stack.Add(Peek(stack));
+                    break;
+                case OpCode.ADD:
                 {
                     var (b, a) = Pop2(stack);
                     stack.Add(AddValues(a, b));
                     break;
                 }
-                case "SUB":
+                case OpCode.SUB:
                 {
                     var (b, a) = Pop2(stack);
                     stack.Add(SubValues(a, b));
                     break;
                 }
-                case "MUL":
+                case OpCode.MUL:
                 {
                     var (b, a) = Pop2(stack);
                     stack.Add(MulValues(a, b));
                     break;
                 }
-                case "DIV":
+                case OpCode.DIV:
                 {
                     var (b, a) = Pop2(stack);
                     stack.Add(DivValues(a, b));
                     break;
                 }
-                case "MOD":
+                case OpCode.MOD:
                 {
                     var (b, a) = Pop2(stack);
                     stack.Add(ModValues(a, b));
                     break;
                 }
-                case "NEG":
+                case OpCode.NEG:
                     stack.Add(NegValue(Pop(stack)));
                     break;
-                case "NOT":
+                case OpCode.NOT:
                     stack.Add(!IsTruthy(Pop(stack)));
                     break;
-                case "AND":
+                case OpCode.AND:
                 {
                     var (b, a) = Pop2(stack);
                     stack.Add(IsTruthy(a) && IsTruthy(b));
                     break;
                 }
-                case "OR":
+                case OpCode.OR:
                 {
                     var (b, a) = Pop2(stack);
                     stack.Add(IsTruthy(a) || IsTruthy(b));
                     break;
                 }
-                case "EQ":
+                case OpCode.EQ:
                 {
                     var (b, a) = Pop2(stack);
                     stack.Add(EqualsValue(a, b));
                     break;
                 }
-                case "NE":
+                case OpCode.NE:
                 {
                     var (b, a) = Pop2(stack);
                     stack.Add(!EqualsValue(a, b));
                     break;
                 }
-                case "LT":
+                case OpCode.LT:
                 {
                     var (b, a) = Pop2(stack);
                     stack.Add(CompareValues(a, b) < 0);
                     break;
                 }
-                case "LE":
+                case OpCode.LE:
                 {
                     var (b, a) = Pop2(stack);
                     stack.Add(CompareValues(a, b) <= 0);
                     break;
                 }
-                case "GT":
+                case OpCode.GT:
                 {
                     var (b, a) = Pop2(stack);
                     stack.Add(CompareValues(a, b) > 0);
                     break;
                 }
-                case "GE":
+                case OpCode.GE:
                 {
                     var (b, a) = Pop2(stack);
                     stack.Add(CompareValues(a, b) >= 0);
                     break;
                 }
-                case "JMP":
-                    ip = ToInt(ins.Args[0]);
+                case OpCode.JMP:
+                    ip = a0;
                     break;
-                case "JMP_FALSE":
+                case OpCode.JMP_FALSE:
                 {
                     var cond = Pop(stack);
                     if (!IsTruthy(cond))
                     {
-                        ip = ToInt(ins.Args[0]);
+                        ip = a0;
                     }
                     break;
                 }
-                case "CALL":
+                case OpCode.JMP_TRUE:
+                    if (IsTruthy(Pop(stack)))
+                    {
+                        ip = a0;
+                    }
+                    break;
+                case OpCode.CALL:
                 {
-                    var fnName = Convert.ToString(ins.Args[0], CultureInfo.InvariantCulture) ?? string.Empty;
-                    var argc = ToInt(ins.Args[1]);
+                    var fnName = (string)constants[a0]!;
+                    var argc = a1;
                     var callArgs = new List<object?>(argc);
                     for (var i = 0; i < argc; i++)
                     {
@@ -315,11 +369,11 @@ public sealed class VirtualMachine : IDisposable
                     stack.Add(result);
                     break;
                 }
-                case "RET":
+                case OpCode.RET:
                     return stack.Count > 0 ? Pop(stack) : null;
-                case "MAKE_LIST":
+                case OpCode.MAKE_LIST:
                 {
-                    var count = ToInt(ins.Args[0]);
+                    var count = a0;
                     var items = new List<object?>(count);
                     for (var i = 0; i < count; i++)
                     {
@@ -329,9 +383,9 @@ public sealed class VirtualMachine : IDisposable
                     stack.Add(items);
                     break;
                 }
-                case "MAKE_DICT":
+                case OpCode.MAKE_DICT:
                 {
-                    var count = ToInt(ins.Args[0]);
+                    var count = a0;
                     var raw = new List<object?>(count * 2);
                     for (var i = 0; i < count * 2; i++)
                     {
@@ -347,14 +401,14 @@ public sealed class VirtualMachine : IDisposable
                     stack.Add(dict);
                     break;
                 }
-                case "INDEX_GET":
+                case OpCode.INDEX_GET:
                 {
                     var idx = Pop(stack);
                     var target = Pop(stack);
                     stack.Add(IndexGet(target, idx));
                     break;
                 }
-                case "INDEX_SET":
+                case OpCode.INDEX_SET:
                 {
                     var value = Pop(stack);
                     var idx = Pop(stack);
@@ -363,13 +417,34 @@ public sealed class VirtualMachine : IDisposable
                     stack.Add(value);
                     break;
                 }
-                case "LEN":
+                case OpCode.LEN:
                     stack.Add(GetLength(Pop(stack)));
                     break;
-                case "HALT":
+                case OpCode.FOR_PREP:
+                {
+                    var iterable = Pop(stack);
+                    locals[a0] = new ForState(iterable, GetLength(iterable));
+                    break;
+                }
+                case OpCode.FOR_ITER:
+                {
+                    var state = (ForState)locals[a1]!;
+                    if (state.Index >= state.Length)
+                    {
+                        ip = a0;
+                        break;
+                    }
+
+                    stack.Add(state.Iterable is List<object?> items
+                        ? items[(int)state.Index]
+                        : IndexGet(state.Iterable, state.Index));
+                    state.Index++;
+                    break;
+                }
+                case OpCode.HALT:
                     return null;
                 default:
-                    throw new YasnException($"Неизвестная инструкция VM: {ins.Op}", path: _path);
+                    throw new YasnException($"Неизвестная инструкция VM: {op}", path: _path);
             }
         }
 
@@ -388,6 +463,16 @@ public sealed class VirtualMachine : IDisposable
         return value;
     }
 
+    private static object? Peek(List<object?> stack)
+    {
+        if (stack.Count == 0)
+        {
+            throw new YasnException("Внутренняя ошибка VM: стек пуст (stack underflow)");
+        }
+
+        return stack[^1];
+    }
+
     private static (object? B, object? A) Pop2(List<object?> stack)
     {
         var b = Pop(stack);
@@ -986,8 +1071,7 @@ public sealed class VirtualMachine : IDisposable
         }
 
         var normalized = RuntimeToJsonNode(args[0]);
-        var options = new JsonSerializerOptions { Encoder = JavaScriptEncoder.UnsafeRelaxedJsonEscaping };
-        return JsonSerializer.Serialize(normalized, options);
+        return JsonSerializer.Serialize(normalized, JsonStringifyOptions);
     }
 
     private object? BuiltinHttpGet(List<object?> args, object?[] _)
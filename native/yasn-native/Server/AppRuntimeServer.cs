@@ -1,5 +1,4 @@
 using System.Net;
-using System.Text;
 using System.Text.Json;
 using YasnNative.App;
 using YasnNative.Bytecode;
@@ -131,7 +130,7 @@ public static class AppRuntimeServer
                 return;
             }
 
-            var body = ReadJsonBody(request);
+            var body = ServerJson.ReadBody(request);
             var fnName = body.TryGetValue("function", out var fnRaw) ? fnRaw as string : null;
 
             if (string.IsNullOrWhiteSpace(fnName))
@@ -185,30 +184,6 @@ public static class AppRuntimeServer
         response.OutputStream.Write(asset.Content, 0, asset.Content.Length);
     }
 
-    private static Dictionary<string, object?> ReadJsonBody(HttpListenerRequest request)
-    {
-        using var reader = new StreamReader(request.InputStream, request.ContentEncoding ?? Encoding.UTF8, leaveOpen: true);
-        var raw = reader.ReadToEnd();
-        if (string.IsNullOrWhiteSpace(raw))
-        {
-            return new Dictionary<string, object?>(StringComparer.Ordinal);
-        }
-
-        using var doc = JsonDocument.Parse(raw);
-        if (doc.RootElement.ValueKind != JsonValueKind.Object)
-        {
-            return new Dictionary<string, object?>(StringComparer.Ordinal);
-        }
-
-        var result = new Dictionary<string, object?>(StringComparer.Ordinal);
-        foreach (var prop in doc.RootElement.EnumerateObject())
-        {
-            result[prop.Name] = BytecodeCodec.DecodeJsonValue(prop.Value);
-        }
-
-        return result;
-    }
-
     private static void SendOk(HttpListenerResponse response, object data)
     {
         SendJson(response, 200, new Dictionary<string, object?>
@@ -233,18 +208,12 @@ public static class AppRuntimeServer
 
     private static void SendJson(HttpListenerResponse response, int status, object payload)
     {
-        var raw = JsonSerializer.SerializeToUtf8Bytes(payload, new JsonSerializerOptions
-        {
-            Encoder = System.Text.Encodings.Web.JavaScriptEncoder.UnsafeRelaxedJsonEscaping,
-            WriteIndented = false,
-        });
+        var raw = JsonSerializer.SerializeToUtf8Bytes(payload, ServerJson.ResponseOptions);
 
         response.StatusCode = status;
-        response.ContentType = "application/json; charset=utf-8";
+        response.ContentType = ResponseHeaders.JsonContentType;
         response.ContentLength64 = raw.Length;
-        response.Headers["Access-Control-Allow-Origin"] = "*";
-        response.Headers["Access-Control-Allow-Headers"] = "Content-Type, Authorization, X-Request-Id";
-        response.Headers["Access-Control-Allow-Methods"] = "GET, POST, OPTIONS";
+        ResponseHeaders.ApplyCors(response);
         response.OutputStream.Write(raw, 0, raw.Length);
     }
 
@@ -252,9 +221,7 @@ public static class AppRuntimeServer
     {
         response.StatusCode = 204;
         response.ContentLength64 = 0;
-        response.Headers["Access-Control-Allow-Origin"] = "*";
-        response.Headers["Access-Control-Allow-Headers"] = "Content-Type, Authorization, X-Request-Id";
-        response.Headers["Access-Control-Allow-Methods"] = "GET, POST, OPTIONS";
+        ResponseHeaders.ApplyCors(response);
     }
 
     private static bool TryReadBoolean(
@@ -11,6 +11,7 @@ public sealed class BackendKernel
     private readonly VirtualMachine _vm;
     private readonly List<FunctionSchema> _schema;
     private readonly Dictionary<string, FunctionSchema> _schemaByName;
+    private readonly IReadOnlyList<string> _functionNames;
 
     private BackendKernel(string sourcePath, VirtualMachine vm, List<FunctionSchema> schema)
     {
@@ -18,6 +19,7 @@ public sealed class BackendKernel
         _vm = vm;
         _schema = FunctionSchemaBuilder.NormalizeForUiApi(schema);
         _schemaByName = _schema.ToDictionary(static item => item.Name, StringComparer.Ordinal);
+        _functionNames = _schema.Select(static item => item.Name).ToList().AsReadOnly();
     }
 
     public string SourcePath { get; }
@@ -25,12 +27,9 @@ public sealed class BackendKernel
     public static BackendKernel FromFile(string sourcePath)
     {
         var fullPath = Path.GetFullPath(sourcePath);
-        var source = File.ReadAllText(fullPath);
-        var loadedProgram = Pipeline.LoadProgram(source, fullPath);
-        var program = Pipeline.CompileProgram(loadedProgram, fullPath);
-        var vm = new VirtualMachine(program, fullPath);
-        var schema = FunctionSchemaBuilder.FromProgramNode(loadedProgram);
-        return new BackendKernel(fullPath, vm, schema);
+        var compiled = BytecodeCache.CompileFile(fullPath);
+        var vm = new VirtualMachine(compiled.Program, fullPath);
+        return new BackendKernel(fullPath, vm, compiled.Schema);
     }
 
     public static BackendKernel FromProgram(ProgramBC program, string sourcePath = "<bundle>", IEnumerable<FunctionSchema>? schema = null)
@@ -40,9 +39,9 @@ public sealed class BackendKernel
         return new BackendKernel(sourcePath, vm, effectiveSchema);
     }
 
-    public List<string> ListFunctions()
+    public IReadOnlyList<string> ListFunctions()
     {
-        return _schema.Select(static item => item.Name).ToList();
+        return _functionNames;
     }
 
     public List<FunctionSchema> ListSchema()
@@ -1,5 +1,4 @@
 using System.Net;
-using System.Text;
 using System.Text.Json;
 using YasnNative.Bytecode;
 using YasnNative.Core;
@@ -21,14 +20,23 @@ public static class BackendServer
         Console.WriteLine($"[yasn-native] Backend started: {prefix}");
         Console.WriteLine($"[yasn-native] Source: {source}");
 
-        while (true)
+        var acceptLoops = Enumerable
+            .Range(0, Math.Max(2, Environment.ProcessorCount))
+            .Select(_ => AcceptLoopAsync(listener, backend, source))
+            .ToArray();
+        Task.WaitAll(acceptLoops);
+    }
+
+    private static async Task AcceptLoopAsync(HttpListener listener, BackendKernel backend, string source)
+    {
+        while (listener.IsListening)
         {
-            var ctx = listener.GetContext();
-            _ = Task.Run(() => HandleRequest(ctx, backend, source));
+            var ctx = await listener.GetContextAsync();
+            _ = Task.Run(() => HandleRequestAsync(ctx, backend, source));
         }
     }
 
-    private static void HandleRequest(HttpListenerContext ctx, BackendKernel backend, string source)
+    private static async Task HandleRequestAsync(HttpListenerContext ctx, BackendKernel backend, string source)
     {
         try
         {
@@ -43,7 +51,7 @@ public static class BackendServer
 
             if (path == "/health")
             {
-                SendOk(ctx.Response, new Dictionary<string, object?>
+                await SendOk(ctx.Response, new Dictionary<string, object?>
                 {
                     ["status"] = "ok",
                     ["source"] = source,
@@ -53,7 +61,7 @@ public static class BackendServer
 
             if (path == "/functions")
             {
-                SendOk(ctx.Response, new Dictionary<string, object?>
+                await SendOk(ctx.Response, new Dictionary<string, object?>
                 {
                     ["functions"] = backend.ListFunctions(),
                 });
@@ -62,7 +70,7 @@ public static class BackendServer
 
             if (path == "/schema")
             {
-                SendOk(ctx.Response, new Dictionary<string, object?>
+                await SendOk(ctx.Response, new Dictionary<string, object?>
                 {
                     ["schemaVersion"] = 2,
                     ["functions"] = FunctionSchemaBuilder.ToJsonList(backend.ListSchema()),
@@ -74,28 +82,28 @@ public static class BackendServer
             {
                 if (request.HttpMethod != "POST")
                 {
-                    SendError(ctx.Response, 405, "method_not_allowed", "Route /call supports only POST");
+                    await SendError(ctx.Response, 405, "method_not_allowed", "Route /call supports only POST");
                     return;
                 }
 
-                var body = ReadJsonBody(request);
+                var body = await ServerJson.ReadBodyAsync(request);
                 var fnName = body.TryGetValue("function", out var fnRaw) ? fnRaw as string : null;
 
                 if (string.IsNullOrWhiteSpace(fnName))
                 {
-                    SendError(ctx.Response, 400, "invalid_request", "Field 'function' must be a non-empty string");
+                    await SendError(ctx.Response, 400, "invalid_request", "Field 'function' must be a non-empty string");
                     return;
                 }
 
                 if (!TryReadBoolean(body, "reset_state", defaultValue: false, out var resetState, out var boolError))
                 {
-                    SendError(ctx.Response, boolError!.StatusCode, boolError.Code, boolError.Message);
+                    await SendError(ctx.Response, boolError!.StatusCode, boolError.Code, boolError.Message);
                     return;
                 }
 
                 if (!TryReadBoolean(body, "await_result", defaultValue: true, out var awaitResult, out boolError))
                 {
-                    SendError(ctx.Response, boolError!.StatusCode, boolError.Code, boolError.Message);
+                    await SendError(ctx.Response, boolError!.StatusCode, boolError.Code, boolError.Message);
                     return;
                 }
 
@@ -103,27 +111,27 @@ public static class BackendServer
                 body.TryGetValue("named_args", out var namedArgsRaw);
                 if (!backend.TryPrepareCall(fnName, argsRaw, namedArgsRaw, out var args, out var callError))
                 {
-                    SendError(ctx.Response, callError!.StatusCode, callError.Code, callError.Message);
+                    await SendError(ctx.Response, callError!.StatusCode, callError.Code, callError.Message);
                     return;
                 }
 
                 var result = backend.Call(fnName, args, resetState, awaitResult);
-                SendOk(ctx.Response, new Dictionary<string, object?>
+                await SendOk(ctx.Response, new Dictionary<string, object?>
                 {
                     ["result"] = BytecodeCodec.NormalizeForJson(result),
                 });
                 return;
             }
 
-            SendError(ctx.Response, 404, "not_found", $"Route not found: {path}");
+            await SendError(ctx.Response, 404, "not_found", $"Route not found: {path}");
         }
         catch (YasnException ex)
         {
-            SendError(ctx.Response, 500, "runtime_error", ex.Message);
+            await SendError(ctx.Response, 500, "runtime_error", ex.Message);
         }
         catch (Exception ex)
         {
-            SendError(ctx.Response, 500, "handler_crash", $"Unhandled request error: {ex.Message}");
+            await SendError(ctx.Response, 500, "handler_crash", $"Unhandled request error: {ex.Message}");
         }
         finally
         {
@@ -138,42 +146,18 @@ public static class BackendServer
         }
     }
 
-    private static Dictionary<string, object?> ReadJsonBody(HttpListenerRequest request)
+    private static Task SendOk(HttpListenerResponse response, object data)
     {
-        using var reader = new StreamReader(request.InputStream, request.ContentEncoding ?? Encoding.UTF8, leaveOpen: true);
-        var raw = reader.ReadToEnd();
-        if (string.IsNullOrWhiteSpace(raw))
-        {
-            return new Dictionary<string, object?>(StringComparer.Ordinal);
-        }
-
-        using var doc = JsonDocument.Parse(raw);
-        if (doc.RootElement.ValueKind != JsonValueKind.Object)
-        {
-            return new Dictionary<string, object?>(StringComparer.Ordinal);
-        }
-
-        var result = new Dictionary<string, object?>(StringComparer.Ordinal);
-        foreach (var prop in doc.RootElement.EnumerateObject())
-        {
-            result[prop.Name] = BytecodeCodec.DecodeJsonValue(prop.Value);
-        }
-
-        return result;
-    }
-
-    private static void SendOk(HttpListenerResponse response, object data)
-    {
-        SendJson(response, 200, new Dictionary<string, object?>
+        return SendJson(response, 200, new Dictionary<string, object?>
         {
             ["ok"] = true,
             ["data"] = data,
         });
     }
 
-    private static void SendError(HttpListenerResponse response, int status, string code, string message)
+    private static Task SendError(HttpListenerResponse response, int status, string code, string message)
     {
-        SendJson(response, status, new Dictionary<string, object?>
+        return SendJson(response, status, new Dictionary<string, object?>
         {
             ["ok"] = false,
             ["error"] = new Dictionary<string, object?>
@@ -184,30 +168,22 @@ public static class BackendServer
         });
     }
 
-    private static void SendJson(HttpListenerResponse response, int status, object payload)
+    private static async Task SendJson(HttpListenerResponse response, int status, object payload)
     {
-        var raw = JsonSerializer.SerializeToUtf8Bytes(payload, new JsonSerializerOptions
-        {
-            Encoder = System.Text.Encodings.Web.JavaScriptEncoder.UnsafeRelaxedJsonEscaping,
-            WriteIndented = false,
-        });
+        var raw = JsonSerializer.SerializeToUtf8Bytes(payload, ServerJson.ResponseOptions);
 
         response.StatusCode = status;
-        response.ContentType = "application/json; charset=utf-8";
+        response.ContentType = ResponseHeaders.JsonContentType;
         response.ContentLength64 = raw.Length;
-        response.Headers["Access-Control-Allow-Origin"] = "*";
-        response.Headers["Access-Control-Allow-Headers"] = "Content-Type, Authorization, X-Request-Id";
-        response.Headers["Access-Control-Allow-Methods"] = "GET, POST, OPTIONS";
-        response.OutputStream.Write(raw, 0, raw.Length);
+        ResponseHeaders.ApplyCors(response);
+        await response.OutputStream.WriteAsync(raw);
     }
 
     private static void SendCorsPreflight(HttpListenerResponse response)
     {
         response.StatusCode = 204;
         response.ContentLength64 = 0;
-        response.Headers["Access-Control-Allow-Origin"] = "*";
-        response.Headers["Access-Control-Allow-Headers"] = "Content-Type, Authorization, X-Request-Id";
-        response.Headers["Access-Control-Allow-Methods"] = "GET, POST, OPTIONS";
+        ResponseHeaders.ApplyCors(response);
     }
 
     private static bool TryReadBoolean(
@@ -0,0 +1,24 @@
+using System.Net;
+
+namespace YasnNative.Server;
+
+internal static class ResponseHeaders
+{
+    public const string JsonContentType = "application/json; charset=utf-8";
+
+    private static readonly KeyValuePair<string, string>[] Cors =
+    [
+        new("Access-Control-Allow-Origin", "*"),
+        new("Access-Control-Allow-Headers", "Content-Type, Authorization, X-Request-Id"),
+        new("Access-Control-Allow-Methods", "GET, POST, OPTIONS"),
+    ];
+
+    public static void ApplyCors(HttpListenerResponse response)
+    {
+        var headers = response.Headers;
+        foreach (var (name, value) in Cors)
+        {
+            headers.Set(name, value);
+        }
+    }
+}
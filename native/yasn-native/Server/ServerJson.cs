@@ -0,0 +1,66 @@
+using System.Net;
+using System.Text;
+using System.Text.Json;
+using YasnNative.Bytecode;
+
+namespace YasnNative.Server;
+
+internal static class ServerJson
+{
+    private static readonly byte[] Utf8Bom = [0xEF, 0xBB, 0xBF];
+
+    public static readonly JsonSerializerOptions ResponseOptions = new()
+    {
+        Encoder = System.Text.Encodings.Web.JavaScriptEncoder.UnsafeRelaxedJsonEscaping,
+        WriteIndented = false,
+    };
+
+    public static Dictionary<string, object?> ReadBody(HttpListenerRequest request)
+    {
+        using var buffer = new MemoryStream();
+        request.InputStream.CopyTo(buffer);
+        return ParseBody(buffer, request.ContentEncoding);
+    }
+
+    public static async Task<Dictionary<string, object?>> ReadBodyAsync(HttpListenerRequest request)
+    {
+        using var buffer = new MemoryStream();
+        await request.InputStream.CopyToAsync(buffer);
+        return ParseBody(buffer, request.ContentEncoding);
+    }
+
+    private static Dictionary<string, object?> ParseBody(MemoryStream buffer, Encoding? encoding)
+    {
+        var raw = buffer.GetBuffer().AsMemory(0, (int)buffer.Length);
+        encoding ??= Encoding.UTF8;
+        if (encoding.CodePage != Encoding.UTF8.CodePage)
+        {
+            raw = Encoding.UTF8.GetBytes(encoding.GetString(raw.Span));
+        }
+
+        if (raw.Span.StartsWith(Utf8Bom))
+        {
+            raw = raw[Utf8Bom.Length..];
+        }
+
+        var trimmed = raw.Span.Trim(" \t\r\n"u8);
+        if (trimmed.IsEmpty || (trimmed[0] >= 0x80 && string.IsNullOrWhiteSpace(Encoding.UTF8.GetString(trimmed))))
+        {
+            return new Dictionary<string, object?>(StringComparer.Ordinal);
+        }
+
+        using var doc = JsonDocument.Parse(raw);
+        if (doc.RootElement.ValueKind != JsonValueKind.Object)
+        {
+            return new Dictionary<string, object?>(StringComparer.Ordinal);
+        }
+
+        var result = new Dictionary<string, object?>(StringComparer.Ordinal);
+        foreach (var prop in doc.RootElement.EnumerateObject())
+        {
+            result[prop.Name] = BytecodeCodec.DecodeJsonValue(prop.Value);
+        }
+
+        return result;
+    }
+}